@@ -1,42 +1,47 @@
 import streamlit as st
 import os
 import io
-import glob
-import pandas as pd
-import PyPDF2
 import json
 import re
-import tempfile
-import hashlib
-import subprocess
-from openai_backend import OpenAIBackend
-from cv_matching_prompt import get_cv_matching_prompt
-from past_project_analyzer import analyze_past_projects, extract_matched_employees, post_process_response
-
-try:
-    from json_to_pdf import create_cv_pdf, extract_json_from_response
-
-    PDF_GENERATION_AVAILABLE = True
-except ImportError:
-    PDF_GENERATION_AVAILABLE = False
-    st.warning(
-        "PDF generation functionality is not available. Please install reportlab package."
-    )
+import time
+from cv_corpus import get_app_registry
+from corpus_watcher import start_corpus_watcher
+from warm_start import start_warm_start
+from matching_client import MATCHING_SERVICE_URL, MatchingServiceError, get_matching_client
 
-def extract_json_from_analysis(analysis_text):
-    json_pattern = r'```json\s*(.*?)```'
-    match = re.search(json_pattern, analysis_text, re.DOTALL)
-    
-    if match:
-        json_str = match.group(1).strip()
-        try:
-            json_data = json.loads(json_str)
-            return json_data
-        except json.JSONDecodeError as e:
-            st.error(f"Error parsing JSON: {str(e)}")
-            return None
-    
-    return None
+# Must be the first Streamlit command, before any cached resource is created.
+st.set_page_config(
+    page_title="CV Matcher",
+    page_icon="📄",
+    layout="wide",
+    initial_sidebar_state="collapsed",
+)
+
+PDF_GENERATION_AVAILABLE = True
+if not MATCHING_SERVICE_URL:
+    # PDFs are rendered in this process unless a matching service does it.
+    try:
+        import reportlab
+    except ImportError:
+        PDF_GENERATION_AVAILABLE = False
+        st.warning(
+            "PDF generation functionality is not available. Please install reportlab package."
+        )
+
+def rendered_cv_pdf(cv_json):
+    """PDF rendered for this CV while the response was streaming, if any."""
+    return st.session_state.get("rendered_cv_pdfs", {}).get(cv_json.get("name", "cv"))
+
+
+def save_cv_pdf(name, pdf_data):
+    employee_name = name.replace(" ", "_")
+    pdf_path = os.path.join(pdf_dir, f"{employee_name}_CV.pdf")
+    with open(pdf_path, "wb") as f:
+        f.write(pdf_data)
+    return pdf_path
+
+def employee_file_stem(employee_name):
+    return re.sub(r'[^\w\s-]', '', employee_name).strip().replace(' ', '_')
 
 def save_employee_json_files(json_data):
     if not json_data or 'employees' not in json_data:
@@ -49,10 +54,7 @@ def save_employee_json_files(json_data):
         if 'name' not in employee:
             continue
             
-        employee_name = employee['name']
-        safe_name = re.sub(r'[^\w\s-]', '', employee_name).strip().replace(' ', '_')
-        
-        file_path = f"employee_projects/{safe_name}.json"
+        file_path = f"employee_projects/{employee_file_stem(employee['name'])}.json"
         
         with open(file_path, 'w', encoding='utf-8') as f:
             json.dump(employee, f, ensure_ascii=False, indent=2)
@@ -61,53 +63,33 @@ def save_employee_json_files(json_data):
         
     return file_paths
 
-def generate_employee_project_pdfs(json_data=None, json_files=None):
-    try:
-        if os.path.isfile("/workspace/employee_projects_to_pdf.py"):
-            pdf_paths = []
-            
-            if json_data and 'employees' in json_data:
-                temp_json_path = "/workspace/temp_employee_projects.json"
-                with open(temp_json_path, 'w', encoding='utf-8') as f:
-                    json.dump(json_data, f, ensure_ascii=False, indent=2)
-                
-                command = f"python3 /workspace/employee_projects_to_pdf.py --input {temp_json_path}"
-                process = subprocess.run(command, shell=True, capture_output=True, text=True)
-                
-                if process.returncode != 0:
-                    st.error(f"Error generating PDFs: {process.stderr}")
-                    return []
-                
-                for line in process.stdout.splitlines():
-                    if line.strip().endswith(".pdf"):
-                        pdf_paths.append(line.strip())
-                
-                if os.path.exists(temp_json_path):
-                    os.remove(temp_json_path)
-                    
-            elif json_files:
-                for json_file in json_files:
-                    base_name = os.path.basename(json_file).replace('.json', '')
-                    pdf_path = f"employee_projects_pdf/{base_name}_projects.pdf"
-                    if os.path.exists(pdf_path):
-                        pdf_paths.append(pdf_path)
-            
-            return pdf_paths
-        else:
-            st.warning("employee_projects_to_pdf.py script not found. PDF generation not available.")
-            return []
-    except Exception as e:
-        st.error(f"Error generating employee project PDFs: {str(e)}")
+def generate_employee_project_pdfs(json_data):
+    if not json_data or 'employees' not in json_data:
         return []
 
-backend = OpenAIBackend()
+    os.makedirs("employee_projects_pdf", exist_ok=True)
+    pdf_paths = []
+    for employee in json_data['employees']:
+        if 'name' not in employee:
+            continue
+        try:
+            pdf_data = matching_client.render_employee_projects_pdf(employee)
+        except MatchingServiceError as e:
+            st.error(f"Error generating PDF for {employee['name']}: {str(e)}")
+            continue
+        pdf_path = f"employee_projects_pdf/{employee_file_stem(employee['name'])}_projects.pdf"
+        with open(pdf_path, "wb") as f:
+            f.write(pdf_data)
+        pdf_paths.append(pdf_path)
+    return pdf_paths
 
-st.set_page_config(
-    page_title="CV Matcher",
-    page_icon="📄",
-    layout="wide",
-    initial_sidebar_state="collapsed",
-)
+@st.cache_resource
+def get_matching_resources():
+    """The in-process matching service, or the client of MATCHING_SERVICE_URL; shared by all sessions."""
+    return get_matching_client()
+
+
+matching_client = get_matching_resources()
 
 st.markdown(
     """
@@ -200,140 +182,70 @@ st.title("📄 CV Matching System")
 st.subheader("Match project requirements with team CVs")
 
 
-def get_file_hash(file_path):
-    try:
-        with open(file_path, "rb") as f:
-            file_hash = hashlib.md5(f.read()).hexdigest()
-        return file_hash
-    except Exception:
-        return str(os.path.getmtime(file_path))
-
-
-def get_directory_hash(directory, pattern="*"):
-    if not os.path.exists(directory):
-        return "directory_not_found"
-
-    try:
-        files = glob.glob(f"{directory}/{pattern}")
-        files.sort()
-        hash_content = "".join([f"{f}:{os.path.getmtime(f)}" for f in files])
-        return hashlib.md5(hash_content.encode()).hexdigest()
-    except Exception:
-        return str(os.path.getmtime(directory) if os.path.exists(directory) else "0")
-
-
-@st.cache_data
-def extract_text_from_pdf(pdf_file, file_hash=None):
-    try:
-        pdf_reader = PyPDF2.PdfReader(pdf_file)
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text() + "\n"
-        return text
-    except Exception as e:
-        st.error(f"Error extracting text from PDF: {str(e)}")
-        return ""
-
-
-@st.cache_data
-def load_excel_data(directory_hash=None):
-    excel_dir = "/workspace/excel"
-    excel_files = glob.glob(f"{excel_dir}/*.xlsx") + glob.glob(f"{excel_dir}/*.xls")
-
-    excel_files = [f for f in excel_files if not os.path.basename(f).startswith("~$")]
-
-    excel_data_frames = {}
-    excel_data_str = ""
-
-    if excel_files:
-        for excel_file in excel_files:
-            try:
-                file_name = os.path.basename(excel_file)
-                df = pd.read_excel(excel_file)
-                excel_data_frames[file_name] = df
-                excel_data_str += f"\n\n=== Excel File: {file_name} ===\n"
-                excel_data_str += df.to_string()
-            except Exception as e:
-                st.error(f"Error reading {file_name}: {str(e)}")
-
-    return excel_data_frames, excel_data_str
-
+@st.cache_resource
+def get_corpus_resources():
+    """Shared for the lifetime of the process; reruns reuse the same objects without copying."""
+    registry = get_app_registry()
+    # Added, edited and removed files are applied in the background as they happen.
+    start_corpus_watcher(registry)
+    return registry
 
-@st.cache_data
-def load_cv_json_data(directory_hash=None):
-    """Load CV JSON data with cache invalidation based on directory hash"""
-    json_files = glob.glob(f"{json_dir}/*.json")
 
-    if not json_files:
-        return None, "No JSON CV files found."
-
-    cv_json_data = []
-    for json_file in json_files:
-        try:
-            with open(json_file, "r", encoding="utf-8") as f:
-                cv_data = json.load(f)
-                cv_json_data.append(cv_data)
-        except Exception as e:
-            st.error(f"Error loading {os.path.basename(json_file)}: {str(e)}")
-
-    combined_text = ""
-    for cv in cv_json_data:
-        combined_text += f"===== CV: {cv['name']} =====\n\n"
-
-        if "sections" in cv:
-            for section_name, section_content in cv["sections"].items():
-                combined_text += (
-                    f"--- {section_name.upper()} ---\n{section_content}\n\n"
-                )
+corpus_registry = get_corpus_resources()
+if not MATCHING_SERVICE_URL:
+    # Already running when the app was started through warm_start.py; otherwise this starts it.
+    warm_start = start_warm_start(corpus_registry, matching_client.scheduler)
+    if not warm_start.ready.is_set():
+        st.caption("Warming up: loading CV data, indexes and the LLM connection in the background.")
 
-        if "emails" in cv:
-            combined_text += f"--- CONTACT ---\nEmail: {', '.join(cv['emails'])}\n"
-
-        if "phones" in cv:
-            combined_text += f"Phone: {', '.join(cv['phones'])}\n"
-
-        combined_text += "\n\n"
-
-    return cv_json_data, combined_text
-
-
-cv_dir = "/workspace/CV_data"
-json_dir = "/workspace/CV_json"
+cv_dir = corpus_registry.directory("cv_pdf")
+json_dir = corpus_registry.directory("cv_json")
 pdf_dir = "/workspace/CV_pdf"
 
 os.makedirs(pdf_dir, exist_ok=True)
 
-if not os.path.exists(cv_dir):
-    st.warning(f"CV directory not found at {cv_dir}. Falling back to relative path.")
-    cv_dir = "CV_data"
+if cv_dir != "/workspace/CV_data":
+    st.warning(f"CV directory not found at /workspace/CV_data. Falling back to relative path.")
 
-if not os.path.exists(json_dir):
+if json_dir != "/workspace/CV_json":
     st.warning(
-        f"JSON CV directory not found at {json_dir}. Falling back to relative path."
+        f"JSON CV directory not found at /workspace/CV_json. Falling back to relative path."
     )
-    json_dir = "CV_json"
-
-excel_dir_hash = get_directory_hash("/workspace/excel", "*.xls*")
-cv_dir_hash = get_directory_hash(cv_dir, "*.pdf")
-json_dir_hash = get_directory_hash(json_dir, "*.json")
-
-
-@st.cache_data
-def get_directory_files(directory, pattern):
-    """Get list of files in directory with caching"""
-    return glob.glob(f"{directory}/{pattern}")
 
+if st.button("Reload CV and Excel data"):
+    corpus_registry.invalidate()
 
-cv_files = get_directory_files(cv_dir, "*.pdf")
-json_files = get_directory_files(json_dir, "*.json")
+cv_files = corpus_registry.files("cv_pdf")
+json_files = corpus_registry.files("cv_json")
 
-excel_data_frames, auto_excel_data = load_excel_data(directory_hash=excel_dir_hash)
-cv_json_data, json_cv_text = load_cv_json_data(directory_hash=json_dir_hash)
+excel_data_frames, auto_excel_data = corpus_registry.get("excel").value
+cv_json_snapshot = corpus_registry.get("cv_json")
+for failed_path, error in cv_json_snapshot.errors.items():
+    st.error(f"Error loading {os.path.basename(failed_path)}: {error}")
 
 st.info(
     f"Data loaded from {json_dir} ({len(json_files)} files) and /workspace/excel ({len(excel_data_frames)} files)"
 )
 
+if json_files:
+    cv_store = corpus_registry.cv_store()
+    with st.expander("Search CVs"):
+        cv_query = st.text_input("Employee name, technology or any text from the CVs:", key="cv_search").strip()
+        if cv_query:
+            employee_cv = cv_store.get(cv_query)
+            technology_matches = [] if employee_cv else cv_store.with_technologies([cv_query])
+            if employee_cv:
+                st.markdown(f"**Technologies:** {', '.join(cv_store.technologies(cv_query)) or 'none found'}")
+                st.json(dict(employee_cv), expanded=False)
+            elif technology_matches:
+                st.markdown(f"**Employees with {cv_query}:** {', '.join(cv['name'] for cv in technology_matches)}")
+            else:
+                hits = cv_store.search(cv_query)
+                if not hits:
+                    st.write("No CVs found.")
+                for name, section, snippet in hits:
+                    st.markdown(f"**{name}** ({section}): {snippet}")
+
 st.markdown("### Project Description")
 st.markdown("Enter the project requirements to match against team CVs.")
 project_description = st.text_area(
@@ -363,188 +275,192 @@ past_project_min_similarity = st.number_input(
 
 col1, col2 = st.columns([3, 1])
 with col2:
-    selected_model = st.radio("AI Model", ["gpt-4o-mini", "gpt-4"], horizontal=True)
+    selected_model = st.radio(
+        "AI Model",
+        ["gpt-4o-mini", "gpt-4", "cascade"],
+        horizontal=True,
+        help="cascade: gpt-4o-mini scores everyone, a stronger model re-evaluates only the employees close to the minimum match.",
+    )
 
 
-@st.cache_data
-def read_all_cv_pdfs(directory_hash=None):
-    """Read all CV PDFs with cache invalidation based on directory hash"""
-    cv_texts = []
-    files = get_directory_files(cv_dir, "*.pdf")
-    for cv_file in files:
-        try:
-            with open(cv_file, "rb") as f:
-                cv_text = extract_text_from_pdf(f, file_hash=get_file_hash(cv_file))
-                if cv_text:
-                    cv_texts.append(f"File: {os.path.basename(cv_file)}\n\n{cv_text}")
-                else:
-                    st.warning(
-                        f"Could not extract text from {os.path.basename(cv_file)}"
-                    )
-        except Exception as e:
-            st.error(f"Error processing {os.path.basename(cv_file)}: {str(e)}")
+MATCH_STAGES = {
+    "queued": "Waiting for a free worker...",
+    "starting": "Starting...",
+    "matching": "Analyzing CVs and matching with project requirements...",
+    "escalating": "Re-evaluating borderline employees with the stronger model...",
+    "generating_cvs": "Writing customized CVs...",
+    "past_projects": "Analyzing past projects...",
+}
 
-    return cv_texts
 
+def show_match_result(result):
+    """Display a finished match and keep its results in the session."""
+    for message in result["notes"]:
+        getattr(st, message["level"])(message["message"])
 
-if st.button("Match Project with Team CVs", type="primary"):
-    if not project_description:
-        st.error("Please enter a project description.")
-    elif len(cv_files) == 0 and len(json_files) == 0:
-        st.error(
-            f"No CV files found. Please upload some CVs first or convert PDFs to JSON."
+    st.session_state.rendered_cv_pdfs = result["cv_pdfs"]
+    for name, pdf_data in result["cv_pdfs"].items():
+        save_cv_pdf(name, pdf_data)
+
+    usage = result["usage"]
+    if usage:
+        st.caption(
+            f"Prompt tokens: {usage['prompt_tokens']} (cached: {usage['cached_tokens']}), "
+            f"completion tokens: {usage['completion_tokens']}"
         )
-    else:
-        with st.spinner(f"Analyzing CVs and matching with project requirements..."):
-            try:
-                if len(json_files) > 0 and cv_json_data:
-                    st.info("Using JSON CV data for matching")
-                    cv_text_for_matching = json_cv_text
-                else:
-                    st.info(
-                        "Using PDF CV data for matching (consider converting to JSON for better performance)"
-                    )
-                    cv_texts = read_all_cv_pdfs(directory_hash=cv_dir_hash)
 
-                    if not cv_texts:
-                        st.error(
-                            "Failed to extract text from any CV files. Please check the files and try again."
-                        )
-                        st.stop()
+    response = result["response"]
+    st.session_state.last_matching_result = response
+    st.session_state.last_match_cv_json_list = result["cv_json_list"]
+
+    past_projects = result["past_projects"]
+    if past_projects is not None:
+        qualified_employees = past_projects["qualified_employees"]
+        if past_projects["analysis"]:
+            st.info(f"Employees reaching the match threshold: {len(qualified_employees)}")
+            st.info(f"Employee names: {', '.join([emp['name'] for emp in qualified_employees])}")
+
+            json_data = past_projects["employee_projects"]
+            if json_data:
+                # Save individual JSON files for each employee
+                file_paths = save_employee_json_files(json_data)
+
+                # Display information about created files
+                if file_paths:
+                    st.success(f"Created {len(file_paths)} employee JSON files:")
+
+                    # Generate PDF files for each employee
+                    generate_employee_project_pdfs(json_data)
+
+                    # Create columns for JSON and PDF downloads
+                    for i, path in enumerate(file_paths):
+                        col1, col2 = st.columns(2)
+
+                        # Display JSON file info and download button
+                        with col1:
+                            st.code(path)
+                            with open(path, 'r') as f:
+                                file_content = f.read()
+
+                            employee_name = os.path.basename(path).replace('.json', '').replace('_', ' ')
+                            st.download_button(
+                                label=f"Download {employee_name}'s JSON",
+                                data=file_content,
+                                file_name=os.path.basename(path),
+                                mime="application/json"
+                            )
 
-                    cv_text_for_matching = "\n\n=====\n\n".join(cv_texts)
+                        with col2:
+                            pdf_path = f"employee_projects_pdf/{os.path.basename(path).replace('.json', '_projects.pdf')}"
 
-                excel_data = auto_excel_data
+                            if os.path.exists(pdf_path):
+                                st.code(pdf_path)
+                                with open(pdf_path, 'rb') as f:
+                                    pdf_content = f.read()
 
-                cv_matching_system_prompt = get_cv_matching_prompt(
-                    minimum_match_percentage=min_match_percentage
-                )
+                                st.download_button(
+                                    label=f"Download {employee_name}'s PDF",
+                                    data=pdf_content,
+                                    file_name=os.path.basename(pdf_path),
+                                    mime="application/pdf"
+                                )
+            else:
+                st.warning("No JSON data found in the response. Check if the AI correctly formatted the output.")
+
+            st.session_state.past_project_analysis = past_projects["analysis"]
+            st.success(f"Past project analysis completed with {len(qualified_employees)} employees distributed across matching projects")
+
+        elif past_projects["reason"] == "no_matched_employees":
+            st.warning(past_projects["message"])
+            st.info("Please try again with a different project description or check your CV data and the AI's output format.")
+
+            # Display the raw response for debugging this specific error
+            st.markdown("### Raw CV Matching Response (for debugging 'Matched employees extracted: 0'):")
+            st.text_area(
+                "CV Matching AI Output:",
+                value=response,
+                height=300,
+                key="debug_cv_matching_response_for_extraction_error"
+            )
+            st.stop()  # Stop execution of the current app run
 
-                matching_prompt = (
-                    f"Project Description:\n\n{project_description}\n\n"
-                    f"CV Data:\n\n{cv_text_for_matching}"
-                )
+        elif past_projects["reason"] == "no_qualified_employees":
+            st.warning(past_projects["message"])
 
-                if excel_data:
-                    matching_prompt += f"\n\nExcel Data:\n{excel_data}"
+        elif past_projects["reason"] == "error":
+            st.error(past_projects["message"])
+            st.info("Proceeding with CV matching results only.")
 
-                response = backend.generate_response(
-                    prompt=matching_prompt,
-                    model=selected_model,
-                    system_prompt=cv_matching_system_prompt,
-                )
-                
-                st.session_state.last_matching_result = response
-                
-                # Analyze past projects
-                if past_project_min_similarity > 0:
-                    with st.spinner("Analyzing past projects..."):
-                        try:
-                            # Pass the CV matching results to the past project analyzer
-                            past_project_analysis = analyze_past_projects(
-                                project_description, 
-                                min_similarity=past_project_min_similarity/100.0,
-                                matching_result=response
-                            )
-                            
-                            # Add debug output to show what's happening
-                            st.info(f"Raw past project analysis result received. Length: {len(past_project_analysis) if past_project_analysis else 0}")
-                            
-                            if past_project_analysis and "No past project data found" not in past_project_analysis:
-                                # Extract matched employees from the CV matching results
-                                matched_employees = extract_matched_employees(response)
-                                
-                                # Add debug output for matched employees
-                                st.info(f"Matched employees extracted: {len(matched_employees) if matched_employees else 0}")
-                                if matched_employees:
-                                    st.info(f"Employee names: {', '.join([emp['name'] for emp in matched_employees])}")
-                                
-                                # Fall back to hard-coded employees if none found
-                                if not matched_employees or len(matched_employees) == 0:
-                                    st.warning("No employees found in the CV matching response. Cannot proceed with employee assignment for past project analysis.")
-                                    st.info("Please try again with a different project description or check your CV data and the AI's output format.")
-                                    
-                                    # Display the raw response for debugging this specific error
-                                    st.markdown("### Raw CV Matching Response (for debugging 'Matched employees extracted: 0'):")
-                                    st.text_area(
-                                        "CV Matching AI Output:", 
-                                        value=response, 
-                                        height=300,
-                                        key="debug_cv_matching_response_for_extraction_error"
-                                    )
-                                    st.stop()  # Stop execution of the current app run
-                                
-                                # Post-process the response to add matched employees to each project
-                                past_project_analysis = post_process_response(past_project_analysis, matched_employees)
-                                
-                                # Extract JSON from response
-                                json_data = extract_json_from_analysis(past_project_analysis)
-                                
-                                if json_data:
-                                    # Save individual JSON files for each employee
-                                    file_paths = save_employee_json_files(json_data)
-                                    
-                                    # Display information about created files
-                                    if file_paths:
-                                        st.success(f"Created {len(file_paths)} employee JSON files:")
-                                        
-                                        # Generate PDF files for each employee
-                                        pdf_paths = generate_employee_project_pdfs(json_data=json_data)
-                                        
-                                        # Create columns for JSON and PDF downloads
-                                        for i, path in enumerate(file_paths):
-                                            col1, col2 = st.columns(2)
-                                            
-                                            # Display JSON file info and download button
-                                            with col1:
-                                                st.code(path)
-                                                with open(path, 'r') as f:
-                                                    file_content = f.read()
-                                                
-                                                employee_name = os.path.basename(path).replace('.json', '').replace('_', ' ')
-                                                st.download_button(
-                                                    label=f"Download {employee_name}'s JSON",
-                                                    data=file_content,
-                                                    file_name=os.path.basename(path),
-                                                    mime="application/json"
-                                                )
-                                            
-                                            with col2:
-                                                pdf_path = f"employee_projects_pdf/{os.path.basename(path).replace('.json', '_projects.pdf')}"
-                                                
-                                                if os.path.exists(pdf_path):
-                                                    st.code(pdf_path)
-                                                    with open(pdf_path, 'rb') as f:
-                                                        pdf_content = f.read()
-                                                    
-                                                    st.download_button(
-                                                        label=f"Download {employee_name}'s PDF",
-                                                        data=pdf_content,
-                                                        file_name=os.path.basename(pdf_path),
-                                                        mime="application/pdf"
-                                                    )
-                                else:
-                                    st.warning("No JSON data found in the response. Check if the AI correctly formatted the output.")
-                                
-                                st.session_state.past_project_analysis = past_project_analysis
-                                st.success(f"Past project analysis completed with {len(matched_employees)} employees distributed across matching projects")
-                                
-                            else:
-                                st.warning("No similar past projects found or no project data available")
-                                st.code(past_project_analysis[:500] + "..." if past_project_analysis and len(past_project_analysis) > 500 else past_project_analysis)
-                                
-                        except Exception as e:
-                            st.error(f"Error analyzing past projects: {str(e)}")
-                            import traceback
-                            st.code(traceback.format_exc())
-                            st.info("Proceeding with CV matching results only.")
+        else:
+            message = past_projects["message"]
+            st.warning("No similar past projects found or no project data available")
+            st.code(message[:500] + "..." if len(message) > 500 else message)
 
-                st.markdown("### Matching Results:")
-                st.markdown(
-                    f'<div class="response-container">{response}</div>',
-                    unsafe_allow_html=True,
-                )
+    st.markdown("### Matching Results:")
+    st.markdown(
+        f'<div class="response-container">{response}</div>',
+        unsafe_allow_html=True,
+    )
 
+
+match_col, rerun_col = st.columns([3, 1])
+match_clicked = match_col.button("Match Project with Team CVs", type="primary")
+# Identical inputs return the finished job again; this starts a fresh one instead.
+rerun_clicked = rerun_col.button("Re-run Match", help="Run the match again even if these inputs were matched before")
+if match_clicked or rerun_clicked:
+    # A click always shows the job, also when it is the one already on the page.
+    st.session_state.pop("shown_match_job_id", None)
+    if not project_description:
+        st.error("Please enter a project description.")
+    elif len(cv_files) == 0 and len(json_files) == 0:
+        st.error(
+            f"No CV files found. Please upload some CVs first or convert PDFs to JSON."
+        )
+    else:
+        try:
+            # Matches run as background jobs; the job id is kept in the URL so a
+            # reloaded page attaches to the running job instead of starting over.
+            match_job_id = matching_client.submit_match(
+                project_description,
+                model=selected_model,
+                min_match_percentage=min_match_percentage,
+                past_project_min_similarity=past_project_min_similarity,
+                render_pdfs=PDF_GENERATION_AVAILABLE,
+                force=rerun_clicked,
+            )
+            st.session_state.match_job_id = match_job_id
+            st.query_params["job"] = match_job_id
+        except MatchingServiceError as e:
+            st.error(f"Error during CV matching: {str(e)}")
+
+match_job_id = st.session_state.get("match_job_id") or st.query_params.get("job")
+if match_job_id and st.session_state.get("shown_match_job_id") != match_job_id:
+    try:
+        job = matching_client.get_job(match_job_id)
+    except MatchingServiceError as e:
+        job = None
+        st.error(f"Error during CV matching: {str(e)}")
+
+    if job is None:
+        st.session_state.pop("match_job_id", None)
+        st.query_params.pop("job", None)
+    elif job["status"] in ("queued", "running"):
+        st.progress(job["progress"], text=MATCH_STAGES.get(job["stage"], job["stage"]))
+        if job["detail"]:
+            st.info(job["detail"])
+        time.sleep(1)
+        st.rerun()
+    else:
+        st.session_state.match_job_id = match_job_id
+        st.session_state.shown_match_job_id = match_job_id
+        if job["status"] == "failed":
+            st.error(f"Error during CV matching: {job['error']}")
+        else:
+            try:
+                show_match_result(job["result"])
+                st.session_state.last_match_job_id = match_job_id
+                if job["result"].get("client_letter"):
+                    st.session_state.setdefault("client_letters", {})[match_job_id] = job["result"]["client_letter"]
             except Exception as e:
                 st.error(f"Error during CV matching: {str(e)}")
                 if debug_mode:
@@ -555,6 +471,27 @@ if st.button("Match Project with Team CVs", type="primary"):
                         unsafe_allow_html=True,
                     )
 
+if st.session_state.get("last_match_job_id"):
+    # The letter is only written when asked for; the service keeps it with the match job.
+    letter_job_id = st.session_state.last_match_job_id
+    client_letters = st.session_state.setdefault("client_letters", {})
+    if letter_job_id not in client_letters and st.button("Write Client Letter"):
+        with st.spinner("Writing the client letter..."):
+            try:
+                client_letters[letter_job_id] = matching_client.client_letter(letter_job_id)
+            except MatchingServiceError as e:
+                st.error(f"Error writing the client letter: {str(e)}")
+
+    if letter_job_id in client_letters:
+        st.markdown("### Client Letter:")
+        st.text_area("Client Letter", value=client_letters[letter_job_id], height=400, label_visibility="collapsed")
+        st.download_button(
+            label="Download Client Letter",
+            data=client_letters[letter_job_id],
+            file_name="client_letter.txt",
+            mime="text/plain",
+        )
+
 if "past_project_analysis" in st.session_state:
     st.markdown("### Past Project Analysis:")
     st.markdown(
@@ -578,10 +515,8 @@ if "last_matching_result" in st.session_state:
                 )
                 debug_for_extraction = debug_mode or enable_debug
 
-                st.info("Extracting customized CVs from the response...")
-                cv_json_list = extract_json_from_response(
-                    st.session_state.last_matching_result, debug=debug_for_extraction
-                )
+                # The matching service already extracted the customized CVs.
+                cv_json_list = st.session_state.get("last_match_cv_json_list")
 
                 if cv_json_list and len(cv_json_list) > 0:
                     st.session_state.extracted_cv_json_list = cv_json_list
@@ -651,47 +586,34 @@ if "extracted_cv_json_list" in st.session_state and PDF_GENERATION_AVAILABLE:
 
                     with col2:
                         pdf_button_key = f"gen_pdf_{i}"
-                        if st.button(
+                        rendered_pdf = rendered_cv_pdf(cv_json)
+                        if rendered_pdf:
+                            st.download_button(
+                                label=f"Download {employee_name} PDF CV",
+                                data=rendered_pdf,
+                                file_name=f"{employee_name}_CV.pdf",
+                                mime="application/pdf",
+                                key=f"rendered_pdf_{i}",
+                            )
+                        elif st.button(
                             f"Generate PDF CV for {employee_name}", key=pdf_button_key
                         ):
                             try:
                                 with st.spinner(
                                     f"Generating PDF CV for {employee_name}..."
                                 ):
-                                    with tempfile.NamedTemporaryFile(
-                                        delete=False, suffix=".pdf"
-                                    ) as tmp_file:
-                                        pdf_path = create_cv_pdf(
-                                            cv_json,
-                                            tmp_file.name,
-                                            debug=(
-                                                debug_mode
-                                                or st.checkbox(
-                                                    "Enable debug for PDF generation",
-                                                    key=f"debug_pdf_{i}",
-                                                )
-                                            ),
-                                        )
-
-                                        with open(pdf_path, "rb") as pdf_file:
-                                            pdf_data = pdf_file.read()
-
-                                        permanent_path = os.path.join(
-                                            pdf_dir, f"{employee_name}_CV.pdf"
-                                        )
-                                        create_cv_pdf(
-                                            cv_json, permanent_path, debug=debug_mode
-                                        )
-
-                                        st.success(
-                                            f"PDF CV for {employee_name} generated successfully"
-                                        )
-                                        st.download_button(
-                                            label=f"Download {employee_name} PDF CV",
-                                            data=pdf_data,
-                                            file_name=f"{employee_name}_CV.pdf",
-                                            mime="application/pdf",
-                                        )
+                                    pdf_data = matching_client.render_cv_pdf(cv_json)
+                                    save_cv_pdf(cv_json.get("name", "cv"), pdf_data)
+
+                                    st.success(
+                                        f"PDF CV for {employee_name} generated successfully"
+                                    )
+                                    st.download_button(
+                                        label=f"Download {employee_name} PDF CV",
+                                        data=pdf_data,
+                                        file_name=f"{employee_name}_CV.pdf",
+                                        mime="application/pdf",
+                                    )
                             except Exception as e:
                                 error_msg = str(e)
                                 st.error(f"Error generating PDF: {error_msg}")
@@ -725,31 +647,27 @@ if "extracted_cv_json_list" in st.session_state and PDF_GENERATION_AVAILABLE:
                 )
 
             with col2:
-                if st.button("Generate PDF CV"):
+                rendered_pdf = rendered_cv_pdf(cv_json)
+                if rendered_pdf:
+                    st.download_button(
+                        label="Download PDF CV",
+                        data=rendered_pdf,
+                        file_name=f"{employee_name}_CV.pdf",
+                        mime="application/pdf",
+                    )
+                elif st.button("Generate PDF CV"):
                     try:
                         with st.spinner("Generating PDF CV..."):
-                            with tempfile.NamedTemporaryFile(
-                                delete=False, suffix=".pdf"
-                            ) as tmp_file:
-                                pdf_path = create_cv_pdf(
-                                    cv_json, tmp_file.name, debug=debug_mode
-                                )
-
-                                with open(pdf_path, "rb") as pdf_file:
-                                    pdf_data = pdf_file.read()
-
-                                permanent_path = os.path.join(
-                                    pdf_dir, f"{employee_name}_CV.pdf"
-                                )
-                                create_cv_pdf(cv_json, permanent_path, debug=debug_mode)
-
-                                st.success(f"PDF CV generated successfully")
-                                st.download_button(
-                                    label="Download PDF CV",
-                                    data=pdf_data,
-                                    file_name=f"{employee_name}_CV.pdf",
-                                    mime="application/pdf",
-                                )
+                            pdf_data = matching_client.render_cv_pdf(cv_json)
+                            save_cv_pdf(cv_json.get("name", "cv"), pdf_data)
+
+                            st.success(f"PDF CV generated successfully")
+                            st.download_button(
+                                label="Download PDF CV",
+                                data=pdf_data,
+                                file_name=f"{employee_name}_CV.pdf",
+                                mime="application/pdf",
+                            )
                     except Exception as e:
                         error_msg = str(e)
                         st.error(f"Error generating PDF: {error_msg}")
@@ -770,12 +688,8 @@ if "extracted_cv_json_list" in st.session_state and PDF_GENERATION_AVAILABLE:
                     with st.spinner("Generating PDFs for all employees..."):
                         pdf_paths = []
                         for cv_json in cv_json_list:
-                            employee_name = cv_json.get("name", "cv").replace(" ", "_")
-                            permanent_path = os.path.join(
-                                pdf_dir, f"{employee_name}_CV.pdf"
-                            )
-                            create_cv_pdf(cv_json, permanent_path, debug=debug_mode)
-                            pdf_paths.append(permanent_path)
+                            pdf_data = matching_client.render_cv_pdf(cv_json)
+                            pdf_paths.append(save_cv_pdf(cv_json.get("name", "cv"), pdf_data))
 
                         st.success(f"Generated {len(pdf_paths)} PDF CVs successfully")
                         st.info(f"PDF files saved to {pdf_dir} directory")
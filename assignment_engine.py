@@ -0,0 +1,70 @@
+import math
+from lazy_imports import lazy_import
+
+np = lazy_import("numpy")
+optimize = lazy_import("scipy.optimize")
+
+SKILL_WEIGHT = 0.6
+FIT_WEIGHT = 0.4
+
+
+def technology_fit(project_technologies, employee_technologies):
+    """Projects x employees matrix of Dice coefficients between technology lists."""
+    vocabulary = {}
+    for technologies in list(project_technologies) + list(employee_technologies):
+        for tech in technologies:
+            vocabulary.setdefault(tech.lower(), len(vocabulary))
+
+    def incidence(technology_lists):
+        matrix = np.zeros((len(technology_lists), max(1, len(vocabulary))))
+        for row, technologies in enumerate(technology_lists):
+            for tech in technologies:
+                matrix[row, vocabulary[tech.lower()]] = 1.0
+        return matrix
+
+    projects = incidence(list(project_technologies))
+    employees = incidence(list(employee_technologies))
+    overlap = projects @ employees.T
+    sizes = projects.sum(axis=1)[:, None] + employees.sum(axis=1)[None, :]
+    return np.divide(2 * overlap, sizes, out=np.zeros_like(overlap), where=sizes > 0)
+
+
+def score_matrix(project_similarity, employee_skill, fit=None):
+    """Suitability of each employee for each project, in [0, 1].
+
+    Skill and technology fit are scaled by the project's similarity, so the
+    strongest employees go to the most similar projects.
+    """
+    similarity = np.asarray(project_similarity, dtype=float)[:, None]
+    skill = np.asarray(employee_skill, dtype=float)[None, :]
+    if fit is None:
+        fit = np.zeros((similarity.shape[0], skill.shape[1]))
+    return similarity * (SKILL_WEIGHT * skill + FIT_WEIGHT * np.asarray(fit, dtype=float))
+
+
+def assign(scores, capacity=None):
+    """Optimal assignment of projects (rows) to employees (columns).
+
+    Each employee takes at most `capacity` projects (an int or one value per
+    employee); by default just enough for every project to be covered.
+    Returns the employee index for every project, -1 where none is left.
+    """
+    scores = np.asarray(scores, dtype=float)
+    num_projects, num_employees = scores.shape
+    assignment = np.full(num_projects, -1)
+    if num_projects == 0 or num_employees == 0:
+        return assignment
+
+    if capacity is None:
+        capacity = math.ceil(num_projects / num_employees)
+    capacity = np.minimum(np.broadcast_to(capacity, num_employees), num_projects)
+
+    # One column per project slot of an employee; later slots cost slightly more,
+    # so projects are spread over employees before anyone gets a second one.
+    slots = np.repeat(np.arange(num_employees), capacity)
+    slot_rank = np.concatenate([np.arange(count) for count in capacity]) if len(slots) else slots
+    cost = -scores[:, slots] + 1e-9 * slot_rank
+
+    rows, columns = optimize.linear_sum_assignment(cost)
+    assignment[rows] = slots[columns]
+    return assignment
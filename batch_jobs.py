@@ -0,0 +1,261 @@
+import os
+import json
+import time
+import uuid
+import threading
+from datetime import datetime
+
+DEFAULT_WORK_DIR = "batch_jobs"
+CHAT_COMPLETIONS_URL = "/v1/chat/completions"
+# Seconds run_batch waits for a batch to finish; the Batch API's completion window is 24 hours.
+BATCH_TIMEOUT = float(os.getenv("BATCH_TIMEOUT", str(25 * 3600)))
+
+
+def build_batch_request(custom_id, prompt, system_prompt, model="gpt-4o-mini", max_tokens=8000, temperature=0.7, response_format=None):
+    """One line of a Batch API input file, mirroring OpenAIBackend.generate_response."""
+    request = {
+        "custom_id": custom_id,
+        "method": "POST",
+        "url": CHAT_COMPLETIONS_URL,
+        "body": {
+            "model": model,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": prompt},
+            ],
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+        },
+    }
+    if response_format:
+        request["body"]["response_format"] = response_format
+    return request
+
+
+def write_batch_file(requests, path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        for request in requests:
+            f.write(json.dumps(request, ensure_ascii=False) + "\n")
+    return path
+
+
+def parse_batch_output(lines):
+    """Map custom_id -> message content (or an "Error: ..." string like generate_response)."""
+    results = {}
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        entry = json.loads(line)
+        custom_id = entry.get("custom_id")
+        response = entry.get("response") or {}
+        error = entry.get("error")
+
+        if error or response.get("status_code") != 200:
+            message = (error or {}).get("message") or json.dumps(response.get("body"))
+            results[custom_id] = f"Error: {message}"
+            continue
+
+        try:
+            results[custom_id] = response["body"]["choices"][0]["message"]["content"]
+        except (KeyError, IndexError, TypeError) as e:
+            results[custom_id] = f"Error: Unexpected batch result format ({str(e)})"
+
+    return results
+
+
+class OpenAIBatchClient:
+    """Submits JSONL request files to the OpenAI Batch API."""
+
+    def __init__(self, client=None):
+        if client is None:
+            from openai_backend import OpenAIBackend
+            client = OpenAIBackend().client
+        self.client = client
+
+    def submit(self, batch_file_path, metadata=None):
+        with open(batch_file_path, "rb") as f:
+            input_file = self.client.files.create(file=f, purpose="batch")
+
+        batch = self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint=CHAT_COMPLETIONS_URL,
+            completion_window="24h",
+            metadata=metadata,
+        )
+        return batch.id
+
+    def retrieve(self, batch_id):
+        batch = self.client.batches.retrieve(batch_id)
+        return {
+            "id": batch.id,
+            "status": batch.status,
+            "output_file_id": batch.output_file_id,
+            "error_file_id": batch.error_file_id,
+        }
+
+    def results(self, batch_id):
+        batch = self.retrieve(batch_id)
+        lines = []
+        for file_id in (batch["output_file_id"], batch["error_file_id"]):
+            if file_id:
+                lines.extend(self.client.files.content(file_id).text.splitlines())
+        return parse_batch_output(lines)
+
+
+class LocalBatchClient:
+    """Stand-in for the Batch API that runs the requests in-process.
+
+    It keeps the same submit / retrieve / results interface and writes the same
+    output file format, so bulk jobs can be exercised without the real API.
+    `responder(prompt, system_prompt, model, response_format)` produces each answer; by default
+    the requests go through the shared scheduler as background traffic.
+    """
+
+    def __init__(self, work_dir=DEFAULT_WORK_DIR, responder=None):
+        self.work_dir = work_dir
+        self.responder = responder or self._scheduler_responder
+        self._threads = {}
+        os.makedirs(work_dir, exist_ok=True)
+
+    @staticmethod
+    def _scheduler_responder(prompt, system_prompt, model, response_format=None):
+        from llm_scheduler import get_scheduler
+        return get_scheduler().generate_response(
+            prompt=prompt,
+            model=model,
+            system_prompt=system_prompt,
+            priority="background",
+            response_format=response_format,
+        )
+
+    def _state_path(self, batch_id):
+        return os.path.join(self.work_dir, f"{batch_id}.state.json")
+
+    def _output_path(self, batch_id):
+        return os.path.join(self.work_dir, f"{batch_id}_output.jsonl")
+
+    def _write_state(self, batch_id, state):
+        # Write-then-rename so a concurrent retrieve() never sees a partial file.
+        tmp_path = self._state_path(batch_id) + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, self._state_path(batch_id))
+
+    def submit(self, batch_file_path, metadata=None):
+        batch_id = f"batch_local_{uuid.uuid4().hex[:12]}"
+        self._write_state(batch_id, {
+            "id": batch_id,
+            "status": "validating",
+            "input_file": batch_file_path,
+            "output_file_id": None,
+            "error_file_id": None,
+            "metadata": metadata,
+            "created_at": datetime.now().isoformat(),
+        })
+
+        thread = threading.Thread(target=self._run, args=(batch_id, batch_file_path), daemon=True)
+        self._threads[batch_id] = thread
+        thread.start()
+        return batch_id
+
+    def _run(self, batch_id, batch_file_path):
+        state = self.retrieve(batch_id)
+        state["status"] = "in_progress"
+        self._write_state(batch_id, state)
+        try:
+            self._write_output(batch_file_path, self._output_path(batch_id))
+        except Exception as e:
+            # A batch left "in_progress" would be polled forever.
+            state["status"] = "failed"
+            state["error"] = str(e)
+            self._write_state(batch_id, state)
+            return
+
+        state["status"] = "completed"
+        state["output_file_id"] = self._output_path(batch_id)
+        self._write_state(batch_id, state)
+
+    def _write_output(self, batch_file_path, output_path):
+        with open(batch_file_path, "r", encoding="utf-8") as f_in, \
+                open(output_path, "w", encoding="utf-8") as f_out:
+            for line in f_in:
+                if not line.strip():
+                    continue
+                request = json.loads(line)
+                body = request["body"]
+                messages = {message["role"]: message["content"] for message in body["messages"]}
+                entry = {"id": f"batch_req_{uuid.uuid4().hex[:12]}", "custom_id": request["custom_id"]}
+
+                try:
+                    content = self.responder(
+                        messages.get("user", ""),
+                        messages.get("system", ""),
+                        body.get("model"),
+                        body.get("response_format"),
+                    )
+                    entry["response"] = {
+                        "status_code": 200,
+                        "body": {"choices": [{"index": 0, "message": {"role": "assistant", "content": content}}]},
+                    }
+                    entry["error"] = None
+                except Exception as e:
+                    entry["response"] = None
+                    entry["error"] = {"code": "local_error", "message": str(e)}
+
+                f_out.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def retrieve(self, batch_id):
+        with open(self._state_path(batch_id), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def results(self, batch_id):
+        batch = self.retrieve(batch_id)
+        if not batch["output_file_id"]:
+            return {}
+        with open(batch["output_file_id"], "r", encoding="utf-8") as f:
+            return parse_batch_output(f.readlines())
+
+
+def get_batch_client(local=None):
+    """Real Batch API client, or the local stand-in when BATCH_CLIENT=local."""
+    if local is None:
+        local = os.getenv("BATCH_CLIENT", "openai").lower() == "local"
+    return LocalBatchClient() if local else OpenAIBatchClient()
+
+
+def run_batch(requests, batch_client=None, work_dir=None, poll_interval=30, debug=False, timeout=None):
+    """Write, submit and poll a batch; returns custom_id -> response text.
+
+    Raises TimeoutError if the batch has not finished after `timeout`
+    seconds (BATCH_TIMEOUT by default).
+    """
+    batch_client = batch_client or get_batch_client()
+    work_dir = work_dir or getattr(batch_client, "work_dir", DEFAULT_WORK_DIR)
+    timeout = BATCH_TIMEOUT if timeout is None else timeout
+
+    # Unique per batch: several batches may be submitted within the same second.
+    batch_file = os.path.join(
+        work_dir, f"requests_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:12]}.jsonl"
+    )
+    write_batch_file(requests, batch_file)
+    batch_id = batch_client.submit(batch_file)
+    print(f"Submitted batch {batch_id} with {len(requests)} request(s)")
+
+    terminal_states = {"completed", "failed", "expired", "cancelled"}
+    deadline = time.monotonic() + timeout
+    while True:
+        batch = batch_client.retrieve(batch_id)
+        if batch["status"] in terminal_states:
+            break
+        if time.monotonic() >= deadline:
+            raise TimeoutError(f"Batch {batch_id} did not finish within {timeout:g} seconds (status {batch['status']})")
+        if debug:
+            print(f"Batch {batch_id} status: {batch['status']}")
+        time.sleep(min(poll_interval, max(0.0, deadline - time.monotonic())))
+
+    if batch["status"] != "completed":
+        print(f"Batch {batch_id} finished with status {batch['status']}")
+
+    return batch_client.results(batch_id)
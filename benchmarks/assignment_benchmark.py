@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""Time the assignment engine on random staffing matrices.
+
+Run from the repository root: python benchmarks/assignment_benchmark.py
+"""
+
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from assignment_engine import assign, score_matrix
+
+# (projects, employees, capacity); capacity None covers every project
+CASES = [
+    (15, 40, None),
+    (100, 1000, None),
+    (1000, 100, 1),
+    (1000, 100, 2),
+    (1000, 100, None),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark assignment_engine.assign")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per case (the best is reported)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    print(f"{'projects':>9} {'employees':>10} {'capacity':>9} {'assigned':>9} {'best ms':>9}")
+    for num_projects, num_employees, capacity in CASES:
+        scores = score_matrix(
+            rng.random(num_projects),
+            rng.random(num_employees),
+            rng.random((num_projects, num_employees)),
+        )
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            assignment = assign(scores, capacity=capacity)
+            timings.append(time.perf_counter() - start)
+        print(
+            f"{num_projects:>9} {num_employees:>10} {str(capacity or 'auto'):>9} "
+            f"{int((assignment >= 0).sum()):>9} {min(timings) * 1000:>9.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""Measure the memory a loaded CV corpus keeps resident: plain dicts vs CompactCV.
+
+The JSON CVs in CV_json are repeated (with distinct names) up to the corpus
+size. "dicts" is what the corpus held before: every parsed JSON document plus
+the combined prompt text built from them. "compact" is the CompactCV records
+the corpus holds now; the prompt text is built per match and not kept.
+The time and peak memory of building that prompt text from the compact
+records are reported too; both should grow linearly with the corpus size.
+
+Run from the repository root: python benchmarks/cv_memory_benchmark.py
+"""
+
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from cv_corpus import build_cv_text
+from cv_store import CompactCV, decoded_cache
+
+
+def sample_documents(size):
+    templates = []
+    for path in sorted(glob.glob(os.path.join(ROOT, "CV_json", "*.json"))):
+        with open(path, "r", encoding="utf-8") as f:
+            templates.append(f.read())
+    if not templates:
+        raise SystemExit("No JSON CVs found in CV_json")
+    for number in range(size):
+        cv = json.loads(templates[number % len(templates)])
+        cv["name"] = f"{cv['name']} {number}"
+        yield json.dumps(cv)
+
+
+def resident(load, documents):
+    tracemalloc.start()
+    kept = load(documents)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return current
+
+
+def load_dicts(documents):
+    cvs = [json.loads(document) for document in documents]
+    return cvs, build_cv_text(cvs)
+
+
+def load_compact(documents):
+    return [CompactCV.from_dict(json.loads(document)) for document in documents]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare resident memory of plain and compact CV records")
+    parser.add_argument("--size", type=int, default=10000, help="Number of CVs")
+    args = parser.parse_args()
+
+    documents = list(sample_documents(args.size))
+    dicts = resident(load_dicts, documents)
+    compact = resident(load_compact, documents)
+    print(f"{args.size} CVs: dicts {dicts / 2**20:.1f} MiB, compact {compact / 2**20:.1f} MiB ({dicts / compact:.1f}x smaller)")
+
+    records = load_compact(documents)
+    decoded_cache.clear()
+    tracemalloc.start()
+    start = time.perf_counter()
+    text = build_cv_text(records)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f"prompt text: {len(text) / 2**20:.1f} MiB in {elapsed:.2f}s, peak {peak / 2**20:.1f} MiB "
+        f"(decoded cache {decoded_cache.max_bytes / 2**20:.0f} MiB)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""Compare CV lookups through the CV store with a scan of the JSON directory.
+
+Synthetic CVs are written to a temporary directory for each corpus size. The
+scan reads every JSON file the way the old directory-based loader did; the
+store lookups should stay well under a millisecond whatever the corpus size.
+
+Run from the repository root: python benchmarks/cv_store_benchmark.py
+"""
+
+import os
+import sys
+import glob
+import json
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cv_store import CVStore
+
+TECHNOLOGIES = ["Java", "Spring Boot", "Angular", "React", "Python", "Django", "PostgreSQL", "Docker", "Kubernetes", "PHP"]
+
+
+def write_corpus(directory, size):
+    rng = random.Random(size)
+    for number in range(size):
+        skills = rng.sample(TECHNOLOGIES, 4)
+        cv = {
+            "filename": f"employee_{number}.pdf",
+            "name": f"Employee {number}",
+            "raw_text": f"Employee {number}\nSkills: {', '.join(skills)}\n" + "Delivered projects for clients. " * 40,
+            "sections": {"skills": ", ".join(skills), "experience": "Delivered projects for clients. " * 40},
+        }
+        with open(os.path.join(directory, f"employee_{number}.json"), "w", encoding="utf-8") as f:
+            json.dump(cv, f)
+
+
+def scan(directory):
+    cvs = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.json"))):
+        with open(path, "r", encoding="utf-8") as f:
+            cvs.append(json.load(f))
+    return cvs
+
+
+def best_of(function, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark CV store lookups against directory scans")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 5000], help="Corpus sizes")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement (the best is reported)")
+    args = parser.parse_args()
+
+    print(f"{'CVs':>6} {'scan':>10} {'sync':>10} {'by name':>10} {'by tech':>10} {'search':>10}   (ms)")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            write_corpus(directory, size)
+            store = CVStore(os.path.join(directory, "cv_store.sqlite3"))
+            store.sync_directory(directory)
+            name = f"Employee {size // 2}"
+
+            scan_ms = best_of(lambda: [cv for cv in scan(directory) if cv["name"] == name], args.repeat)
+            sync_ms = best_of(lambda: store.sync_directory(directory), args.repeat)
+            name_ms = best_of(lambda: store.get(name), args.repeat * 20)
+            tech_ms = best_of(lambda: store.with_technologies(["Kubernetes", "Django", "PHP", "React"]), args.repeat * 20)
+            search_ms = best_of(lambda: store.search("Kubernetes", limit=10), args.repeat * 20)
+            print(f"{size:>6} {scan_ms:>10.2f} {sync_ms:>10.2f} {name_ms:>10.3f} {tech_ms:>10.3f} {search_ms:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
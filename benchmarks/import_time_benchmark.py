@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""Report the cold import time of the entry points with python -X importtime.
+
+Every module is imported in a fresh interpreter. The report lists the total
+import time and the slowest modules it imports directly, so a
+heavy dependency that sneaks back onto the start-up path shows up here.
+
+Run from the repository root: python benchmarks/import_time_benchmark.py
+"""
+
+import os
+import sys
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENTRY_POINTS = [
+    "app",
+    "process_cv_matches",
+    "cv_to_json",
+    "json_to_pdf",
+    "past_project_analyzer",
+]
+
+
+def import_times(module):
+    """(total microseconds, {direct import: cumulative microseconds}) for one cold import of `module`."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit():
+            entries.append((name.strip(), int(cumulative), len(name) - len(name.lstrip())))
+
+    # A module is printed after everything it imports, indented one level
+    # deeper; interpreter start-up (site, .pth files) comes before the subtree.
+    position = max(i for i, (name, _, _) in enumerate(entries) if name == module)
+    _, total, indent = entries[position]
+    children = {}
+    for name, cumulative, child_indent in reversed(entries[:position]):
+        if child_indent <= indent:
+            break
+        if child_indent == indent + 2:
+            children[name] = cumulative
+    return total, children
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report cold import times of the entry points")
+    parser.add_argument("modules", nargs="*", default=ENTRY_POINTS, help="Modules to import (default: entry points)")
+    parser.add_argument("--repeat", type=int, default=3, help="Imports per module (the best is reported)")
+    parser.add_argument("--top", type=int, default=5, help="Slowest direct imports to list per module")
+    args = parser.parse_args()
+
+    for module in args.modules:
+        try:
+            runs = [import_times(module) for _ in range(args.repeat)]
+        except RuntimeError as e:
+            print(f"{module}: import failed ({str(e)})")
+            continue
+
+        total, children = min(runs, key=lambda run: run[0])
+        print(f"{module}: {total / 1000:.0f} ms")
+        for name, cumulative in sorted(children.items(), key=lambda item: -item[1])[:args.top]:
+            print(f"    {name:<28} {cumulative / 1000:>8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
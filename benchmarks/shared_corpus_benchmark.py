@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""Per-process memory of the CV corpus with and without the shared corpus mode.
+
+Writes a synthetic JSON CV directory, then starts worker processes one after
+another that each load the corpus through a CorpusRegistry, first without
+and then with the shared corpus mode. Each worker reports the private
+memory that loading added (the prompt text built per match comes on top in
+both modes). In shared mode the first worker loads and publishes the corpus
+image and the others attach to it, so their private memory should stay
+small however large the corpus is.
+
+Run from the repository root: python benchmarks/shared_corpus_benchmark.py
+"""
+
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def private_kib():
+    """Anonymous (heap) memory of this process from /proc/self/smaps_rollup (Linux).
+
+    Pages of a mapped corpus image are file pages shared with every process
+    that maps it, so they are not counted.
+    """
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            if line.startswith("Anonymous:"):
+                return int(line.split()[1])
+    return 0
+
+
+def worker(json_dir, shared):
+    import gc
+    from cv_corpus import CorpusRegistry, build_cv_text
+
+    registry = CorpusRegistry(json_dir=json_dir, pdf_dir=json_dir, excel_dir=json_dir, shared=shared)
+    gc.collect()
+    before = private_kib()
+    snapshot = registry.get("cv_json")
+    gc.collect()
+    loaded = private_kib()
+    text = build_cv_text(snapshot.value)
+    print(json.dumps({"cvs": len(snapshot.items), "load_mib": (loaded - before) / 1024, "text_mib": len(text) / 2**20}))
+
+
+def write_corpus(json_dir, size):
+    from cv_memory_benchmark import sample_documents
+
+    for number, document in enumerate(sample_documents(size)):
+        with open(os.path.join(json_dir, f"cv_{number:06d}.json"), "w", encoding="utf-8") as f:
+            f.write(document)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-process corpus memory with and without sharing")
+    parser.add_argument("--size", type=int, default=10000, help="Number of CVs")
+    parser.add_argument("--workers", type=int, default=4, help="Worker processes per mode")
+    parser.add_argument("--worker", nargs=2, metavar=("JSON_DIR", "SHARED"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args.worker[0], args.worker[1] == "1")
+        return
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    with tempfile.TemporaryDirectory() as temp_dir:
+        json_dir = os.path.join(temp_dir, "CV_json")
+        os.makedirs(json_dir)
+        write_corpus(json_dir, args.size)
+        env = dict(
+            os.environ,
+            SHARED_CORPUS_DIR=os.path.join(temp_dir, "shared"),
+            CV_STORE_DB=os.path.join(temp_dir, "cv_store.sqlite3"),
+            CORPUS_WATCH="0",
+        )
+
+        for shared in ("0", "1"):
+            results = []
+            for _ in range(args.workers):
+                output = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), "--worker", json_dir, shared],
+                    cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+                ).stdout
+                results.append(json.loads(output.strip().splitlines()[-1]))
+            label = "shared" if shared == "1" else "private"
+            print(f"{label:>8}: " + ", ".join(f"{result['load_mib']:.1f}" for result in results) + " MiB per worker")
+        print(f"(prompt text built per match: {results[-1]['text_mib']:.1f} MiB, not included)")
+
+
+if __name__ == "__main__":
+    main()
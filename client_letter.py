@@ -0,0 +1,24 @@
+from cv_matching_prompt import CLIENT_LETTER_SYSTEM_PROMPT, build_client_letter_user_prompt
+from model_cascade import CASCADE_MODEL, CASCADE_SCREEN_MODELS
+
+
+def letter_model(model):
+    """The model that writes the letter of a match run with `model` (the cascade's cheap model for a cascade)."""
+    if model == CASCADE_MODEL:
+        return CASCADE_SCREEN_MODELS[0] if CASCADE_SCREEN_MODELS else "gpt-4o-mini"
+    return model
+
+
+def write_client_letter(scheduler, project_description, matching_result, model="gpt-4o-mini",
+                        excel_data=None, priority="interactive"):
+    """The client message for a finished match; "Error: ..." if the call failed.
+
+    Matches no longer write the letter themselves, so this is the only call
+    that pays for its output tokens, and only when someone asks for it.
+    """
+    return scheduler.generate_response(
+        build_client_letter_user_prompt(project_description, matching_result, excel_data=excel_data),
+        model=letter_model(model),
+        system_prompt=CLIENT_LETTER_SYSTEM_PROMPT,
+        priority=priority,
+    )
@@ -0,0 +1,180 @@
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+import threading
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_IGNORED = 0x00008000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+# File creation is seen through IN_CLOSE_WRITE, so half-written files are never loaded.
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+EVENT_HEADER = struct.Struct("iIII")
+
+POLL_INTERVAL = float(os.getenv("CORPUS_POLL_INTERVAL", "2"))
+# Events arriving within this window (e.g. a folder of CVs being copied) are applied together.
+DEBOUNCE_SECONDS = 0.2
+
+
+class Inotify:
+    """Minimal ctypes binding for Linux inotify; raises OSError where it is not available."""
+
+    def __init__(self):
+        if not sys.platform.startswith("linux"):
+            raise OSError(errno.ENOSYS, "inotify is only available on Linux")
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+
+    def add_watch(self, path, mask=WATCH_MASK):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error), path)
+        return wd
+
+    def read_events(self, timeout):
+        """(watch descriptor, mask) of the events that arrive within `timeout` seconds."""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+
+        events = set()
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset + EVENT_HEADER.size <= len(data):
+                wd, mask, _, name_length = EVENT_HEADER.unpack_from(data, offset)
+                events.add((wd, mask))
+                offset += EVENT_HEADER.size + name_length
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+class CorpusWatcher:
+    """Background thread that keeps a CorpusRegistry current.
+
+    Corpus directories are watched with inotify where available; directories
+    that cannot be watched (other platforms, missing directories, exhausted
+    watch limits) are re-checked every `poll_interval` seconds instead. Each
+    change is applied through registry.refresh(), which reloads only the
+    files that actually changed.
+    """
+
+    def __init__(self, registry, poll_interval=None, use_inotify=True):
+        self.registry = registry
+        self.poll_interval = POLL_INTERVAL if poll_interval is None else poll_interval
+        self.use_inotify = use_inotify
+        self.mode = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="corpus-watcher", daemon=True)
+            self._thread.start()
+            self.registry.watching = True
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.registry.watching = False
+
+    def _setup_inotify(self):
+        watches = {}
+        polled = list(self.registry.specs)
+        if not self.use_inotify:
+            return None, watches, polled
+
+        try:
+            inotify = Inotify()
+        except OSError as e:
+            print(f"inotify not available ({str(e)}); polling corpus directories every {self.poll_interval}s")
+            return None, watches, polled
+
+        polled = []
+        for name in self.registry.specs:
+            try:
+                watches[inotify.add_watch(self.registry.directory(name))] = name
+            except OSError as e:
+                print(f"Cannot watch {self.registry.directory(name)} ({str(e)}); polling it instead")
+                polled.append(name)
+        return inotify, watches, polled
+
+    def _run(self):
+        inotify, watches, polled = self._setup_inotify()
+        self.mode = "inotify" if watches else "polling"
+
+        # Pick up anything that changed before the watches were in place.
+        for name in self.registry.specs:
+            self._refresh(name)
+
+        last_poll = time.monotonic()
+        try:
+            while not self._stop.is_set():
+                if inotify is not None:
+                    events = inotify.read_events(min(self.poll_interval, 1.0))
+                    if events:
+                        time.sleep(DEBOUNCE_SECONDS)
+                        events |= inotify.read_events(0)
+                    for wd, mask in events:
+                        if wd in watches and mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED):
+                            # The directory itself went away; fall back to polling it.
+                            polled.append(watches.pop(wd))
+                    for name in {watches[wd] for wd, _ in events if wd in watches}:
+                        self._refresh(name)
+                else:
+                    self._stop.wait(self.poll_interval)
+
+                if polled and time.monotonic() - last_poll >= self.poll_interval:
+                    for name in polled:
+                        self._refresh(name)
+                    last_poll = time.monotonic()
+        finally:
+            if inotify is not None:
+                inotify.close()
+
+    def _refresh(self, name):
+        try:
+            if self.registry.is_loaded(name):
+                self.registry.refresh(name)
+            else:
+                # Not loaded yet; only make the next files()/get() re-check the directory.
+                self.registry.invalidate(name)
+        except Exception as e:
+            print(f"Error refreshing corpus {name}: {str(e)}")
+
+
+_watcher = None
+_watcher_lock = threading.Lock()
+
+
+def start_corpus_watcher(registry):
+    """Start the process-wide watcher for `registry` once; CORPUS_WATCH=0 disables it."""
+    global _watcher
+    if os.getenv("CORPUS_WATCH", "1") == "0":
+        return None
+    with _watcher_lock:
+        if _watcher is None:
+            _watcher = CorpusWatcher(registry).start()
+        return _watcher
@@ -0,0 +1,400 @@
+import os
+import glob
+import pickle
+import time
+import hashlib
+import threading
+from types import MappingProxyType
+from typing import Any, NamedTuple
+from lazy_imports import lazy_import
+from cv_store import CompactCV, get_cv_store, load_compact_cv
+from shared_corpus import SHARED_CORPUS, image_path, publish_lock, write_image, remove_old_images, attach_image
+
+pd = lazy_import("pandas")
+PyPDF2 = lazy_import("PyPDF2")
+
+DEFAULT_JSON_DIR = "/workspace/CV_json"
+DEFAULT_PDF_DIR = "/workspace/CV_data"
+DEFAULT_EXCEL_DIR = "/workspace/excel"
+
+# Seconds between stat checks of a corpus directory; within that window a
+# rerun gets the current snapshot without touching the filesystem.
+CORPUS_CHECK_INTERVAL = float(os.getenv("CORPUS_CHECK_INTERVAL", "5"))
+
+
+def resolve_dir(preferred, fallback):
+    return preferred if os.path.exists(preferred) else fallback
+
+
+def iter_cv_text(cv_json_data):
+    """The prompt text of the CVs, one CV at a time; cv_json_data may be any iterable (e.g. a generator)."""
+    for cv in cv_json_data:
+        parts = [f"===== CV: {cv['name']} =====\n\n"]
+
+        if "sections" in cv:
+            for section_name, section_content in cv["sections"].items():
+                parts.append(f"--- {section_name.upper()} ---\n{section_content}\n\n")
+
+        if "emails" in cv:
+            parts.append(f"--- CONTACT ---\nEmail: {', '.join(cv['emails'])}\n")
+
+        if "phones" in cv:
+            parts.append(f"Phone: {', '.join(cv['phones'])}\n")
+
+        parts.append("\n\n")
+        yield "".join(parts)
+
+
+def build_cv_text(cv_json_data):
+    return "".join(iter_cv_text(cv_json_data))
+
+
+def load_pdf_text(path):
+    with open(path, "rb") as f:
+        pdf_reader = PyPDF2.PdfReader(f)
+        return "".join(page.extract_text() + "\n" for page in pdf_reader.pages)
+
+
+def load_excel_file(path):
+    return pd.read_excel(path)
+
+
+def combine_cv_json(items):
+    # Only the compact records are held; the prompt text is built per match with build_cv_text.
+    return tuple(items.values())
+
+
+def mirror_cv_store(directory, changed, removed, complete):
+    """Apply changed ({path: (cv, (mtime_ns, size))}) and removed JSON CV files to the directory's CV store.
+
+    `complete` means `changed` holds every file of the directory (the first
+    load), so records of files deleted in the meantime are dropped too.
+    """
+    if not os.path.isdir(directory):
+        return
+    try:
+        store = get_cv_store(directory)
+        if complete:
+            current = {os.path.basename(path) for path in changed}
+            removed = [filename for filename in store.filenames() if filename not in current]
+        for path, (cv_data, stat) in changed.items():
+            store.put(cv_data, os.path.basename(path), stat)
+        for path in removed:
+            store.remove(os.path.basename(path))
+    except Exception as e:
+        print(f"Error updating the CV store: {str(e)}")
+
+
+def pack_compact_cv(cv):
+    return cv.payload
+
+
+def pack_text(text):
+    return text.encode("utf-8")
+
+
+def attach_text(view):
+    return str(view, "utf-8")
+
+
+def combine_cv_pdfs(items):
+    return tuple(
+        f"File: {os.path.basename(path)}\n\n{text}" for path, text in items.items() if text
+    )
+
+
+def combine_excel(items):
+    frames = MappingProxyType({os.path.basename(path): df for path, df in items.items()})
+    excel_data_str = "".join(
+        f"\n\n=== Excel File: {name} ===\n{df.to_string()}" for name, df in frames.items()
+    )
+    return frames, excel_data_str
+
+
+class CorpusSpec(NamedTuple):
+    directory: str
+    patterns: tuple
+    load_file: Any
+    combine: Any
+    # Optional sync(directory, changed, removed, complete), called with the files a refresh loaded or dropped.
+    sync: Any = None
+    # pack(item) -> bytes-like and attach(memoryview) -> item; corpora with both can be shared between processes.
+    pack: Any = None
+    attach: Any = None
+
+
+class CorpusSnapshot(NamedTuple):
+    """One loaded version of a corpus. Shared between reruns and threads; treat as read-only."""
+    version: int
+    fingerprint: tuple
+    items: MappingProxyType  # path -> parsed file, in sorted path order
+    value: Any  # result of the corpus' combine function
+    errors: MappingProxyType  # path -> error message for files that failed to load
+
+
+def directory_fingerprint(directory, patterns):
+    """(path, mtime_ns, size) of every matching file; stat only, no file contents are read."""
+    paths = set()
+    for pattern in patterns:
+        paths.update(glob.glob(os.path.join(directory, pattern)))
+
+    fingerprint = []
+    for path in sorted(paths):
+        if os.path.basename(path).startswith("~$"):
+            continue
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        fingerprint.append((path, stat.st_mtime_ns, stat.st_size))
+    return tuple(fingerprint)
+
+
+def file_digest(path, chunk_size=1024 * 1024):
+    """md5 of a file, read in chunks so large workbooks and PDFs are never held in memory at once."""
+    digest = hashlib.md5()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class CorpusRegistry:
+    """Process-wide holder of the read-only corpora (CV JSON, CV PDF text, Excel workbooks).
+
+    get() returns the current CorpusSnapshot of a corpus. refresh() re-stats
+    the corpus directory against a per-file (mtime, size, digest) table:
+    only files that were added or whose content changed are loaded again, and
+    only then does the version go up. Files whose stat changed are hashed to
+    tell a real change from a touch.
+
+    Without a watcher (see corpus_watcher) get() refreshes at most every
+    `check_interval` seconds; with one, refreshes are driven by file events
+    and get() never touches the filesystem. Values derived from a snapshot
+    (indexes, parsed project lists) are cached per version through derive().
+    invalidate() forces the next get() to refresh.
+
+    With `shared` (SHARED_CORPUS=1) the processes of a host share each corpus
+    version through a read-only image in SHARED_CORPUS_DIR: the first process
+    to need a version loads and publishes it, the others map it. CV records
+    are zero-copy views of the shared pages, so per-process memory stays flat
+    as processes are added; PDF text and workbook frames are rebuilt from the
+    image, which saves parsing the files but not the per-process copy.
+    """
+
+    def __init__(self, json_dir=None, pdf_dir=None, excel_dir=None, check_interval=None, shared=None):
+        self.check_interval = CORPUS_CHECK_INTERVAL if check_interval is None else check_interval
+        self.shared = SHARED_CORPUS if shared is None else shared
+        self.watching = False
+        self.specs = {
+            "cv_json": CorpusSpec(
+                json_dir or resolve_dir(DEFAULT_JSON_DIR, "CV_json"),
+                ("*.json",),
+                load_compact_cv,
+                combine_cv_json,
+                mirror_cv_store,
+                pack_compact_cv,
+                CompactCV,
+            ),
+            "cv_pdf": CorpusSpec(
+                pdf_dir or resolve_dir(DEFAULT_PDF_DIR, "CV_data"),
+                ("*.pdf",),
+                load_pdf_text,
+                combine_cv_pdfs,
+                pack=pack_text,
+                attach=attach_text,
+            ),
+            "excel": CorpusSpec(
+                excel_dir or resolve_dir(DEFAULT_EXCEL_DIR, "excel"),
+                ("*.xlsx", "*.xls"),
+                load_excel_file,
+                combine_excel,
+                pack=pickle.dumps,
+                attach=pickle.loads,
+            ),
+        }
+        self._snapshots = {}
+        self._fingerprints = {}
+        self._file_tables = {}
+        self._checked = {}
+        self._derived = {}
+        self._lock = threading.RLock()
+
+    def directory(self, name):
+        return self.specs[name].directory
+
+    def _refresh_due(self, name):
+        if name not in self._checked:
+            return True
+        return not self.watching and time.monotonic() - self._checked[name] >= self.check_interval
+
+    def fingerprint(self, name):
+        with self._lock:
+            if self._refresh_due(name) or name not in self._fingerprints:
+                spec = self.specs[name]
+                self._fingerprints[name] = directory_fingerprint(spec.directory, spec.patterns)
+                self._checked[name] = time.monotonic()
+            return self._fingerprints[name]
+
+    def cv_store(self):
+        """The CVStore kept in step with the JSON CV corpus."""
+        return get_cv_store(self.directory("cv_json"))
+
+    def is_loaded(self, name):
+        return name in self._snapshots
+
+    def files(self, name):
+        """Paths of the corpus files, without loading them."""
+        return [path for path, _, _ in self.fingerprint(name)]
+
+    def get(self, name):
+        with self._lock:
+            snapshot = self._snapshots.get(name)
+            if snapshot is None or self._refresh_due(name) or snapshot.fingerprint != self._fingerprints.get(name):
+                snapshot = self.refresh(name)
+            return snapshot
+
+    def refresh(self, name):
+        """Apply the per-file changes in a corpus directory; returns the current snapshot."""
+        with self._lock:
+            spec = self.specs[name]
+            fingerprint = directory_fingerprint(spec.directory, spec.patterns)
+            self._fingerprints[name] = fingerprint
+            self._checked[name] = time.monotonic()
+
+            if self.shared and spec.pack:
+                snapshot = self._refresh_shared(name, spec, fingerprint)
+            else:
+                snapshot = self._load_files(name, spec, fingerprint)
+            self._snapshots[name] = snapshot
+            return snapshot
+
+    def _load_files(self, name, spec, fingerprint):
+        old = self._snapshots.get(name)
+        # Without a file table (first load, or the items were attached from a shared image) every file is read.
+        fresh = name not in self._file_tables
+        table = self._file_tables.setdefault(name, {})
+        items = dict(old.items) if old and not fresh else {}
+        errors = dict(old.errors) if old and not fresh else {}
+        current = {path: (mtime, size) for path, mtime, size in fingerprint}
+
+        reloaded = []
+        removed = [path for path in table if path not in current]
+        for path in removed:
+            table.pop(path)
+            items.pop(path, None)
+            errors.pop(path, None)
+
+        for path, stat in current.items():
+            entry = table.get(path)
+            if entry and entry[:2] == stat:
+                continue
+            try:
+                digest = file_digest(path)
+            except OSError as e:
+                # Deleted or replaced between the stat and the read; the next refresh picks it up.
+                print(f"Error reading {os.path.basename(path)}: {str(e)}")
+                continue
+            table[path] = stat + (digest,)
+            if entry and entry[2] == digest:
+                continue
+
+            try:
+                items[path] = spec.load_file(path)
+                errors.pop(path, None)
+            except Exception as e:
+                items.pop(path, None)
+                errors[path] = str(e)
+                print(f"Error loading {os.path.basename(path)}: {str(e)}")
+            reloaded.append(path)
+
+        if spec.sync and (fresh or reloaded or removed):
+            changed = {path: (items[path], table[path][:2]) for path in reloaded if path in items}
+            spec.sync(spec.directory, changed, removed, fresh)
+
+        if old is not None and not fresh and not reloaded and not removed:
+            snapshot = old._replace(fingerprint=fingerprint)
+        else:
+            items = dict(sorted(items.items()))
+            snapshot = CorpusSnapshot(
+                old.version + 1 if old else 1,
+                fingerprint,
+                MappingProxyType(items),
+                spec.combine(items),
+                MappingProxyType(errors),
+            )
+            if old is not None:
+                print(f"Corpus {name} v{snapshot.version}: reloaded {len(reloaded)} file(s), removed {len(removed)}")
+        return snapshot
+
+    def _refresh_shared(self, name, spec, fingerprint):
+        """Attach to the published image of this corpus version, loading and publishing it if nobody has yet."""
+        old = self._snapshots.get(name)
+        if old is not None and old.fingerprint == fingerprint:
+            return old
+
+        path = image_path(name, spec.directory, fingerprint)
+        try:
+            with publish_lock(name):
+                image = attach_image(path)
+                loaded = None
+                if image is None:
+                    loaded = self._load_files(name, spec, fingerprint)
+                    write_image(path, {key: spec.pack(item) for key, item in loaded.items.items()}, loaded.errors)
+                    remove_old_images(name, path)
+                    image = attach_image(path)
+        except OSError as e:
+            print(f"Shared corpus {name} unavailable, loading it in this process: {str(e)}")
+            return self._load_files(name, spec, fingerprint)
+
+        if loaded is None:
+            # The items now come from another process; the next load here has to read every file.
+            self._file_tables.pop(name, None)
+            print(f"Corpus {name}: attached to {os.path.basename(path)}")
+        # The loading process drops its own copy too, so every process reads the same pages.
+        # Keys reuse the fingerprint's path strings instead of holding a second copy of every path.
+        paths = {path: path for path, _, _ in fingerprint}
+        items = {paths.get(key, key): spec.attach(view) for key, view in sorted(image.entries.items())}
+        return CorpusSnapshot(
+            loaded.version if loaded else (old.version + 1 if old else 1),
+            fingerprint,
+            MappingProxyType(items),
+            spec.combine(items),
+            MappingProxyType(image.errors),
+        )
+
+    def derive(self, name, key, build):
+        """build(snapshot), cached until the corpus version changes."""
+        snapshot = self.get(name)
+        with self._lock:
+            cached = self._derived.get((name, key))
+            if cached is not None and cached[0] == snapshot.version:
+                return cached[1]
+
+        value = build(snapshot)
+        with self._lock:
+            self._derived[(name, key)] = (snapshot.version, value)
+        return value
+
+    def invalidate(self, name=None):
+        with self._lock:
+            for corpus in [name] if name else list(self.specs):
+                self._checked.pop(corpus, None)
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_corpus_registry(**kwargs):
+    """Process-wide CorpusRegistry; keyword arguments only apply to the first call."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = CorpusRegistry(**kwargs)
+        return _registry
+
+
+def get_app_registry():
+    """The process-wide registry with the web app's directories (Excel files only from /workspace/excel)."""
+    return get_corpus_registry(excel_dir=DEFAULT_EXCEL_DIR)
@@ -0,0 +1,141 @@
+import os
+import json
+import queue
+import threading
+import traceback
+from json_to_pdf import create_cv_pdf
+
+_STOP = object()
+
+
+def cv_file_stem(cv_json):
+    return cv_json.get("name", "cv").replace(" ", "_")
+
+
+class CVOutputPipeline:
+    """Writes customized CVs to JSON and PDF on worker threads while the LLM is still streaming.
+
+    submit() hands a CV to the JSON writers, which pass it on to the PDF
+    renderer. Each CV gets its own file names: a name seen before in this
+    pipeline gets a numeric suffix ("Anna_Berg_2_CV.pdf"). Both hand-offs go through bounded queues, so submit() blocks
+    once `max_pending` CVs are waiting at a stage (back-pressure). Results are
+    reported in submission order through on_complete(result) and collected in
+    `results`; close() waits for the workers and returns that list.
+    """
+
+    def __init__(self, output_dir, json_workers=1, max_pending=4, write_json=True, on_complete=None, debug=False):
+        self.output_dir = output_dir
+        self.write_json = write_json
+        self.on_complete = on_complete
+        self.debug = debug
+        self.results = []
+
+        self._json_queue = queue.Queue(maxsize=max_pending)
+        self._pdf_queue = queue.Queue(maxsize=max_pending)
+        self._finished = {}
+        self._lock = threading.Lock()
+        self._submitted = 0
+        self._stems = set()
+        self._closed = False
+
+        os.makedirs(output_dir, exist_ok=True)
+
+        self._json_threads = [
+            threading.Thread(target=self._json_worker, daemon=True) for _ in range(max(1, json_workers))
+        ]
+        # One renderer only: reportlab keeps module-level state and is not thread-safe.
+        self._pdf_threads = [threading.Thread(target=self._pdf_worker, daemon=True)]
+        for thread in self._json_threads + self._pdf_threads:
+            thread.start()
+
+    def submit(self, cv_json):
+        if self._closed:
+            raise RuntimeError("CVOutputPipeline is closed")
+        with self._lock:
+            result = {
+                "index": self._submitted,
+                "name": cv_json.get("name", "cv"),
+                "json_path": None,
+                "pdf_path": None,
+                "error": None,
+            }
+            self._submitted += 1
+            stem = self._unique_stem(cv_file_stem(cv_json))
+        self._json_queue.put((result, cv_json, stem))
+
+    def _unique_stem(self, stem):
+        unique = stem
+        number = 1
+        while unique in self._stems:
+            number += 1
+            unique = f"{stem}_{number}"
+        self._stems.add(unique)
+        return unique
+
+    def _json_worker(self):
+        while True:
+            item = self._json_queue.get()
+            if item is _STOP:
+                return
+            result, cv_json, stem = item
+            if self.write_json:
+                try:
+                    json_path = os.path.join(self.output_dir, f"{stem}_CV.json")
+                    with open(json_path, "w", encoding="utf-8") as f:
+                        json.dump(cv_json, f, indent=2)
+                    result["json_path"] = json_path
+                except Exception as e:
+                    result["error"] = f"Error saving JSON: {str(e)}"
+            self._pdf_queue.put(item)
+
+    def _pdf_worker(self):
+        while True:
+            item = self._pdf_queue.get()
+            if item is _STOP:
+                return
+            result, cv_json, stem = item
+            try:
+                pdf_path = os.path.join(self.output_dir, f"{stem}_CV.pdf")
+                result["pdf_path"] = create_cv_pdf(cv_json, pdf_path, debug=self.debug)
+            except Exception as e:
+                result["error"] = f"Error generating PDF: {str(e)}"
+                if self.debug:
+                    print(traceback.format_exc())
+            self._finish(result)
+
+    def _finish(self, result):
+        # Hold finished results back until every earlier CV is done as well.
+        with self._lock:
+            self._finished[result["index"]] = result
+            while len(self.results) in self._finished:
+                ready = self._finished.pop(len(self.results))
+                self.results.append(ready)
+                if self.on_complete:
+                    try:
+                        self.on_complete(ready)
+                    except Exception as e:
+                        print(f"Error in pipeline completion callback: {str(e)}")
+
+    def close(self):
+        """Wait until every submitted CV has been written; returns the results in order."""
+        if not self._closed:
+            self._closed = True
+            for _ in self._json_threads:
+                self._json_queue.put(_STOP)
+            for thread in self._json_threads:
+                thread.join()
+            for _ in self._pdf_threads:
+                self._pdf_queue.put(_STOP)
+            for thread in self._pdf_threads:
+                thread.join()
+        return self.results
+
+
+def report_cv_output(result):
+    """on_complete callback for the command line."""
+    if result["json_path"]:
+        print(f"Saved JSON for {result['name']}")
+    if result["pdf_path"]:
+        print(f"Generated PDF for {result['name']}")
+    if result["error"]:
+        print(f"{result['error']} ({result['name']})")
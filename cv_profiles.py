@@ -0,0 +1,85 @@
+import os
+import json
+from cv_corpus import build_cv_text
+from cv_matching_prompt import CV_PROFILE_PROMPT, CV_EDIT_PROMPT, build_cv_profile_user_prompt, build_cv_edit_user_prompt
+from match_models import CustomizedCV, CVEdit, response_format_for, parse_structured_response
+from model_cascade import same_employee
+
+# Set to 0 to have the model write every customized CV in full instead of as changes to a stored profile.
+CV_PROFILES = os.getenv("CV_PROFILES", "1") == "1"
+
+
+def find_cv(cv_store, name):
+    """The stored CV of the employee the model called `name`, or None."""
+    cv = cv_store.get(name)
+    if cv is not None:
+        return cv
+    for stored_name in cv_store.names():
+        if same_employee(name, stored_name):
+            return cv_store.get(stored_name)
+    return None
+
+
+def profile_prompt_json(profile):
+    """The profile as the edit prompt shows it: work experience entries carry the ids CVEdit refers to."""
+    data = profile.model_dump()
+    data["work_experience"] = [
+        {"id": number, **entry} for number, entry in enumerate(data["work_experience"], start=1)
+    ]
+    return json.dumps(data, ensure_ascii=False)
+
+
+def get_profile(scheduler, cv_store, cv, model="gpt-4o-mini", priority="interactive"):
+    """(profile, usage) of a stored CV; the profile is written once per CV content and kept in the store."""
+    content_hash = cv.content_hash()
+    stored = cv_store.profile(content_hash)
+    if stored is not None:
+        profile = parse_structured_response(stored, CustomizedCV)
+        if profile is not None:
+            return profile, None
+
+    response = scheduler.generate_response(
+        build_cv_profile_user_prompt(build_cv_text([cv])),
+        model=model,
+        system_prompt=CV_PROFILE_PROMPT,
+        priority=priority,
+        response_format=response_format_for(CustomizedCV),
+    )
+    usage = scheduler.last_usage
+    profile = parse_structured_response(response, CustomizedCV)
+    if profile is not None:
+        cv_store.put_profile(content_hash, profile.model_dump_json(), model=model)
+    return profile, usage
+
+
+def write_profiled_cv(scheduler, cv_store, project_description, name, match_percentage, min_match_percentage=70,
+                      excel_data=None, model="gpt-4o-mini", priority="interactive"):
+    """(CustomizedCV, usages) built from the employee's profile and the model's CVEdit.
+
+    The CV is None if the employee has no stored CV or a call failed; the
+    caller then has the CV written in full.
+    """
+    cv = find_cv(cv_store, name)
+    if cv is None:
+        return None, []
+
+    profile, usage = get_profile(scheduler, cv_store, cv, model=model, priority=priority)
+    usages = [usage]
+    if profile is None:
+        return None, usages
+
+    response = scheduler.generate_response(
+        build_cv_edit_user_prompt(
+            profile_prompt_json(profile), project_description, name, match_percentage,
+            minimum_match_percentage=min_match_percentage, excel_data=excel_data,
+        ),
+        model=model,
+        system_prompt=CV_EDIT_PROMPT,
+        priority=priority,
+        response_format=response_format_for(CVEdit),
+    )
+    usages.append(scheduler.last_usage)
+    edit = parse_structured_response(response, CVEdit)
+    if edit is None:
+        return None, usages
+    return edit.apply_to(profile), usages
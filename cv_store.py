@@ -0,0 +1,438 @@
+import os
+import sys
+import glob
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+
+# Database of the CV store; by default next to the JSON CVs it is built from.
+CV_STORE_DB = os.getenv("CV_STORE_DB", "")
+DB_FILE_NAME = "cv_store.sqlite3"
+# Bumped when the table layout changes; the store is rebuilt from the JSON files then.
+SCHEMA_VERSION = 2
+# Memory (MB) for decoded CompactCV documents kept for repeated reads; 0 disables the cache.
+CV_DECODE_CACHE_MB = float(os.getenv("CV_DECODE_CACHE_MB", "32"))
+# Decoded documents take about three times the size of their JSON as Python objects.
+DECODED_SIZE_FACTOR = 3
+# Rows fetched per batch when records are streamed from the store.
+ITER_BATCH_SIZE = 256
+
+
+class DecodedCache:
+    """LRU of decoded CompactCV documents, bounded by their estimated size in memory.
+
+    Keyed by the compressed payload, so identical records share one entry
+    and a changed CV never sees a stale document. Cached documents are
+    shared; treat them as read-only.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, payload):
+        with self._lock:
+            entry = self._entries.get(payload)
+            if entry is not None:
+                self._entries.move_to_end(payload)
+                return entry[0]
+
+        decoded = zlib.decompress(payload)
+        document = json.loads(decoded)
+        size = len(decoded) * DECODED_SIZE_FACTOR
+        if size > self.max_bytes:
+            return document
+        with self._lock:
+            if payload not in self._entries:
+                self._entries[payload] = (document, size)
+                self.size += size
+                while self.size > self.max_bytes:
+                    _, (_, size) = self._entries.popitem(last=False)
+                    self.size -= size
+        return document
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+decoded_cache = DecodedCache(int(CV_DECODE_CACHE_MB * 1024 * 1024))
+
+
+class CompactCV(Mapping):
+    """Read-only CV record kept as one zlib-compressed payload.
+
+    The parsed CV JSON holds raw_text plus a "sections" dict whose values are
+    substrings of it. In the payload raw_text is stored once and sections are
+    (start, end) offsets into it (sections that are not substrings are kept
+    as text). Only the name and the key names stay uncompressed; any other
+    key is decompressed on access; decoded documents are kept only in the
+    size-bounded decoded_cache, so the resident memory of a corpus does not
+    grow with the text of its CVs. dict(cv) gives the plain dict back (e.g.
+    for json.dumps).
+    """
+
+    __slots__ = ("_name", "_keys", "_payload")
+
+    def __init__(self, payload):
+        self._payload = payload
+        # Not through decoded_cache: loading a corpus would otherwise fill it with every record.
+        fields = json.loads(zlib.decompress(payload))["fields"]
+        self._name = fields.get("name")
+        self._keys = tuple(sys.intern(key) for key in fields)
+
+    @classmethod
+    def from_dict(cls, cv_data):
+        if isinstance(cv_data, CompactCV):
+            return cv_data
+        fields = dict(cv_data)
+        raw_text = fields.get("raw_text")
+        sections = None
+        if isinstance(fields.get("sections"), dict):
+            sections = []
+            for name, content in fields["sections"].items():
+                start = raw_text.find(content) if isinstance(raw_text, str) and isinstance(content, str) else -1
+                sections.append([name, start, start + len(content)] if start >= 0 else [name, content])
+            fields["sections"] = None
+        document = json.dumps({"fields": fields, "sections": sections}, ensure_ascii=False, separators=(",", ":"))
+        return cls(zlib.compress(document.encode("utf-8"), 9))
+
+    @property
+    def payload(self):
+        """The compressed payload, as stored in the CV store."""
+        return self._payload
+
+    def content_hash(self):
+        return hashlib.sha256(self._payload).hexdigest()
+
+    def _document(self):
+        return decoded_cache.get(self._payload)
+
+    def __getitem__(self, key):
+        if key == "name" and self._name is not None:
+            return self._name
+        if key not in self._keys:
+            raise KeyError(key)
+        document = self._document()
+        if key == "sections" and document["sections"] is not None:
+            raw_text = document["fields"].get("raw_text") or ""
+            return {
+                section[0]: raw_text[section[1]:section[2]] if len(section) == 3 else section[1]
+                for section in document["sections"]
+            }
+        return document["fields"][key]
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __repr__(self):
+        return f"CompactCV(name={self._name!r})"
+
+
+def load_compact_cv(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return CompactCV.from_dict(json.load(f))
+
+
+def cv_sections(cv_data):
+    """(section, text) pairs indexed for full-text search."""
+    sections = [(name, str(content)) for name, content in (cv_data.get("sections") or {}).items()]
+    if not sections and cv_data.get("raw_text"):
+        sections.append(("raw_text", cv_data["raw_text"]))
+    return sections
+
+
+def cv_technologies(cv_data):
+    from past_project_analyzer import extract_technologies_from_text
+
+    text = "\n".join([cv_data.get("raw_text") or ""] + [content for _, content in cv_sections(cv_data)])
+    # The vocabulary has case variants ("Java", "JAVA"); the index is case-insensitive, keep the first.
+    found = extract_technologies_from_text(text)
+    return sorted({tech.lower(): tech for tech in reversed(found)}.values())
+
+
+class CVStore:
+    """CV JSON records in SQLite, indexed by name, content hash and technology.
+
+    Each CV is stored once as its CompactCV payload together with the stat of
+    the file it was imported from, its extracted technologies and an FTS5
+    index over its sections; reads return CompactCV records. Lookups by name
+    or technology and full-text searches only touch the matching rows, so
+    they do not get slower with the number of CVs; sync_directory() re-reads
+    only the JSON files whose stat changed.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._init_db()
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def _init_db(self):
+        conn = self._connect()
+        if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            # Only derived data lives here; the next sync or corpus load imports the JSON files again.
+            for table in ("cv_sections", "cv_technologies", "cvs"):
+                conn.execute(f"DROP TABLE IF EXISTS {table}")
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cvs ("
+            "id INTEGER PRIMARY KEY, filename TEXT NOT NULL UNIQUE, name TEXT NOT NULL, "
+            "content_hash TEXT NOT NULL, payload BLOB NOT NULL, "
+            "mtime_ns INTEGER, size INTEGER, updated REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS cvs_name ON cvs (name COLLATE NOCASE)")
+        conn.execute("CREATE INDEX IF NOT EXISTS cvs_content_hash ON cvs (content_hash)")
+        conn.execute("CREATE INDEX IF NOT EXISTS cvs_updated ON cvs (updated)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cv_technologies ("
+            "technology TEXT NOT NULL COLLATE NOCASE, "
+            "cv_id INTEGER NOT NULL REFERENCES cvs (id) ON DELETE CASCADE, "
+            "PRIMARY KEY (technology, cv_id)) WITHOUT ROWID"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS cv_technologies_cv ON cv_technologies (cv_id)")
+        conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS cv_sections "
+            "USING fts5(name, section, content, cv_id UNINDEXED)"
+        )
+        # Structured profiles written by the model (see cv_profiles); keyed by content, so they
+        # survive schema changes and re-imports of an unchanged CV.
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cv_profiles ("
+            "content_hash TEXT PRIMARY KEY, profile TEXT NOT NULL, model TEXT, created REAL NOT NULL)"
+        )
+
+    def put(self, cv_data, filename, stat=None):
+        """Insert or update the CV (dict or CompactCV) imported from `filename`; returns True if its content changed."""
+        cv_data = CompactCV.from_dict(cv_data)
+        content_hash = cv_data.content_hash()
+        mtime_ns, size = stat or (None, None)
+        name = cv_data.get("name") or os.path.splitext(filename)[0]
+        with self._write_lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT id, content_hash FROM cvs WHERE filename = ?", (filename,)).fetchone()
+                if row and row["content_hash"] == content_hash:
+                    conn.execute("UPDATE cvs SET mtime_ns = ?, size = ? WHERE id = ?", (mtime_ns, size, row["id"]))
+                    conn.execute("COMMIT")
+                    return False
+
+                if row:
+                    cv_id = row["id"]
+                    conn.execute(
+                        "UPDATE cvs SET name = ?, content_hash = ?, payload = ?, mtime_ns = ?, size = ?, updated = ? "
+                        "WHERE id = ?",
+                        (name, content_hash, cv_data.payload, mtime_ns, size, time.time(), cv_id),
+                    )
+                    conn.execute("DELETE FROM cv_technologies WHERE cv_id = ?", (cv_id,))
+                    conn.execute("DELETE FROM cv_sections WHERE cv_id = ?", (cv_id,))
+                else:
+                    cv_id = conn.execute(
+                        "INSERT INTO cvs (filename, name, content_hash, payload, mtime_ns, size, updated) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (filename, name, content_hash, cv_data.payload, mtime_ns, size, time.time()),
+                    ).lastrowid
+
+                conn.executemany(
+                    "INSERT INTO cv_technologies (technology, cv_id) VALUES (?, ?)",
+                    [(technology, cv_id) for technology in cv_technologies(cv_data)],
+                )
+                conn.executemany(
+                    "INSERT INTO cv_sections (name, section, content, cv_id) VALUES (?, ?, ?, ?)",
+                    [(name, section, content, cv_id) for section, content in cv_sections(cv_data)],
+                )
+                conn.execute("COMMIT")
+                return True
+            except Exception:
+                try:
+                    conn.execute("ROLLBACK")
+                except sqlite3.Error:
+                    # The error that aborted the transaction is the one worth raising.
+                    pass
+                raise
+
+    def remove(self, filename):
+        with self._write_lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT id FROM cvs WHERE filename = ?", (filename,)).fetchone()
+                if row:
+                    conn.execute("DELETE FROM cv_sections WHERE cv_id = ?", (row["id"],))
+                    conn.execute("DELETE FROM cvs WHERE id = ?", (row["id"],))
+                conn.execute("COMMIT")
+                return row is not None
+            except Exception:
+                try:
+                    conn.execute("ROLLBACK")
+                except sqlite3.Error:
+                    pass
+                raise
+
+    def sync_directory(self, json_dir):
+        """Import the JSON CVs of `json_dir` whose stat changed and drop removed ones; returns (updated, removed)."""
+        known = {
+            row["filename"]: (row["mtime_ns"], row["size"])
+            for row in self._connect().execute("SELECT filename, mtime_ns, size FROM cvs")
+        }
+        current = set()
+        updated = 0
+        for path in sorted(glob.glob(os.path.join(json_dir, "*.json"))):
+            filename = os.path.basename(path)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            current.add(filename)
+            if known.get(filename) == (stat.st_mtime_ns, stat.st_size):
+                continue
+            try:
+                cv_data = load_compact_cv(path)
+            except Exception as e:
+                print(f"Error loading {filename}: {str(e)}")
+                continue
+            updated += self.put(cv_data, filename, (stat.st_mtime_ns, stat.st_size))
+
+        removed = 0
+        for filename in set(known) - current:
+            removed += self.remove(filename)
+        return updated, removed
+
+    def _records(self, sql, params=()):
+        return [CompactCV(row["payload"]) for row in self._connect().execute(sql, params)]
+
+    def iter_records(self):
+        """Every CV in file name order, read from the store in batches as the caller consumes them."""
+        # A connection of its own, so other reads on this thread do not reset the cursor.
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            cursor = conn.execute("SELECT payload FROM cvs ORDER BY filename")
+            while True:
+                rows = cursor.fetchmany(ITER_BATCH_SIZE)
+                if not rows:
+                    break
+                for (payload,) in rows:
+                    yield CompactCV(payload)
+        finally:
+            conn.close()
+
+    def count(self):
+        return self._connect().execute("SELECT COUNT(*) FROM cvs").fetchone()[0]
+
+    def filenames(self):
+        return [row["filename"] for row in self._connect().execute("SELECT filename FROM cvs")]
+
+    def names(self):
+        return [row["name"] for row in self._connect().execute("SELECT name FROM cvs ORDER BY filename")]
+
+    def all(self):
+        """Every CV, in file name order (the order the directory scan used)."""
+        return self._records("SELECT payload FROM cvs ORDER BY filename")
+
+    def get(self, name):
+        """The CV of one employee (name match is case-insensitive), or None."""
+        records = self._records("SELECT payload FROM cvs WHERE name = ? COLLATE NOCASE LIMIT 1", (name,))
+        return records[0] if records else None
+
+    def find_by_hash(self, content_hash):
+        return self._records("SELECT payload FROM cvs WHERE content_hash = ?", (content_hash,))
+
+    def profile(self, content_hash):
+        """The stored profile (CustomizedCV JSON) of a CV's content, or None."""
+        row = self._connect().execute(
+            "SELECT profile FROM cv_profiles WHERE content_hash = ?", (content_hash,)
+        ).fetchone()
+        return row["profile"] if row else None
+
+    def put_profile(self, content_hash, profile, model=None):
+        with self._write_lock:
+            self._connect().execute(
+                "INSERT OR REPLACE INTO cv_profiles (content_hash, profile, model, created) VALUES (?, ?, ?, ?)",
+                (content_hash, profile, model, time.time()),
+            )
+
+    def with_technologies(self, technologies):
+        """CVs mentioning every one of `technologies`."""
+        technologies = sorted({tech.lower() for tech in technologies})
+        if not technologies:
+            return self.all()
+        placeholders = ", ".join("?" for _ in technologies)
+        return self._records(
+            "SELECT payload FROM cvs WHERE id IN ("
+            f"SELECT cv_id FROM cv_technologies WHERE technology IN ({placeholders}) "
+            "GROUP BY cv_id HAVING COUNT(*) = ?) ORDER BY filename",
+            technologies + [len(technologies)],
+        )
+
+    def technologies(self, name):
+        return [
+            row["technology"]
+            for row in self._connect().execute(
+                "SELECT technology FROM cv_technologies JOIN cvs ON cvs.id = cv_id "
+                "WHERE cvs.name = ? COLLATE NOCASE ORDER BY technology",
+                (name,),
+            )
+        ]
+
+    def search(self, query, limit=20):
+        """Full-text search over the CV sections; (name, section, snippet) of the best matches."""
+        try:
+            rows = self._connect().execute(
+                "SELECT name, section, snippet(cv_sections, 2, '**', '**', ' ... ', 12) AS snippet "
+                "FROM cv_sections WHERE cv_sections MATCH ? ORDER BY rank LIMIT ?",
+                (query, limit),
+            ).fetchall()
+        except sqlite3.OperationalError:
+            # Not valid FTS5 query syntax; search for the words as a phrase instead.
+            rows = self._connect().execute(
+                "SELECT name, section, snippet(cv_sections, 2, '**', '**', ' ... ', 12) AS snippet "
+                "FROM cv_sections WHERE cv_sections MATCH ? ORDER BY rank LIMIT ?",
+                ('"' + query.replace('"', '""') + '"', limit),
+            ).fetchall()
+        return [(row["name"], row["section"], row["snippet"]) for row in rows]
+
+    def changed_since(self, timestamp):
+        """CVs added or changed after `timestamp` (time.time())."""
+        return self._records("SELECT payload FROM cvs WHERE updated > ? ORDER BY updated", (timestamp,))
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def store_path(json_dir):
+    return CV_STORE_DB or os.path.join(json_dir, DB_FILE_NAME)
+
+
+def get_cv_store(json_dir):
+    """Process-wide CVStore of a JSON CV directory."""
+    path = os.path.abspath(store_path(json_dir))
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = CVStore(path)
+        return _stores[path]
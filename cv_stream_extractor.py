@@ -0,0 +1,233 @@
+import json
+from match_models import cv_json_from_structured
+
+CV_HEADER = "CUSTOMIZED CV FOR"
+CV_FIELDS = ("contact", "education", "work_experience")
+
+
+class CVStreamExtractor:
+    """Incremental, single-pass extractor for customized CV objects.
+
+    Feed it the response text in chunks (as they arrive from a streamed
+    completion) and it returns every CV object whose closing brace has been
+    seen. Each character is looked at once, so the total cost is linear in
+    the response length.
+
+    In text mode it follows the "### CUSTOMIZED CV FOR <name>" headers and the
+    ```json fenced blocks of the text prompt; unfenced objects are only
+    accepted if they look like a CV. In structured mode the response is one
+    CVMatchResult JSON object and the elements of its "customized_cvs" array
+    are returned as they close.
+    """
+
+    def __init__(self, structured=False, debug=False):
+        self.structured = structured
+        self.debug = debug
+        self.completed = []
+
+        # Shared JSON scanning state
+        self._capture = None
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+        # Text mode: line buffer outside JSON, pending header name, fence state
+        self._line = []
+        self._line_blank = True
+        self._pending_name = None
+        self._in_fence = False
+        self._fenced_capture = False
+
+        # Structured mode: container stack and the current key per object level
+        self._stack = []
+        self._keys = []
+        self._key_chars = None
+        self._expect_key = False
+
+    def feed(self, chunk):
+        """Consume a chunk of response text; returns the CVs completed by it."""
+        if not chunk:
+            return []
+        start = len(self.completed)
+        if self.structured:
+            self._feed_structured(chunk)
+        else:
+            self._feed_text(chunk)
+        return self.completed[start:]
+
+    def close(self):
+        """Flush the last unterminated line; returns any CVs completed by it."""
+        start = len(self.completed)
+        if not self.structured and self._line:
+            self._handle_line("".join(self._line))
+            self._line = []
+            self._line_blank = True
+        return self.completed[start:]
+
+    def _emit(self, json_str, name=None, require_cv_fields=False):
+        try:
+            cv_data = json.loads(json_str)
+        except json.JSONDecodeError as e:
+            if self.debug:
+                print(f"Error parsing JSON for {name or 'CV'}: {e}")
+            return
+
+        if not isinstance(cv_data, dict):
+            return
+        if require_cv_fields and not ("name" in cv_data and any(field in cv_data for field in CV_FIELDS)):
+            return
+        if name and not cv_data.get("name"):
+            cv_data["name"] = name
+
+        self.completed.append(cv_data)
+        if self.debug:
+            print(f"Extracted CV data for {cv_data.get('name', 'CV')}")
+
+    def _scan_json_char(self, char):
+        """Advance brace/string state for one character of a captured object.
+
+        Returns True when the character closed the top-level object.
+        """
+        self._capture.append(char)
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+            elif char == "\\":
+                self._escape = True
+            elif char == '"':
+                self._in_string = False
+            return False
+
+        if char == '"':
+            self._in_string = True
+        elif char == "{":
+            self._depth += 1
+        elif char == "}":
+            self._depth -= 1
+            return self._depth == 0
+        return False
+
+    def _start_capture(self):
+        self._capture = ["{"]
+        self._depth = 1
+        self._in_string = False
+        self._escape = False
+
+    def _feed_text(self, chunk):
+        for char in chunk:
+            if self._capture is not None:
+                if self._scan_json_char(char):
+                    json_str = "".join(self._capture)
+                    self._capture = None
+                    self._emit(
+                        json_str,
+                        name=self._pending_name,
+                        require_cv_fields=not self._fenced_capture,
+                    )
+                    self._pending_name = None
+                continue
+
+            if char == "{" and (self._in_fence or self._line_blank or self._opens_fence()):
+                # Object starts inside a ```json fence or at the start of a line.
+                self._fenced_capture = self._in_fence or not self._line_blank
+                self._line = []
+                self._line_blank = True
+                self._start_capture()
+            elif char == "\n":
+                self._handle_line("".join(self._line))
+                self._line = []
+                self._line_blank = True
+            else:
+                self._line.append(char)
+                if self._line_blank and not char.isspace():
+                    self._line_blank = False
+
+    def _opens_fence(self):
+        # "```json {" on a single line; the line is short, so joining it is cheap.
+        return len(self._line) <= 12 and "".join(self._line).strip() == "```json"
+
+    def _handle_line(self, line):
+        stripped = line.strip()
+        if stripped.startswith("```"):
+            self._in_fence = stripped.startswith("```json") and not self._in_fence
+            return
+
+        header_index = stripped.find(CV_HEADER)
+        if header_index != -1:
+            name = stripped[header_index + len(CV_HEADER):].strip(" #*:\"")
+            self._pending_name = name or None
+
+    def _feed_structured(self, chunk):
+        for char in chunk:
+            if self._capture is not None:
+                if self._scan_json_char(char):
+                    json_str = "".join(self._capture)
+                    self._capture = None
+                    self._emit(json_str)
+                    self._expect_key = False
+                continue
+
+            if self._key_chars is not None:
+                # Inside a string at object level; only keys are recorded.
+                if self._escape:
+                    self._escape = False
+                    self._key_chars.append(char)
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    if self._expect_key:
+                        self._keys[-1] = "".join(self._key_chars)
+                        self._expect_key = False
+                    self._key_chars = None
+                else:
+                    self._key_chars.append(char)
+                continue
+
+            if char == '"':
+                self._key_chars = []
+            elif char == "{":
+                if self._stack == ["{", "["] and self._keys[0] == "customized_cvs":
+                    self._start_capture()
+                    continue
+                self._stack.append("{")
+                self._keys.append(None)
+                self._expect_key = True
+            elif char == "[":
+                self._stack.append("[")
+            elif char in "}]":
+                if self._stack:
+                    if self._stack.pop() == "{":
+                        self._keys.pop()
+            elif char == ",":
+                self._expect_key = bool(self._stack) and self._stack[-1] == "{"
+
+
+def extract_cvs(response_text, structured=False, debug=False):
+    """Extract all customized CV objects from a complete response in one pass."""
+    extractor = CVStreamExtractor(structured=structured, debug=debug)
+    extractor.feed(response_text)
+    extractor.close()
+    return extractor.completed
+
+
+def stream_cvs(chunks, on_cv, structured=False, debug=False):
+    """Consume a streamed response, calling on_cv(cv_json) for each CV as it completes.
+
+    Structured CVs are converted to the create_cv_pdf layout first. Returns the
+    full response text.
+    """
+    extractor = CVStreamExtractor(structured=structured, debug=debug)
+    parts = []
+
+    def emit(cvs):
+        for cv_data in cvs:
+            cv_json = cv_json_from_structured(cv_data) if structured else cv_data
+            if cv_json:
+                on_cv(cv_json)
+
+    for chunk in chunks:
+        parts.append(chunk)
+        emit(extractor.feed(chunk))
+    emit(extractor.close())
+
+    return "".join(parts)
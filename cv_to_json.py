@@ -6,7 +6,10 @@ import re
 import argparse
 import glob
 from datetime import datetime
-import PyPDF2
+from lazy_imports import lazy_import
+from cv_store import get_cv_store
+
+PyPDF2 = lazy_import("PyPDF2")
 
 DEFAULT_OUTPUT_DIR = "CV_json"
 
@@ -85,13 +88,21 @@ def save_cv_as_json(cv_data, output_dir):
         
         with open(output_path, "w", encoding="utf-8") as f:
             json.dump(cv_data, f, indent=2, ensure_ascii=False)
-        
-        print(f"Saved {output_path}")
-        return output_path
+
     except Exception as e:
         print(f"Error saving JSON: {str(e)}")
         return None
 
+    # The JSON file is saved either way; the next directory sync imports it into the store.
+    try:
+        stat = os.stat(output_path)
+        get_cv_store(output_dir).put(cv_data, file_name, (stat.st_mtime_ns, stat.st_size))
+    except Exception as e:
+        print(f"Error adding {file_name} to the CV store: {str(e)}")
+    
+    print(f"Saved {output_path}")
+    return output_path
+
 def process_directory(input_dir, output_dir):
 
     if not os.path.exists(input_dir):
@@ -3,19 +3,21 @@
 import os
 import json
 import argparse
-import re
 import traceback
 from datetime import datetime
-from reportlab.lib.pagesizes import A4
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import cm
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
-from reportlab.platypus import HRFlowable, ListFlowable, ListItem
+from cv_stream_extractor import extract_cvs
+from match_models import cv_json_from_structured
 
 DEFAULT_OUTPUT_DIR = "CV_pdf"
 
 def create_cv_pdf(json_data, output_path, debug=False):
+    # reportlab is only imported once a PDF is actually rendered.
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib import colors
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.units import cm
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
+    from reportlab.platypus import HRFlowable, ListFlowable, ListItem
 
     try:
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
@@ -253,115 +255,29 @@ def create_cv_pdf(json_data, output_path, debug=False):
         print(traceback.format_exc())
         raise
 
-def extract_json_from_response(response_text, debug=False):
+def extract_json_from_response(response_text, debug=False, structured=False):
 
     try:
         if debug:
             print("Extracting JSON from response text")
             print(f"Response text (first 100 chars): {response_text[:100]}...")
-        
 
-        employee_cv_pattern = r'CUSTOMIZED CV FOR ([^\n"]+?)[\s\n]*```json\s*([\s\S]*?)\s*```'
-        matches = re.findall(employee_cv_pattern, response_text, re.DOTALL)
-        
-        if matches and len(matches) > 0:
-            if debug:
-                print(f"Found {len(matches)} employee CVs in the response")
-            
-            all_cv_data = []
-            for employee_name, json_str in matches:
-                try:
-                    json_str = json_str.strip()
-                    cv_data = json.loads(json_str)
-                    if "name" not in cv_data or not cv_data["name"]:
-                        cv_data["name"] = employee_name.strip()
-                    all_cv_data.append(cv_data)
-                    if debug:
-                        print(f"Extracted CV data for {employee_name}")
-                except json.JSONDecodeError as e:
-                    if debug:
-                        print(f"Error parsing JSON for {employee_name}: {e}")
-                        print(f"JSON string: {json_str[:100]}...")
-            
-            if all_cv_data:
-                return all_cv_data
-        
-        alt_cv_pattern = r'### CUSTOMIZED CV FOR ([^\n"]+?)[\s\n]*```json\s*([\s\S]*?)\s*```'
-        alt_matches = re.findall(alt_cv_pattern, response_text, re.DOTALL)
-        
-        if alt_matches and len(alt_matches) > 0:
-            if debug:
-                print(f"Found {len(alt_matches)} employee CVs with alternative pattern")
-            
-            all_cv_data = []
-            for employee_name, json_str in alt_matches:
-                try:
-                    json_str = json_str.strip()
-                    cv_data = json.loads(json_str)
-                    if "name" not in cv_data or not cv_data["name"]:
-                        cv_data["name"] = employee_name.strip()
-                    all_cv_data.append(cv_data)
-                    if debug:
-                        print(f"Extracted CV data for {employee_name}")
-                except json.JSONDecodeError as e:
-                    if debug:
-                        print(f"Error parsing JSON for {employee_name}: {e}")
-            
-            if all_cv_data:
-                return all_cv_data
-        
-        json_pattern = r'```json\s*(.*?)\s*```'
-        json_match = re.search(json_pattern, response_text, re.DOTALL)
-        
-        if json_match:
-            json_str = json_match.group(1)
-            if debug:
-                print(f"Found JSON block between markers: {json_str[:100]}...")
-            try:
-                return [json.loads(json_str)]
-            except json.JSONDecodeError as e:
-                if debug:
-                    print(f"Error parsing JSON from markers: {e}")
-                    print(f"Full JSON string: {json_str}")
-        
-        cv_section_pattern = r'CUSTOMIZED CV FOR PROJECT[\s\S]*?```json\s*(.*?)\s*```'
-        cv_section_match = re.search(cv_section_pattern, response_text, re.DOTALL)
-        
-        if cv_section_match:
-            json_str = cv_section_match.group(1)
-            if debug:
-                print(f"Found JSON in CUSTOMIZED CV section: {json_str[:100]}...")
-            try:
-                return [json.loads(json_str)]
-            except json.JSONDecodeError as e:
-                if debug:
-                    print(f"Error parsing JSON from CV section: {e}")
-        
-        try:
-            json_pattern = r'({[\s\S]*})'
-            json_match = re.search(json_pattern, response_text)
-            if json_match:
-                json_str = json_match.group(1)
-                if debug:
-                    print(f"Found JSON object directly: {json_str[:100]}...")
-                try:
-                    parsed = json.loads(json_str)
-                    if "name" in parsed and ("contact" in parsed or "education" in parsed or "work_experience" in parsed):
-                        return [parsed]
-                except Exception as e:
-                    if debug:
-                        print(f"Error parsing direct JSON object: {e}")
-        except json.JSONDecodeError:
+        # One linear pass over the text; see cv_stream_extractor for the rules.
+        all_cv_data = extract_cvs(response_text, structured=structured, debug=debug)
+        if structured:
+            all_cv_data = [cv for cv in map(cv_json_from_structured, all_cv_data) if cv]
+
+        if all_cv_data:
             if debug:
-                print("Could not parse direct JSON object")
-        
+                print(f"Found {len(all_cv_data)} employee CVs in the response")
+            return all_cv_data
+
         if debug:
             print("Could not extract valid JSON from the response")
         return None
     except Exception as e:
         print(f"Error in extract_json_from_response: {str(e)}")
         if debug:
-            import traceback
             print(traceback.format_exc())
         return None
 
@@ -0,0 +1,66 @@
+import importlib
+import threading
+
+# Modules that take long to import and are only needed on some code paths
+# (analysis, PDF rendering, LLM calls); see benchmarks/import_time_benchmark.py.
+HEAVY_MODULES = (
+    "numpy",
+    "pandas",
+    "sklearn.feature_extraction.text",
+    "sklearn.metrics.pairwise",
+    "scipy.optimize",
+    "openai",
+    "reportlab.platypus",
+    "PyPDF2",
+)
+
+
+class LazyModule:
+    """Stands in for a module and imports it on first attribute access.
+
+    The import goes through importlib.import_module, so concurrent first uses
+    from worker threads are serialized by the import lock.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def load(self):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return self._module
+
+    @property
+    def loaded(self):
+        return self._module is not None
+
+    def __getattr__(self, attr):
+        return getattr(self.load(), attr)
+
+    def __repr__(self):
+        state = "loaded" if self.loaded else "not loaded"
+        return f"<lazy module '{self._name}' ({state})>"
+
+
+_modules = {}
+_modules_lock = threading.Lock()
+
+
+def lazy_import(name):
+    """Shared LazyModule for `name`; nothing is imported until it is used."""
+    with _modules_lock:
+        if name not in _modules:
+            _modules[name] = LazyModule(name)
+        return _modules[name]
+
+
+def preload(names=HEAVY_MODULES):
+    """Import the given modules now; returns {name: error message} for those that failed."""
+    errors = {}
+    for name in names:
+        try:
+            lazy_import(name).load()
+        except Exception as e:
+            errors[name] = str(e)
+    return errors
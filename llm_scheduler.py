@@ -0,0 +1,244 @@
+import os
+import time
+import queue
+import heapq
+import itertools
+import threading
+from concurrent.futures import Future
+from openai_backend import OpenAIBackend
+from rate_limiter import estimate_tokens
+
+PRIORITY_WEIGHTS = {
+    "interactive": 8,
+    "batch": 2,
+    "background": 1,
+}
+# Seconds the cross-process "interactive waiting" flag is reused before the rate limiter database is asked again.
+REMOTE_WAITING_TTL = float(os.getenv("REMOTE_WAITING_TTL", "0.5"))
+
+
+class LLMScheduler:
+    """Priority scheduler in front of OpenAIBackend.
+
+    Requests are tagged with a priority class and dispatched in weighted fair
+    queuing order (virtual finish time = start + estimated tokens / weight).
+    Batch and background requests are deferred while interactive requests are
+    waiting, either in this process or in any other process sharing the rate
+    limiter database. One worker is kept free of batch and background
+    requests, so an interactive request never waits for them to finish.
+    """
+
+    def __init__(self, backend=None, max_concurrency=None, weights=None):
+        self._backend = backend
+        self.max_concurrency = max_concurrency or int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+        self.weights = weights or PRIORITY_WEIGHTS
+        # One heap of (finish tag, sequence, request) per priority class.
+        self._queues = {priority: [] for priority in self.weights}
+        self._sequence = itertools.count()
+        self._virtual_time = 0.0
+        self._last_finish = {priority: 0.0 for priority in self.weights}
+        self._running_deferrable = 0
+        self._remote_interactive = False
+        self._remote_checked = 0.0
+        self._remote_lock = threading.Lock()
+        self._condition = threading.Condition()
+        self._workers = []
+        self._local = threading.local()
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self._backend = OpenAIBackend()
+        return self._backend
+
+    def _start_workers(self):
+        self._workers = [worker for worker in self._workers if worker.is_alive()]
+        while len(self._workers) < self.max_concurrency:
+            worker = threading.Thread(target=self._worker_loop, daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def _rate_limiter(self):
+        """The backend's rate limiter; None if there is none or the backend cannot be created.
+
+        A backend error (e.g. no OPENAI_API_KEY) is raised to the caller of
+        the request instead, by the worker that runs it.
+        """
+        try:
+            return self.backend.rate_limiter
+        except Exception:
+            return None
+
+    def _publish_waiting(self, priority):
+        rate_limiter = self._rate_limiter()
+        if rate_limiter:
+            try:
+                rate_limiter.set_waiting(priority, len(self._queues[priority]))
+            except Exception as e:
+                print(f"Could not publish scheduler state: {str(e)}")
+
+    def _deferrable_queued(self):
+        return any(heap for priority, heap in self._queues.items() if priority != "interactive")
+
+    def _refresh_remote_waiting(self):
+        """Re-read the cross-process interactive waiting flag once it is older than REMOTE_WAITING_TTL.
+
+        Called without the condition held, so the database read never blocks
+        submitters; _next_request only uses the cached value.
+        """
+        if not self._deferrable_queued() or time.monotonic() - self._remote_checked < REMOTE_WAITING_TTL:
+            return
+        if not self._remote_lock.acquire(blocking=False):
+            return
+        try:
+            rate_limiter = self._rate_limiter()
+            waiting = False
+            if rate_limiter:
+                try:
+                    waiting = rate_limiter.waiting_count("interactive") > 0
+                except Exception:
+                    waiting = False
+            self._remote_interactive = waiting
+            self._remote_checked = time.monotonic()
+        finally:
+            self._remote_lock.release()
+
+    def submit(self, prompt, model=None, system_prompt="You are a helpful assistant.", priority="interactive", response_format=None, stream=False):
+        if priority not in self.weights:
+            raise ValueError(f"Unknown priority class: {priority}")
+
+        future = Future()
+        if stream:
+            future.chunks = queue.Queue()
+        cost = estimate_tokens(system_prompt, prompt)
+
+        with self._condition:
+            start = max(self._virtual_time, self._last_finish[priority])
+            finish = start + cost / self.weights[priority]
+            self._last_finish[priority] = finish
+            request = (priority, prompt, model, system_prompt, response_format, stream, future)
+            heapq.heappush(self._queues[priority], (finish, next(self._sequence), request))
+            self._start_workers()
+            self._condition.notify()
+
+        if priority == "interactive":
+            self._publish_waiting(priority)
+
+        return future
+
+    def generate_response(self, prompt, model=None, system_prompt="You are a helpful assistant.", priority="interactive", response_format=None):
+        future = self.submit(
+            prompt, model=model, system_prompt=system_prompt, priority=priority, response_format=response_format
+        )
+        response = future.result()
+        self._local.last_usage = getattr(future, "usage", None)
+        return response
+
+    def stream_response(self, prompt, model=None, system_prompt="You are a helpful assistant.", priority="interactive", response_format=None):
+        """Yield the response text as it streams in, scheduled like generate_response."""
+        future = self.submit(
+            prompt, model=model, system_prompt=system_prompt, priority=priority,
+            response_format=response_format, stream=True
+        )
+        while True:
+            chunk = future.chunks.get()
+            if chunk is None:
+                break
+            yield chunk
+        future.result()
+        self._local.last_usage = getattr(future, "usage", None)
+
+    @property
+    def last_usage(self):
+        """Token usage (incl. cached prompt tokens) of the calling thread's last generate_response."""
+        return getattr(self._local, "last_usage", None)
+
+    def _next_request(self):
+        """Pop the request with the smallest finish tag that may run now.
+
+        Must be called with the condition held. Returns None if everything
+        queued is deferred behind interactive traffic or the batch and
+        background requests already hold all but one worker.
+        """
+        deferrable_allowed = (
+            not self._queues.get("interactive")
+            and not self._remote_interactive
+            and self._running_deferrable < max(1, self.max_concurrency - 1)
+        )
+        heads = [
+            (heap[0], priority) for priority, heap in self._queues.items()
+            if heap and (priority == "interactive" or deferrable_allowed)
+        ]
+        if not heads:
+            return None
+
+        _, priority = min(heads)
+        finish, _, request = heapq.heappop(self._queues[priority])
+        self._virtual_time = max(self._virtual_time, finish)
+        if priority != "interactive":
+            self._running_deferrable += 1
+        return request
+
+    def _worker_loop(self):
+        while True:
+            try:
+                self._refresh_remote_waiting()
+                with self._condition:
+                    request = self._next_request()
+                    if request is None:
+                        # Deferred requests re-check for remote interactive traffic periodically.
+                        self._condition.wait(timeout=1.0 if self._deferrable_queued() else None)
+                        continue
+                self._run(request)
+            except Exception as e:
+                # A dead worker would leave the requests queued behind it waiting forever.
+                print(f"LLM scheduler worker error: {str(e)}")
+
+    def _run(self, request):
+        priority, prompt, model, system_prompt, response_format, stream, future = request
+        if not future.set_running_or_notify_cancel():
+            self._finish(priority)
+            return
+        call_args = dict(
+            prompt=prompt,
+            model=model,
+            system_prompt=system_prompt,
+            priority=priority,
+            response_format=response_format,
+        )
+        try:
+            if priority == "interactive":
+                self._publish_waiting(priority)
+            if stream:
+                for chunk in self.backend.stream_response(**call_args):
+                    future.chunks.put(chunk)
+                response = None
+            else:
+                response = self.backend.generate_response(**call_args)
+            future.usage = getattr(self.backend, "last_usage", None)
+            future.set_result(response)
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            if stream:
+                future.chunks.put(None)
+            self._finish(priority)
+
+    def _finish(self, priority):
+        with self._condition:
+            if priority != "interactive":
+                self._running_deferrable -= 1
+            self._condition.notify_all()
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """Process-wide scheduler shared by the UI, CLIs and the past project analyzer."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = LLMScheduler()
+        return _scheduler
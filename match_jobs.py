@@ -0,0 +1,263 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import hashlib
+import threading
+from private_files import private_path, restrict_to_owner
+
+# The queue holds project texts and uploaded CVs, so the default database lives in a per-user directory.
+DEFAULT_DB_NAME = "cv_match_jobs.sqlite3"
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# A running job whose process stopped sending heartbeats for this long is queued again.
+JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "60"))
+# Finished jobs are kept (and reused for identical requests) this long.
+JOB_RETENTION_DAYS = float(os.getenv("JOB_RETENTION_DAYS", "7"))
+HEARTBEAT_SECONDS = 10
+IDLE_POLL_SECONDS = 1.0
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+def job_key(params, *state):
+    """Identity of a job: its parameters plus anything else the result depends on (e.g. corpus fingerprints)."""
+    payload = json.dumps([params, state], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class JobQueue:
+    """Persistent job queue in SQLite with a pool of worker threads.
+
+    submit() returns the id of an existing queued, running or finished job
+    with the same key, so a reloaded page attaches to its job instead of
+    starting the work again, and identical requests reuse finished results.
+    Workers of every process using the same database take jobs from it;
+    a job whose process died is queued again after JOB_STALE_SECONDS.
+
+    runner(params, report) does the work and returns a JSON-serializable
+    result; report(stage, progress=None, detail=None) records its progress.
+    """
+
+    def __init__(self, runner, db_path=None, workers=None, stale_after=None):
+        self.runner = runner
+        self.db_path = db_path or os.getenv("MATCH_JOBS_DB") or private_path(DEFAULT_DB_NAME)
+        self.workers = JOB_WORKERS if workers is None else workers
+        self.stale_after = JOB_STALE_SECONDS if stale_after is None else stale_after
+        self.worker_id = f"{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self._running = set()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._threads = []
+        self._init_db()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init_db(self):
+        conn = self._connect()
+        try:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, key TEXT NOT NULL, status TEXT NOT NULL, "
+                "stage TEXT, progress REAL NOT NULL DEFAULT 0, detail TEXT, "
+                "params TEXT NOT NULL, result TEXT, error TEXT, worker TEXT, "
+                "created REAL NOT NULL, updated REAL NOT NULL, heartbeat REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_key ON jobs (key, created)")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created)")
+            restrict_to_owner(self.db_path)
+            conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND updated < ?",
+                (DONE, FAILED, time.time() - JOB_RETENTION_DAYS * 86400),
+            )
+        finally:
+            conn.close()
+
+    def start(self):
+        if not self._threads:
+            for index in range(max(1, self.workers)):
+                thread = threading.Thread(target=self._work, name=f"match-job-{index}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            threading.Thread(target=self._heartbeat, name="match-job-heartbeat", daemon=True).start()
+        return self
+
+    def submit(self, params, key=None, force=False):
+        """Queue a job; returns the id of the matching existing job unless `force` is set."""
+        key = key or job_key(params)
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            if not force:
+                row = conn.execute(
+                    "SELECT id FROM jobs WHERE key = ? AND status != ? ORDER BY created DESC LIMIT 1",
+                    (key, FAILED),
+                ).fetchone()
+                if row:
+                    conn.execute("COMMIT")
+                    return row["id"]
+
+            job_id = uuid.uuid4().hex
+            now = time.time()
+            conn.execute(
+                "INSERT INTO jobs (id, key, status, stage, params, created, updated) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, key, QUEUED, QUEUED, json.dumps(params), now, now),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            try:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+            except sqlite3.Error:
+                # The error that aborted the transaction is the one worth raising.
+                pass
+            raise
+        finally:
+            conn.close()
+
+        self._wakeup.set()
+        return job_id
+
+    def get(self, job_id):
+        """The job as a dict (params and result decoded), or None if it does not exist."""
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        job = {name: row[name] for name in ("id", "status", "stage", "progress", "detail", "error", "created", "updated")}
+        job["params"] = json.loads(row["params"])
+        job["result"] = json.loads(row["result"]) if row["result"] else None
+        return job
+
+    def update_result(self, job_id, **fields):
+        """Add fields to a finished job's result (e.g. output produced later on request); False if it has none."""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT result FROM jobs WHERE id = ? AND status = ?", (job_id, DONE)).fetchone()
+            if row is None or not row["result"]:
+                conn.execute("COMMIT")
+                return False
+            result = json.loads(row["result"])
+            result.update(fields)
+            conn.execute("UPDATE jobs SET result = ? WHERE id = ?", (json.dumps(result), job_id))
+            conn.execute("COMMIT")
+            return True
+        except Exception:
+            try:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+            except sqlite3.Error:
+                pass
+            raise
+        finally:
+            conn.close()
+
+    def _claim(self):
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            # Jobs of a process that died are picked up again.
+            conn.execute(
+                "UPDATE jobs SET status = ?, stage = ?, worker = NULL WHERE status = ? AND heartbeat < ?",
+                (QUEUED, QUEUED, RUNNING, now - self.stale_after),
+            )
+            row = conn.execute(
+                "SELECT id, params FROM jobs WHERE status = ? ORDER BY created LIMIT 1", (QUEUED,)
+            ).fetchone()
+            if row:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, stage = ?, worker = ?, heartbeat = ?, updated = ? WHERE id = ?",
+                    (RUNNING, "starting", self.worker_id, now, now, row["id"]),
+                )
+            conn.execute("COMMIT")
+            return (row["id"], json.loads(row["params"])) if row else None
+        except Exception:
+            try:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+            except sqlite3.Error:
+                pass
+            raise
+        finally:
+            conn.close()
+
+    def _update(self, job_id, **fields):
+        fields["updated"] = fields["heartbeat"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        conn = self._connect()
+        try:
+            conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", list(fields.values()) + [job_id])
+        finally:
+            conn.close()
+
+    def _work(self):
+        while True:
+            try:
+                self._work_once()
+            except Exception as e:
+                # Keep the worker; a job it could not finish is queued again once its heartbeat is stale.
+                print(f"Match job worker error: {str(e)}")
+                self._wakeup.wait(IDLE_POLL_SECONDS)
+
+    def _work_once(self):
+        try:
+            claimed = self._claim()
+        except sqlite3.Error as e:
+            print(f"Error claiming a match job: {str(e)}")
+            claimed = None
+        if claimed is None:
+            self._wakeup.wait(IDLE_POLL_SECONDS)
+            self._wakeup.clear()
+            return
+
+        job_id, params = claimed
+        with self._lock:
+            self._running.add(job_id)
+        try:
+            def report(stage, progress=None, detail=None):
+                fields = {"stage": stage, "detail": detail}
+                if progress is not None:
+                    fields["progress"] = progress
+                self._update(job_id, **fields)
+
+            result = self.runner(params, report)
+            self._update(job_id, status=DONE, stage=DONE, progress=1.0, result=json.dumps(result))
+        except Exception as e:
+            print(f"Match job {job_id} failed: {str(e)}")
+            try:
+                self._update(job_id, status=FAILED, stage=FAILED, error=str(e))
+            except sqlite3.Error as update_error:
+                print(f"Could not record the failure of match job {job_id}: {str(update_error)}")
+        finally:
+            with self._lock:
+                self._running.discard(job_id)
+
+    def _heartbeat(self):
+        # Long LLM calls report nothing for a while; keep their jobs from looking stale.
+        while True:
+            time.sleep(HEARTBEAT_SECONDS)
+            with self._lock:
+                running = list(self._running)
+            if not running:
+                continue
+            conn = self._connect()
+            try:
+                conn.executemany(
+                    "UPDATE jobs SET heartbeat = ? WHERE id = ?", [(time.time(), job_id) for job_id in running]
+                )
+            except sqlite3.Error as e:
+                print(f"Error updating match job heartbeats: {str(e)}")
+            finally:
+                conn.close()
@@ -0,0 +1,291 @@
+from typing import List, Literal
+from pydantic import BaseModel, ConfigDict, ValidationError
+
+# Model families that accept response_format={"type": "json_schema", "strict": True}.
+STRUCTURED_OUTPUT_MODEL_PREFIXES = ("gpt-4o", "gpt-4.1", "gpt-5", "o1", "o3", "o4")
+
+
+def supports_structured_output(model):
+    return bool(model) and model.startswith(STRUCTURED_OUTPUT_MODEL_PREFIXES)
+
+
+class StrictModel(BaseModel):
+    # extra="forbid" emits additionalProperties: false, which strict JSON schema mode requires.
+    model_config = ConfigDict(extra="forbid")
+
+
+class EmployeeScore(StrictModel):
+    name: str
+    match_percentage: int
+    summary: str
+
+
+class Contact(StrictModel):
+    phone: str
+    email: str
+    address: str
+
+
+class Education(StrictModel):
+    degree: str
+    institution: str
+    years: str
+
+
+class WorkExperience(StrictModel):
+    company: str
+    role: str
+    location: str
+    years: str
+    responsibilities: List[str]
+
+
+class SkillCategory(StrictModel):
+    category: str
+    description: str
+
+
+class CustomizedCV(StrictModel):
+    name: str
+    contact: Contact
+    education: Education
+    soft_skills: List[str]
+    languages: List[str]
+    work_experience: List[WorkExperience]
+    technical_skills: List[SkillCategory]
+
+    def to_cv_json(self):
+        """The dict layout create_cv_pdf expects (technical_skills as a category -> text mapping)."""
+        cv_json = self.model_dump(exclude={"technical_skills"})
+        cv_json["technical_skills"] = {
+            skill.category: skill.description for skill in self.technical_skills
+        }
+        return cv_json
+
+
+class ExperienceEdit(StrictModel):
+    id: int
+    responsibilities: List[str]
+
+
+class CVEdit(StrictModel):
+    """The changes that tailor an employee's stored profile (a CustomizedCV) to a project."""
+
+    experience_ids: List[int]
+    responsibilities: List[ExperienceEdit]
+    skill_order: List[str]
+    skill_changes: List[SkillCategory]
+
+    def apply_to(self, profile):
+        """The full CustomizedCV: the profile with these changes merged in.
+
+        Work experience ids are 1-based positions in the profile; unknown ids
+        are ignored, and an empty selection keeps every entry. The first
+        (most recent) position is always kept, in front if the model left it out.
+        """
+        experience = profile.work_experience
+        selected = [i - 1 for i in dict.fromkeys(self.experience_ids) if 1 <= i <= len(experience)]
+        if selected and 0 not in selected:
+            selected.insert(0, 0)
+        rewritten = {edit.id - 1: edit.responsibilities for edit in self.responsibilities}
+        work_experience = [
+            experience[i].model_copy(update={"responsibilities": rewritten[i]}) if i in rewritten else experience[i]
+            for i in selected or range(len(experience))
+        ]
+
+        skills = {skill.category: skill.description for skill in profile.technical_skills}
+        for change in self.skill_changes:
+            skills[change.category] = change.description
+        order = [category for category in dict.fromkeys(self.skill_order) if category in skills]
+        order.extend(category for category in skills if category not in order)
+
+        return profile.model_copy(update={
+            "work_experience": work_experience,
+            "technical_skills": [SkillCategory(category=category, description=skills[category]) for category in order],
+        })
+
+
+class CVMatchResult(StrictModel):
+    classification: Literal["Feasible", "Almost Feasible", "Not Feasible"]
+    employees: List[EmployeeScore]
+    barriers: List[str]
+    customized_cvs: List[CustomizedCV]
+
+    def matched_employees(self):
+        """Same records extract_matched_employees scrapes from the text response."""
+        return [
+            {
+                "name": employee.name,
+                "match_percentage": str(employee.match_percentage),
+                "skills": employee.summary,
+            }
+            for employee in self.employees
+        ]
+
+    def cv_json_list(self):
+        return [cv.to_cv_json() for cv in self.customized_cvs]
+
+    def to_text(self, minimum_match_percentage=70):
+        """Render the result in the layout of the text prompt, for display and download."""
+        lines = [f"CLASSIFICATION: {self.classification}", "", "SUITABLE EMPLOYEES:"]
+        lines.extend(
+            f"- {employee.name} - {employee.match_percentage}% - {employee.summary}"
+            for employee in self.employees
+        )
+
+        if not any(employee.match_percentage >= minimum_match_percentage for employee in self.employees):
+            lines.append(
+                f"No employees meet the required {minimum_match_percentage}% skills match for customized CV generation."
+            )
+
+        if self.barriers:
+            lines.extend(["", "BARRIERS:"])
+            lines.extend(f"- {barrier}" for barrier in self.barriers)
+
+        return "\n".join(lines)
+
+
+class MatchScores(StrictModel):
+    """First phase of a two-phase match: CVMatchResult without the customized CVs."""
+
+    classification: Literal["Feasible", "Almost Feasible", "Not Feasible"]
+    employees: List[EmployeeScore]
+    barriers: List[str]
+
+    def qualified(self, minimum_match_percentage=70):
+        return [employee for employee in self.employees if employee.match_percentage >= minimum_match_percentage]
+
+    def with_cvs(self, customized_cvs):
+        return CVMatchResult(customized_cvs=customized_cvs, **dict(self))
+
+
+class PastProjectMatch(StrictModel):
+    project_number: int
+    project_name: str
+    assigned_employee: str
+    similarity: int
+    technologies_used: List[str]
+    enhanced_technologies: List[str]
+    enhanced_similarity: int
+    description: str
+
+
+class PastProjectSummary(StrictModel):
+    best_match_project_number: int
+    best_match_similarity: int
+    main_technology_overlaps: List[str]
+    most_versatile_employees: List[str]
+
+
+class PastProjectRef(StrictModel):
+    """A matching past project by its number in the prompt (a 1-based index into the parsed project list), with what the model adds to it."""
+
+    project_number: int
+    enhanced_technologies: List[str]
+    enhanced_similarity: int
+
+
+class PastProjectRefs(StrictModel):
+    """What the model returns for a past project analysis; past_project_analyzer joins in the rest."""
+
+    new_project_technologies: List[str]
+    projects: List[PastProjectRef]
+
+
+class PastProjectAnalysis(StrictModel):
+    new_project_technologies: List[str]
+    projects: List[PastProjectMatch]
+    summary: PastProjectSummary
+
+    def to_employee_json(self):
+        """The {"employees": [...], "summary": {...}} layout of the text prompt's JSON block."""
+        employees = {}
+        for project in self.projects:
+            technologies = list(project.technologies_used)
+            technologies.extend(
+                tech for tech in project.enhanced_technologies if tech not in technologies
+            )
+            employees.setdefault(project.assigned_employee, []).append({
+                "project_number": project.project_number,
+                "project_name": project.project_name,
+                "similarity": project.similarity,
+                "technologies_used": technologies,
+                "matching_technologies": [],
+                "enhanced_technologies": project.enhanced_technologies,
+                "enhanced_similarity": project.enhanced_similarity,
+                "description": project.description,
+            })
+
+        return {
+            "employees": [
+                {"name": name, "projects": projects} for name, projects in employees.items()
+            ],
+            "summary": {
+                "matching_projects_count": len(self.projects),
+                "enhanced_projects_count": sum(1 for p in self.projects if p.enhanced_technologies),
+                "best_match": {
+                    "project_number": self.summary.best_match_project_number,
+                    "similarity": self.summary.best_match_similarity,
+                },
+                "main_technology_overlaps": self.summary.main_technology_overlaps,
+                "most_versatile_employees": self.summary.most_versatile_employees,
+            },
+        }
+
+    def to_text(self):
+        lines = ["NEW PROJECT TECHNOLOGIES:"]
+        lines.extend(f"- {tech}" for tech in self.new_project_technologies)
+        lines.extend(["", "MATCHING PAST PROJECTS:", ""])
+
+        for project in self.projects:
+            technologies = list(project.technologies_used)
+            technologies.extend(
+                tech for tech in project.enhanced_technologies if tech not in technologies
+            )
+            lines.append(f"### Project {project.project_number} - {project.project_name} : {project.assigned_employee}")
+            lines.append(f"**Technologies Used**: {', '.join(technologies)}")
+            lines.append(f"**Project Description**: {project.description}")
+            lines.append("")
+
+        enhanced_count = sum(1 for p in self.projects if p.enhanced_technologies)
+        lines.extend([
+            "SUMMARY:",
+            f"- Found {len(self.projects)} matching projects",
+            f"- Best match: Project {self.summary.best_match_project_number} with {self.summary.best_match_similarity}% similarity",
+            f"- Main technology overlaps: {', '.join(self.summary.main_technology_overlaps)}",
+            f"- Most versatile employees: {', '.join(self.summary.most_versatile_employees)}",
+            f"- Enhanced {enhanced_count} projects to reach 90%+ similarity by adding complementary technologies",
+        ])
+        return "\n".join(lines)
+
+
+def response_format_for(model_class):
+    """The response_format argument for a strict JSON schema derived from a result model."""
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": model_class.__name__,
+            "schema": model_class.model_json_schema(),
+            "strict": True,
+        },
+    }
+
+
+def parse_structured_response(response, model_class):
+    """Validate a structured response in one pass; returns None (and logs) if it does not conform."""
+    if not response or response.startswith("Error:"):
+        return None
+    try:
+        return model_class.model_validate_json(response)
+    except ValidationError as e:
+        print(f"Structured response does not match {model_class.__name__}: {str(e)}")
+        return None
+
+
+def cv_json_from_structured(cv_data):
+    """Convert one raw "customized_cvs" element into the create_cv_pdf layout; None if invalid."""
+    try:
+        return CustomizedCV.model_validate(cv_data).to_cv_json()
+    except ValidationError as e:
+        print(f"Customized CV does not match CustomizedCV: {str(e)}")
+        return None
@@ -0,0 +1,140 @@
+import os
+import json
+import base64
+import urllib.error
+import urllib.request
+# Re-exported, so clients catch the same errors the service raises.
+from matching_errors import MatchingServiceError, ServiceBusy, ServiceTimeout
+
+# Base URL of a running matching_service.py; unset runs the service in-process.
+MATCHING_SERVICE_URL = os.getenv("MATCHING_SERVICE_URL", "")
+# Seconds the service lets a request run before answering 504.
+SERVICE_TIMEOUT = float(os.getenv("SERVICE_TIMEOUT", "300"))
+
+
+def decode_result(result):
+    """Match results carry rendered PDFs base64-encoded over HTTP; turn them back into bytes."""
+    if result.get("cv_pdfs"):
+        result["cv_pdfs"] = {name: base64.b64decode(data) for name, data in result["cv_pdfs"].items()}
+    return result
+
+
+class MatchingClient:
+    """HTTP client of matching_service.py with the same methods as MatchingService."""
+
+    def __init__(self, base_url, timeout=None):
+        self.base_url = base_url.rstrip("/")
+        # A little longer than the service's own timeout, so its 504 arrives first.
+        self.timeout = (SERVICE_TIMEOUT + 10) if timeout is None else timeout
+
+    def _post(self, path, payload):
+        request = urllib.request.Request(
+            self.base_url + path,
+            data=json.dumps(payload).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        try:
+            return urllib.request.urlopen(request, timeout=self.timeout)
+        except urllib.error.HTTPError as e:
+            try:
+                message = json.loads(e.read().decode("utf-8")).get("error", str(e))
+            except (ValueError, AttributeError):
+                message = str(e)
+            raise MatchingServiceError(message, status=e.code)
+        except (urllib.error.URLError, OSError) as e:
+            raise MatchingServiceError(f"Matching service not reachable at {self.base_url}: {str(e)}", status=502)
+
+    def _post_json(self, path, payload):
+        with self._post(path, payload) as response:
+            return json.loads(response.read().decode("utf-8"))
+
+    def match(self, project_description, model="gpt-4o-mini", min_match_percentage=70,
+              past_project_min_similarity=60, render_pdfs=False, on_cv=None):
+        payload = {
+            "project_description": project_description,
+            "model": model,
+            "min_match_percentage": min_match_percentage,
+            "past_project_min_similarity": past_project_min_similarity,
+            "render_pdfs": render_pdfs,
+        }
+        if on_cv is None:
+            return decode_result(self._post_json("/match", payload))
+
+        # Streamed: one JSON event per line, each customized CV as soon as it is complete.
+        payload["stream"] = True
+        with self._post("/match", payload) as response:
+            for line in response:
+                if not line.strip():
+                    continue
+                event = json.loads(line.decode("utf-8"))
+                if event["event"] == "cv":
+                    on_cv(event["cv"])
+                elif event["event"] == "result":
+                    return decode_result(event["result"])
+                elif event["event"] == "error":
+                    raise MatchingServiceError(event["error"], status=event.get("status", 500))
+        raise MatchingServiceError("Matching service closed the stream without a result", status=502)
+
+    def submit_match(self, project_description, model="gpt-4o-mini", min_match_percentage=70,
+                     past_project_min_similarity=60, render_pdfs=False, force=False):
+        response = self._post_json(
+            "/jobs",
+            {
+                "project_description": project_description,
+                "model": model,
+                "min_match_percentage": min_match_percentage,
+                "past_project_min_similarity": past_project_min_similarity,
+                "render_pdfs": render_pdfs,
+                "force": force,
+            },
+        )
+        return response["job_id"]
+
+    def get_job(self, job_id):
+        try:
+            with urllib.request.urlopen(f"{self.base_url}/jobs/{job_id}", timeout=self.timeout) as response:
+                job = json.loads(response.read().decode("utf-8"))
+        except urllib.error.HTTPError as e:
+            if e.code == 404:
+                return None
+            raise MatchingServiceError(str(e), status=e.code)
+        except (urllib.error.URLError, OSError) as e:
+            raise MatchingServiceError(f"Matching service not reachable at {self.base_url}: {str(e)}", status=502)
+        if job["result"]:
+            job["result"] = decode_result(job["result"])
+        return job
+
+    def client_letter(self, job_id):
+        return self._post_json("/client-letter", {"job_id": job_id})["client_letter"]
+
+    def analyze_past_projects(self, project_description, min_similarity=60, matching_result=None, matched_employees=None,
+                              min_match_percentage=70):
+        return self._post_json(
+            "/past-projects",
+            {
+                "project_description": project_description,
+                "min_similarity": min_similarity,
+                "matching_result": matching_result,
+                "matched_employees": matched_employees,
+                "min_match_percentage": min_match_percentage,
+            },
+        )
+
+    def render_cv_pdf(self, cv_json):
+        with self._post("/render/cv-pdf", {"cv": cv_json}) as response:
+            return response.read()
+
+    def render_employee_projects_pdf(self, employee):
+        with self._post("/render/employee-projects-pdf", {"employee": employee}) as response:
+            return response.read()
+
+
+def get_matching_client():
+    """MatchingClient for MATCHING_SERVICE_URL, or the in-process MatchingService when it is unset."""
+    if MATCHING_SERVICE_URL:
+        return MatchingClient(MATCHING_SERVICE_URL)
+
+    from matching_service import get_matching_service
+
+    return get_matching_service()
@@ -0,0 +1,16 @@
+class MatchingServiceError(Exception):
+    """A request the matching service rejected or could not complete; `status` is the HTTP status."""
+
+    def __init__(self, message, status=500):
+        super().__init__(message)
+        self.status = status
+
+
+class ServiceBusy(MatchingServiceError):
+    def __init__(self, message="Matching service is busy, try again shortly"):
+        super().__init__(message, status=503)
+
+
+class ServiceTimeout(MatchingServiceError):
+    def __init__(self, message="Matching request timed out"):
+        super().__init__(message, status=504)
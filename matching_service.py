@@ -0,0 +1,631 @@
+#!/usr/bin/env python3
+"""Headless HTTP API for CV matching, past project analysis and PDF rendering.
+
+    python matching_service.py --port 8600 --workers 4
+
+Endpoints (JSON in, JSON out unless noted):
+    POST /match                          project_description, model, min_match_percentage,
+                                         past_project_min_similarity, render_pdfs, stream
+    POST /past-projects                  project_description, min_similarity, matching_result | matched_employees
+    POST /render/cv-pdf                  cv -> application/pdf
+    POST /render/employee-projects-pdf   employee -> application/pdf
+    POST /jobs                           same as /match plus force; queues it -> {"job_id": ...}
+    GET  /jobs/<id>                      status, stage, progress, detail, error, result
+    POST /client-letter                  job_id -> {"client_letter": ...} (written on first request, then kept with the job)
+    GET  /health, GET /ready
+
+With "stream": true, /match answers with newline-delimited JSON events:
+{"event": "cv", "cv": ...} for each customized CV as it completes, then
+{"event": "result", "result": ...} (or {"event": "error", ...}).
+
+"model": "cascade" screens all employees with a cheap model and re-evaluates
+only the borderline ones with a stronger model (see model_cascade.py).
+"""
+
+import os
+import json
+import time
+import queue
+import base64
+import argparse
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from cv_corpus import get_app_registry, build_cv_text
+from llm_scheduler import get_scheduler
+from cv_matching_prompt import get_cv_matching_prompt, build_cv_matching_user_prompt
+from cv_stream_extractor import stream_cvs
+from match_models import CVMatchResult, supports_structured_output, response_format_for, parse_structured_response
+from past_project_analyzer import analyze_past_projects, extract_matched_employees, qualified_matched_employees
+from matching_errors import MatchingServiceError, ServiceBusy, ServiceTimeout
+from matching_client import SERVICE_TIMEOUT, decode_result
+from match_jobs import JobQueue, job_key, DONE
+from model_cascade import CASCADE_MODEL, run_cascade, fit_model
+from two_phase_matching import TWO_PHASE_MATCHING, run_two_phase
+from client_letter import write_client_letter
+from rate_limiter import estimate_tokens
+
+# The API has no authentication, so it only listens on loopback unless told otherwise.
+SERVICE_HOST = os.getenv("SERVICE_HOST", "127.0.0.1")
+SERVICE_WORKERS = int(os.getenv("SERVICE_WORKERS", "4"))
+# Requests allowed to wait for a worker; beyond that the service answers 503.
+SERVICE_MAX_PENDING = int(os.getenv("SERVICE_MAX_PENDING", "16"))
+MAX_BODY_BYTES = 1024 * 1024
+# Job progress when a stage of run_match starts.
+STAGE_PROGRESS = {"matching": 0.1, "escalating": 0.4, "generating_cvs": 0.4, "past_projects": 0.7}
+
+
+def note(notes, level, message):
+    notes.append({"level": level, "message": message})
+
+
+def select_cv_text(registry, notes):
+    """The CV corpus text for the prompt: the JSON CVs, or the PDF text when there are none."""
+    cv_json_snapshot = registry.get("cv_json")
+    for failed_path, error in cv_json_snapshot.errors.items():
+        note(notes, "error", f"Error loading {os.path.basename(failed_path)}: {error}")
+
+    cv_json_data = cv_json_snapshot.value
+    if cv_json_data:
+        note(notes, "info", "Using JSON CV data for matching")
+        return build_cv_text(cv_json_data)
+
+    note(notes, "info", "Using PDF CV data for matching (consider converting to JSON for better performance)")
+    cv_pdf_snapshot = registry.get("cv_pdf")
+    for failed_path, error in cv_pdf_snapshot.errors.items():
+        note(notes, "error", f"Error processing {os.path.basename(failed_path)}: {error}")
+    for cv_file, cv_text in cv_pdf_snapshot.items.items():
+        if not cv_text:
+            note(notes, "warning", f"Could not extract text from {os.path.basename(cv_file)}")
+
+    if not cv_pdf_snapshot.value:
+        raise MatchingServiceError(
+            "Failed to extract text from any CV files. Please check the files and try again.", status=422
+        )
+    return "\n\n=====\n\n".join(cv_pdf_snapshot.value)
+
+
+def run_past_project_analysis(project_description, min_similarity, matching_result=None, matched_employees=None,
+                              min_match_percentage=70):
+    """Past project analysis with employees assigned to the projects.
+
+    `min_similarity` is a percentage; `matched_employees` defaults to the
+    employees of the text `matching_result`, and only those reaching
+    min_match_percentage are assigned. Returns a dict with the analysis text
+    (None if no past project is similar enough), the per-employee project
+    JSON, the matched employees and the qualified ones it was based on.
+    Raises MatchingServiceError if the analysis itself fails.
+    """
+    if matched_employees is None:
+        matched_employees = extract_matched_employees(matching_result)
+    qualified = qualified_matched_employees(matched_employees, min_match_percentage)
+    analysis = analyze_past_projects(
+        project_description, min_similarity=min_similarity / 100.0, matched_employees=qualified,
+        min_match_percentage=min_match_percentage,
+    )
+
+    result = {
+        "analysis": None,
+        "employee_projects": None,
+        "matched_employees": matched_employees,
+        "qualified_employees": qualified,
+        "reason": None,
+        "message": None,
+    }
+    if analysis is None:
+        result["reason"] = "no_similar_projects"
+        result["message"] = "No similar past projects found or no project data available"
+        return result
+
+    if not matched_employees:
+        result["reason"] = "no_matched_employees"
+        result["message"] = "No employees found in the CV matching response. Cannot proceed with employee assignment for past project analysis."
+        return result
+
+    if not qualified:
+        result["reason"] = "no_qualified_employees"
+        result["message"] = f"No employees reach the required {min_match_percentage}% skills match, so none were assigned to past projects."
+        return result
+
+    result["employee_projects"] = analysis.to_employee_json()
+    result["analysis"] = analysis.to_text()
+    return result
+
+
+def run_match(registry, scheduler, project_description, model="gpt-4o-mini", min_match_percentage=70,
+              past_project_min_similarity=60, render_pdfs=False, on_cv=None, on_stage=None):
+    """One full match: CV matching (streamed), customized CVs, optional PDFs and past project analysis.
+
+    model="cascade" screens with a cheap model and escalates borderline
+    employees (see model_cascade); other models score first and then write
+    the customized CVs in parallel unless TWO_PHASE_MATCHING is off (see
+    two_phase_matching). on_stage(stage) is called when the "matching",
+    "escalating" or "generating_cvs" and "past_projects" stages start.
+    """
+    from json_to_pdf import extract_json_from_response
+
+    on_stage = on_stage or (lambda stage: None)
+    notes = []
+    cv_text = select_cv_text(registry, notes)
+    excel_data = registry.get("excel").value[1]
+
+    # The cascade builds its own prompts for the screening and the escalation.
+    cascade = model == CASCADE_MODEL
+    if not cascade:
+        prompt = build_cv_matching_user_prompt(
+            cv_text, project_description, minimum_match_percentage=min_match_percentage, excel_data=excel_data
+        )
+        fitted = fit_model(model, estimate_tokens(get_cv_matching_prompt(structured=supports_structured_output(model)), prompt))
+        if fitted != model:
+            note(notes, "info", f"The CVs do not fit into the context window of {model}; using {fitted} instead.")
+            model = fitted
+    structured = cascade or supports_structured_output(model)
+
+    pipeline = None
+    temp_dir = None
+    if render_pdfs:
+        from cv_output_pipeline import CVOutputPipeline
+
+        temp_dir = tempfile.TemporaryDirectory()
+        pipeline = CVOutputPipeline(temp_dir.name, write_json=False)
+
+    def on_streamed_cv(cv_json):
+        if pipeline is not None:
+            pipeline.submit(cv_json)
+        if on_cv is not None:
+            on_cv(cv_json)
+
+    cv_pdfs = {}
+    match_result = None
+    on_stage("matching")
+    cv_store = registry.cv_store() if registry.get("cv_json").value else None
+    try:
+        if cascade:
+            match_result, usage = run_cascade(
+                scheduler, project_description, cv_text, min_match_percentage=min_match_percentage,
+                excel_data=excel_data, on_cv=on_streamed_cv, on_stage=on_stage, notes=notes, cv_store=cv_store,
+            )
+            response = match_result.to_text(min_match_percentage)
+        elif TWO_PHASE_MATCHING:
+            response, match_result, usage = run_two_phase(
+                scheduler, model, project_description, cv_text, min_match_percentage=min_match_percentage,
+                excel_data=excel_data, on_cv=on_streamed_cv, on_stage=on_stage, notes=notes, cv_store=cv_store,
+            )
+        else:
+            response = stream_cvs(
+                scheduler.stream_response(
+                    prompt=prompt,
+                    model=model,
+                    system_prompt=get_cv_matching_prompt(structured=structured),
+                    priority="interactive",
+                    response_format=response_format_for(CVMatchResult) if structured else None,
+                ),
+                on_streamed_cv,
+                structured=structured,
+            )
+            usage = scheduler.last_usage
+    finally:
+        if pipeline is not None:
+            for rendered in pipeline.close():
+                if rendered["pdf_path"]:
+                    with open(rendered["pdf_path"], "rb") as f:
+                        cv_pdfs[rendered["name"]] = f.read()
+            temp_dir.cleanup()
+
+    if response.startswith("Error:"):
+        raise MatchingServiceError(response[len("Error:"):].strip(), status=502)
+
+    if structured and match_result is None:
+        match_result = parse_structured_response(response, CVMatchResult)
+        if match_result is not None:
+            response = match_result.to_text(min_match_percentage)
+        else:
+            note(notes, "warning", "The structured matching response could not be validated; falling back to text extraction.")
+
+    if match_result is not None:
+        cv_json_list = match_result.cv_json_list()
+        matched_employees = match_result.matched_employees()
+    else:
+        cv_json_list = extract_json_from_response(response) or []
+        matched_employees = None
+
+    past_projects = None
+    if past_project_min_similarity > 0:
+        on_stage("past_projects")
+        try:
+            past_projects = run_past_project_analysis(
+                project_description,
+                past_project_min_similarity,
+                matching_result=response,
+                matched_employees=matched_employees,
+                min_match_percentage=min_match_percentage,
+            )
+            matched_employees = past_projects["matched_employees"]
+        except Exception as e:
+            # The CV matching result is still worth returning on its own.
+            print(f"Error analyzing past projects: {str(e)}")
+            past_projects = {
+                "analysis": None,
+                "employee_projects": None,
+                "matched_employees": matched_employees or [],
+                "qualified_employees": [],
+                "reason": "error",
+                "message": f"Error analyzing past projects: {str(e)}",
+            }
+
+    return {
+        "response": response,
+        "cv_json_list": cv_json_list,
+        "matched_employees": matched_employees or [],
+        "past_projects": past_projects,
+        "cv_pdfs": cv_pdfs,
+        "usage": usage,
+        "notes": notes,
+    }
+
+
+def render_cv_pdf(cv_json):
+    from json_to_pdf import create_cv_pdf
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        pdf_path = create_cv_pdf(cv_json, os.path.join(temp_dir, "cv.pdf"))
+        with open(pdf_path, "rb") as f:
+            return f.read()
+
+
+def render_employee_projects_pdf(employee):
+    from employee_projects_to_pdf import create_employee_project_pdf
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        pdf_path = create_employee_project_pdf(employee, os.path.join(temp_dir, "projects.pdf"))
+        if not pdf_path:
+            raise MatchingServiceError("Could not render the employee project PDF")
+        with open(pdf_path, "rb") as f:
+            return f.read()
+
+
+class MatchingService:
+    """Runs matching requests on a bounded worker pool sharing one corpus registry and scheduler.
+
+    At most `workers` requests run at a time and `max_pending` more may wait;
+    further requests are rejected with ServiceBusy; queued jobs wait for a
+    slot instead. A request that takes longer
+    than `timeout` seconds raises ServiceTimeout (its worker finishes the
+    request in the background). The app uses this object directly when no
+    MATCHING_SERVICE_URL is set, and the HTTP handler wraps the same methods.
+    """
+
+    def __init__(self, registry=None, scheduler=None, workers=None, max_pending=None, timeout=None):
+        self.registry = registry or get_app_registry()
+        self.scheduler = scheduler or get_scheduler()
+        self.workers = workers or SERVICE_WORKERS
+        self.timeout = SERVICE_TIMEOUT if timeout is None else timeout
+        pending = SERVICE_MAX_PENDING if max_pending is None else max_pending
+        self._slots = threading.BoundedSemaphore(self.workers + pending)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="matching")
+        self._jobs = None
+        self._jobs_lock = threading.Lock()
+
+    def _submit(self, fn, *args, block=False, **kwargs):
+        if not self._slots.acquire(blocking=block):
+            raise ServiceBusy()
+        try:
+            future = self._executor.submit(fn, *args, **kwargs)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def _result(self, future, deadline):
+        try:
+            return future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except FutureTimeoutError:
+            raise ServiceTimeout()
+
+    def _call(self, fn, *args, **kwargs):
+        deadline = time.monotonic() + self.timeout
+        return self._result(self._submit(fn, *args, **kwargs), deadline)
+
+    def match(self, project_description, model="gpt-4o-mini", min_match_percentage=70,
+              past_project_min_similarity=60, render_pdfs=False, on_cv=None):
+        """Run a match on a worker; on_cv(cv_json) is called on the caller's thread as CVs complete."""
+        deadline = time.monotonic() + self.timeout
+        events = queue.Queue() if on_cv is not None else None
+        future = self._submit(
+            run_match, self.registry, self.scheduler, project_description,
+            model=model,
+            min_match_percentage=min_match_percentage,
+            past_project_min_similarity=past_project_min_similarity,
+            render_pdfs=render_pdfs,
+            on_cv=events.put if events is not None else None,
+        )
+
+        while events is not None:
+            try:
+                on_cv(events.get(timeout=0.1))
+            except queue.Empty:
+                if future.done() and events.empty():
+                    break
+                if time.monotonic() >= deadline:
+                    raise ServiceTimeout()
+        return self._result(future, deadline)
+
+    def analyze_past_projects(self, project_description, min_similarity=60, matching_result=None, matched_employees=None,
+                              min_match_percentage=70):
+        return self._call(
+            run_past_project_analysis, project_description, min_similarity,
+            matching_result=matching_result,
+            matched_employees=matched_employees,
+            min_match_percentage=min_match_percentage,
+        )
+
+    def render_cv_pdf(self, cv_json):
+        return self._call(render_cv_pdf, cv_json)
+
+    @property
+    def jobs(self):
+        with self._jobs_lock:
+            if self._jobs is None:
+                self._jobs = JobQueue(self._run_job).start()
+            return self._jobs
+
+    def _run_job(self, params, report):
+        received = []
+
+        def on_cv(cv_json):
+            received.append(cv_json.get("name", "CV"))
+            report("matching", detail=f"Received customized CV for: {', '.join(received)}")
+
+        # Jobs share the request workers, so they count against the same concurrency limit.
+        future = self._submit(
+            run_match, self.registry, self.scheduler,
+            on_cv=on_cv,
+            on_stage=lambda stage: report(stage, STAGE_PROGRESS[stage]),
+            block=True,
+            **params,
+        )
+        return encode_result(future.result())
+
+    def submit_match(self, project_description, model="gpt-4o-mini", min_match_percentage=70,
+                     past_project_min_similarity=60, render_pdfs=False, force=False):
+        """Queue a match as a background job; returns its id.
+
+        An identical request against unchanged CV and Excel files returns the
+        id of the existing job (running or finished) unless `force` is set.
+        """
+        params = {
+            "project_description": project_description,
+            "model": model,
+            "min_match_percentage": min_match_percentage,
+            "past_project_min_similarity": past_project_min_similarity,
+            "render_pdfs": render_pdfs,
+        }
+        corpus_state = [self.registry.fingerprint(name) for name in ("cv_json", "cv_pdf", "excel")]
+        return self.jobs.submit(params, key=job_key(params, corpus_state), force=force)
+
+    def get_job(self, job_id):
+        """Status, stage, progress and (once done) the match result of a job; None if unknown."""
+        job = self.jobs.get(job_id)
+        if job and job["result"]:
+            job["result"] = decode_result(job["result"])
+        return job
+
+    def client_letter(self, job_id):
+        """The client letter of a finished match job; written on the first request and stored with the job."""
+        job = self.jobs.get(job_id)
+        if job is None:
+            raise MatchingServiceError("Unknown job", status=404)
+        if job["status"] != DONE:
+            raise MatchingServiceError("The match has not finished", status=409)
+        letter = job["result"].get("client_letter")
+        if letter is None:
+            params = job["params"]
+            letter = self._call(
+                write_client_letter, self.scheduler, params["project_description"], job["result"]["response"],
+                model=params["model"], excel_data=self.registry.get("excel").value[1],
+            )
+            if letter.startswith("Error:"):
+                raise MatchingServiceError(letter[len("Error:"):].strip(), status=502)
+            self.jobs.update_result(job_id, client_letter=letter)
+        return letter
+
+    def render_employee_projects_pdf(self, employee):
+        return self._call(render_employee_projects_pdf, employee)
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_matching_service():
+    """Process-wide MatchingService."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = MatchingService()
+        return _service
+
+
+def encode_result(result):
+    result = dict(result)
+    result["cv_pdfs"] = {name: base64.b64encode(data).decode("ascii") for name, data in result["cv_pdfs"].items()}
+    return result
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    service = None
+    warm_start = None
+
+    def do_GET(self):
+        if self.path.startswith("/jobs/"):
+            job = self.service.jobs.get(self.path[len("/jobs/"):])
+            if job is None:
+                self._send_json(404, {"error": "unknown job"})
+            else:
+                self._send_json(200, job)
+        elif self.path == "/health":
+            self._send_json(200, {"status": "ok"})
+        elif self.path == "/ready":
+            status = self.warm_start.status() if self.warm_start else {"ready": True}
+            self._send_json(200 if status["ready"] else 503, status)
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        routes = {
+            "/match": self._match,
+            "/jobs": self._submit_job,
+            "/client-letter": self._client_letter,
+            "/past-projects": self._past_projects,
+            "/render/cv-pdf": self._render_cv_pdf,
+            "/render/employee-projects-pdf": self._render_employee_projects_pdf,
+        }
+        handler = routes.get(self.path)
+        if handler is None:
+            self._send_json(404, {"error": "not found"})
+            return
+
+        try:
+            handler(self._read_json())
+        except MatchingServiceError as e:
+            self._send_json(e.status, {"error": str(e)}, retry_after=5 if e.status == 503 else None)
+        except Exception as e:
+            print(f"Error handling {self.path}: {str(e)}")
+            self._send_json(500, {"error": str(e)})
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            raise MatchingServiceError("Request body too large", status=413)
+        try:
+            body = json.loads(self.rfile.read(length).decode("utf-8") or "{}")
+        except ValueError as e:
+            raise MatchingServiceError(f"Invalid JSON: {str(e)}", status=400)
+        if not isinstance(body, dict):
+            raise MatchingServiceError("Request body must be a JSON object", status=400)
+        return body
+
+    def _int(self, body, key, default):
+        try:
+            return int(body.get(key, default))
+        except (TypeError, ValueError):
+            raise MatchingServiceError(f"'{key}' must be an integer", status=400)
+
+    def _require(self, body, key):
+        if not body.get(key):
+            raise MatchingServiceError(f"Missing '{key}'", status=400)
+        return body[key]
+
+    def _match_args(self, body):
+        return dict(
+            project_description=self._require(body, "project_description"),
+            model=body.get("model") or "gpt-4o-mini",
+            min_match_percentage=self._int(body, "min_match_percentage", 70),
+            past_project_min_similarity=self._int(body, "past_project_min_similarity", 60),
+            render_pdfs=bool(body.get("render_pdfs", False)),
+        )
+
+    def _submit_job(self, body):
+        job_id = self.service.submit_match(force=bool(body.get("force", False)), **self._match_args(body))
+        self._send_json(202, {"job_id": job_id})
+
+    def _client_letter(self, body):
+        self._send_json(200, {"client_letter": self.service.client_letter(self._require(body, "job_id"))})
+
+    def _match(self, body):
+        kwargs = self._match_args(body)
+        if not body.get("stream"):
+            self._send_json(200, encode_result(self.service.match(**kwargs)))
+            return
+
+        started = []
+
+        def write_event(event):
+            if not started:
+                # Headers go out with the first event, so a busy service still answers 503.
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                started.append(True)
+            self.wfile.write(json.dumps(event).encode("utf-8") + b"\n")
+            self.wfile.flush()
+
+        try:
+            result = self.service.match(on_cv=lambda cv: write_event({"event": "cv", "cv": cv}), **kwargs)
+            write_event({"event": "result", "result": encode_result(result)})
+        except MatchingServiceError as e:
+            if not started:
+                raise
+            write_event({"event": "error", "error": str(e), "status": e.status})
+        self.close_connection = True
+
+    def _past_projects(self, body):
+        result = self.service.analyze_past_projects(
+            self._require(body, "project_description"),
+            min_similarity=self._int(body, "min_similarity", 60),
+            matching_result=body.get("matching_result"),
+            matched_employees=body.get("matched_employees"),
+            min_match_percentage=self._int(body, "min_match_percentage", 70),
+        )
+        self._send_json(200, result)
+
+    def _render_cv_pdf(self, body):
+        self._send_pdf(self.service.render_cv_pdf(self._require(body, "cv")))
+
+    def _render_employee_projects_pdf(self, body):
+        self._send_pdf(self.service.render_employee_projects_pdf(self._require(body, "employee")))
+
+    def _send_json(self, code, body, retry_after=None):
+        self._send(code, "application/json", json.dumps(body).encode("utf-8"), retry_after)
+
+    def _send_pdf(self, data):
+        self._send(200, "application/pdf", data)
+
+    def _send(self, code, content_type, data, retry_after=None):
+        self.send_response(code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        if retry_after:
+            self.send_header("Retry-After", str(retry_after))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        if self.path not in ("/health", "/ready"):
+            super().log_message(format, *args)
+
+
+def serve(service, host=SERVICE_HOST, port=8600, warm_start=None):
+    handler = type("BoundServiceHandler", (ServiceHandler,), {"service": service, "warm_start": warm_start})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    print(f"Matching service on http://{host}:{port} with {service.workers} workers")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless CV matching service")
+    parser.add_argument("--host", default=SERVICE_HOST, help="Address to listen on (use 0.0.0.0 only behind an authenticating proxy)")
+    parser.add_argument("--port", type=int, default=int(os.getenv("SERVICE_PORT", "8600")))
+    parser.add_argument("--workers", type=int, default=SERVICE_WORKERS, help="Requests processed in parallel")
+    parser.add_argument("--max_pending", type=int, default=SERVICE_MAX_PENDING, help="Requests allowed to wait for a worker")
+    parser.add_argument("--timeout", type=float, default=SERVICE_TIMEOUT, help="Seconds before a request is answered with 504")
+    args = parser.parse_args()
+
+    from warm_start import start_warm_start
+
+    service = MatchingService(workers=args.workers, max_pending=args.max_pending, timeout=args.timeout)
+    warm_start = start_warm_start(service.registry, service.scheduler, readiness_endpoint=False)
+    serve(service, host=args.host, port=args.port, warm_start=warm_start)
+
+
+if __name__ == "__main__":
+    main()
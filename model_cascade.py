@@ -0,0 +1,266 @@
+import os
+import re
+from cv_matching_prompt import get_cv_matching_prompt, get_cv_scoring_prompt, build_cv_matching_user_prompt
+from cv_stream_extractor import stream_cvs
+from match_models import CVMatchResult, MatchScores, supports_structured_output, response_format_for, parse_structured_response
+from matching_errors import MatchingServiceError
+from rate_limiter import estimate_tokens
+
+# The model value that selects the cascade instead of a single model.
+CASCADE_MODEL = "cascade"
+
+
+def _model_list(value):
+    # The cascade merges validated CVMatchResults, so only models with structured output qualify.
+    return [model.strip() for model in value.split(",") if supports_structured_output(model.strip())]
+
+
+# Every employee is screened by the first of these whose context window fits the prompt...
+CASCADE_SCREEN_MODELS = _model_list(os.getenv("CASCADE_SCREEN_MODELS", "gpt-4o-mini,gpt-4.1-mini"))
+# ...and employees scored within CASCADE_BAND points of the minimum match are re-evaluated by one of these.
+CASCADE_STRONG_MODELS = _model_list(os.getenv("CASCADE_STRONG_MODELS", "gpt-4o,gpt-4.1"))
+CASCADE_BAND = int(os.getenv("CASCADE_BAND", "10"))
+# Tokens left free for the completion when a prompt is checked against a context window.
+COMPLETION_RESERVE = int(os.getenv("COMPLETION_RESERVE", "8000"))
+
+MODEL_CONTEXT_WINDOWS = {
+    "gpt-3.5-turbo": 16385,
+    "gpt-4": 8192,
+    "gpt-4-turbo": 128000,
+    "gpt-4o": 128000,
+    "gpt-4o-mini": 128000,
+    "gpt-4.1": 1047576,
+    "gpt-4.1-mini": 1047576,
+    "gpt-4.1-nano": 1047576,
+}
+# Comparable models with a larger context window, tried in order when a prompt does not fit.
+LARGER_CONTEXT_MODELS = {
+    "gpt-3.5-turbo": ["gpt-4o-mini", "gpt-4.1-mini"],
+    "gpt-4": ["gpt-4o", "gpt-4.1"],
+    "gpt-4-turbo": ["gpt-4.1"],
+    "gpt-4o": ["gpt-4.1"],
+    "gpt-4o-mini": ["gpt-4.1-mini"],
+}
+
+CLASSIFICATIONS = ["Not Feasible", "Almost Feasible", "Feasible"]
+# Blocks of the CV corpus text: "===== CV: <name> =====" headers (JSON CVs) or "=====" separators (PDF text).
+CV_BLOCK_SPLIT = re.compile(r"(?=^===== CV: )|\n\n=====\n\n", re.MULTILINE)
+# A CV's name is in its header or first lines.
+CV_HEAD_CHARS = 500
+
+
+def base_model(model):
+    """The MODEL_CONTEXT_WINDOWS entry of a model, also for dated snapshots (gpt-4o-2024-08-06)."""
+    known = [name for name in MODEL_CONTEXT_WINDOWS if model == name or model.startswith(name + "-")]
+    return max(known, key=len) if known else None
+
+
+def fits(model, prompt_tokens):
+    base = base_model(model)
+    # Unknown models are assumed to fit; the API reports it if they do not.
+    return base is None or prompt_tokens + COMPLETION_RESERVE <= MODEL_CONTEXT_WINDOWS[base]
+
+
+def fit_model(model, prompt_tokens):
+    """`model`, or a comparable model with a larger context window if the prompt does not fit it."""
+    if fits(model, prompt_tokens):
+        return model
+    for candidate in LARGER_CONTEXT_MODELS.get(base_model(model), []):
+        if fits(candidate, prompt_tokens):
+            return candidate
+    return model
+
+
+def first_fitting(models, prompt_tokens):
+    """The first of `models` whose context window fits the prompt (the last one if none does)."""
+    for model in models:
+        if fits(model, prompt_tokens):
+            return model
+    return models[-1]
+
+
+def name_tokens(name):
+    # File-derived names use underscores ("Christian_Tu_CV"); split them like spaces.
+    return set(re.findall(r"[^\W_]+", name.casefold()))
+
+
+def same_employee(name, other):
+    """Names written by the model may drop or add a middle name or title; compare their words."""
+    tokens, other_tokens = name_tokens(name), name_tokens(other)
+    return bool(tokens and other_tokens) and (tokens <= other_tokens or other_tokens <= tokens)
+
+
+def is_escalated(name, escalated):
+    return any(same_employee(name, other) for other in escalated)
+
+
+def borderline_employees(match_result, min_match_percentage, band=None):
+    """Names of the employees whose score is within `band` points of the minimum match."""
+    band = CASCADE_BAND if band is None else band
+    return [
+        employee.name for employee in match_result.employees
+        if abs(employee.match_percentage - min_match_percentage) < band
+    ]
+
+
+def select_cv_blocks(cv_text, names):
+    """The CVs of `names` from the corpus text, in the same layout."""
+    selected = []
+    for block in CV_BLOCK_SPLIT.split(cv_text):
+        head = name_tokens(block[:CV_HEAD_CHARS])
+        if block.strip() and any(name_tokens(name) <= head for name in names if name_tokens(name)):
+            selected.append(block)
+    if cv_text.startswith("===== CV: "):
+        return "".join(selected)
+    return "\n\n=====\n\n".join(selected)
+
+
+def merge_results(screened, escalated_result, escalated, min_match_percentage):
+    """The screening result with the escalated employees' scores and CVs taken from the strong model."""
+    employees = []
+    for employee in screened.employees:
+        if is_escalated(employee.name, escalated):
+            employee = next(
+                (strong for strong in escalated_result.employees if same_employee(strong.name, employee.name)),
+                employee,
+            )
+        employees.append(employee)
+
+    customized_cvs = [cv for cv in screened.customized_cvs if not is_escalated(cv.name, escalated)]
+    customized_cvs.extend(cv for cv in escalated_result.customized_cvs if is_escalated(cv.name, escalated))
+
+    if any(employee.match_percentage >= min_match_percentage for employee in employees):
+        classification = "Feasible"
+    else:
+        # Nobody qualifies on their own any more; keep the more favourable of the two other verdicts.
+        classification = CLASSIFICATIONS[min(
+            1, max(CLASSIFICATIONS.index(screened.classification), CLASSIFICATIONS.index(escalated_result.classification))
+        )]
+
+    barriers = []
+    if classification != "Feasible":
+        barriers = list(screened.barriers)
+        barriers.extend(barrier for barrier in escalated_result.barriers if barrier not in barriers)
+
+    return CVMatchResult(
+        classification=classification,
+        employees=employees,
+        barriers=barriers,
+        customized_cvs=customized_cvs,
+    )
+
+
+def combine_usage(usages):
+    """One usage record for several calls of a match; `model` names every model used."""
+    usages = [usage for usage in usages if usage]
+    if not usages:
+        return None
+    combined = {"model": " + ".join(dict.fromkeys(usage["model"] for usage in usages))}
+    for key in ("prompt_tokens", "cached_tokens", "completion_tokens", "total_tokens"):
+        combined[key] = sum(usage.get(key) or 0 for usage in usages)
+    return combined
+
+
+def run_cascade(scheduler, project_description, cv_text, min_match_percentage=70, excel_data=None,
+                on_cv=None, on_stage=None, notes=None, priority="interactive", cv_store=None):
+    """Score with a cheap model and re-evaluate only the borderline employees with a strong one.
+
+    The screening only scores (MatchScores). Qualified employees it already
+    decided get their CVs written by the cheap model, one call each (see
+    two_phase_matching.write_customized_cvs), after on_stage("generating_cvs");
+    on_stage("escalating") is called before the strong model scores the
+    borderline employees and writes their CVs as it streams. Returns
+    (CVMatchResult, usage).
+    """
+    # Imported here: two_phase_matching builds on this module.
+    from two_phase_matching import write_customized_cvs
+
+    if not CASCADE_SCREEN_MODELS or not CASCADE_STRONG_MODELS:
+        raise MatchingServiceError("The cascade needs screening and strong models with structured output", status=500)
+
+    on_cv = on_cv or (lambda cv_json: None)
+    on_stage = on_stage or (lambda stage: None)
+    notes = notes if notes is not None else []
+    system_prompt = get_cv_matching_prompt(structured=True)
+    response_format = response_format_for(CVMatchResult)
+    screen_prompt = get_cv_scoring_prompt(structured=True)
+
+    prompt = build_cv_matching_user_prompt(
+        cv_text, project_description, minimum_match_percentage=min_match_percentage, excel_data=excel_data
+    )
+    screen_model = first_fitting(CASCADE_SCREEN_MODELS, estimate_tokens(screen_prompt, prompt))
+    response = scheduler.generate_response(
+        prompt, model=screen_model, system_prompt=screen_prompt, priority=priority,
+        response_format=response_format_for(MatchScores),
+    )
+    usages = [scheduler.last_usage]
+    if response.startswith("Error:"):
+        raise MatchingServiceError(response[len("Error:"):].strip(), status=502)
+
+    scores = parse_structured_response(response, MatchScores)
+    if scores is None:
+        # Without usable scores there is nothing to narrow down: the strong model sees every CV.
+        notes.append({"level": "warning", "message": f"The {screen_model} screening could not be validated; all employees were escalated."})
+        screened = None
+        escalated = None
+        escalated_text = cv_text
+    else:
+        escalated = borderline_employees(scores, min_match_percentage)
+        escalated_text = select_cv_blocks(cv_text, escalated) if escalated else ""
+        decided = [
+            (employee.name, employee.match_percentage) for employee in scores.qualified(min_match_percentage)
+            if not is_escalated(employee.name, escalated)
+        ]
+        written = []
+        if decided:
+            on_stage("generating_cvs")
+            written, cv_usages = write_customized_cvs(
+                scheduler, screen_model, project_description, cv_text, decided,
+                min_match_percentage=min_match_percentage, excel_data=excel_data, on_cv=on_cv, notes=notes,
+                priority=priority, cv_store=cv_store,
+            )
+            usages.extend(cv_usages)
+        screened = scores.with_cvs(written)
+        if not escalated_text:
+            if escalated:
+                notes.append({"level": "warning", "message": f"No CVs found for {', '.join(escalated)}; kept the {screen_model} scores."})
+            notes.append({"level": "info", "message": f"Cascade: all employees decided by {screen_model}"})
+            return screened, combine_usage(usages)
+
+    on_stage("escalating")
+    prompt = build_cv_matching_user_prompt(
+        escalated_text, project_description, minimum_match_percentage=min_match_percentage, excel_data=excel_data
+    )
+    strong_model = first_fitting(CASCADE_STRONG_MODELS, estimate_tokens(system_prompt, prompt))
+
+    def on_escalated_cv(cv_json):
+        if escalated is None or is_escalated(cv_json.get("name", ""), escalated):
+            on_cv(cv_json)
+
+    response = stream_cvs(
+        scheduler.stream_response(
+            prompt=prompt, model=strong_model, system_prompt=system_prompt, priority=priority,
+            response_format=response_format,
+        ),
+        on_escalated_cv,
+        structured=True,
+    )
+    usages.append(scheduler.last_usage)
+    if response.startswith("Error:"):
+        raise MatchingServiceError(response[len("Error:"):].strip(), status=502)
+
+    escalated_result = parse_structured_response(response, CVMatchResult)
+    if escalated_result is None:
+        if screened is None:
+            raise MatchingServiceError("The matching response could not be validated", status=502)
+        notes.append({"level": "warning", "message": f"The {strong_model} response could not be validated; kept the {screen_model} scores."})
+        return screened, combine_usage(usages)
+    if screened is None:
+        return escalated_result, combine_usage(usages)
+
+    notes.append({
+        "level": "info",
+        "message": f"Cascade: {len(screened.employees) - len(escalated)} employees decided by {screen_model}, "
+                   f"{len(escalated)} escalated to {strong_model} ({', '.join(escalated)})",
+    })
+    return merge_results(screened, escalated_result, escalated, min_match_percentage), combine_usage(usages)
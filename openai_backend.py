@@ -1,40 +1,189 @@
 import os
-from openai import OpenAI
+import threading
 from dotenv import load_dotenv
+from rate_limiter import get_rate_limiter, estimate_tokens
+from lazy_imports import lazy_import
+
+openai = lazy_import("openai")
 
 load_dotenv()
 
+# Share of the rate budget that lower priority classes leave untouched so
+# interactive requests from the UI never queue behind a bulk job.
+INTERACTIVE_RESERVE = float(os.getenv("OPENAI_INTERACTIVE_RESERVE", "0.2"))
+# Idle pooled connections stay open this long (the SDK default is 5 s), so a
+# connection opened at warm start is still there for the first request.
+KEEPALIVE_SECONDS = float(os.getenv("OPENAI_KEEPALIVE_SECONDS", "60"))
+# Set to 1 to print the token usage of every call.
+LOG_LLM_USAGE = os.getenv("LOG_LLM_USAGE", "0") == "1"
+
+
+def pooled_http_client():
+    """httpx client for the SDK with a longer keep-alive; None keeps the SDK's own client."""
+    try:
+        import httpx
+
+        return openai.DefaultHttpxClient(
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=KEEPALIVE_SECONDS)
+        )
+    except (ImportError, AttributeError):
+        return None
+
 
 class OpenAIBackend:
     def __init__(self):
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
             raise ValueError("OPENAI_API_KEY environment variable is not set")
-        self.client = OpenAI(api_key=api_key)
+        self.client = openai.OpenAI(api_key=api_key, http_client=pooled_http_client())
         self.default_model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+        self.rate_limiter = get_rate_limiter()
+        self._local = threading.local()
+
+    @property
+    def last_usage(self):
+        """Token usage of the last call made from the current thread, including cached prompt tokens."""
+        return getattr(self._local, "last_usage", None)
+
+    def _record_usage(self, model, usage):
+        if usage is None:
+            self._local.last_usage = None
+            return
+
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached_tokens = (getattr(details, "cached_tokens", None) or 0) if details else 0
+        self._local.last_usage = {
+            "model": model,
+            "prompt_tokens": usage.prompt_tokens,
+            "cached_tokens": cached_tokens,
+            "completion_tokens": usage.completion_tokens,
+            "total_tokens": usage.total_tokens,
+        }
+        if LOG_LLM_USAGE:
+            print(
+                f"LLM usage ({model}): prompt={usage.prompt_tokens} "
+                f"cached={cached_tokens} completion={usage.completion_tokens}"
+            )
+
+    def _acquire_budget(self, system_prompt, prompt, priority):
+        if not self.rate_limiter:
+            return 0
+        reserve = 0.0 if priority == "interactive" else INTERACTIVE_RESERVE
+        return self.rate_limiter.acquire(
+            estimate_tokens(system_prompt, prompt), reserve=reserve
+        )
+
+    def _settle_budget(self, charged_tokens, usage):
+        if self.rate_limiter and charged_tokens:
+            used_tokens = usage.total_tokens if usage else charged_tokens
+            self.rate_limiter.reconcile(charged_tokens, used_tokens)
+
+    def _request_args(self, prompt, model, system_prompt, response_format):
+        args = {
+            "model": model,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": prompt},
+            ],
+            "max_tokens": 8000,
+            "temperature": 0.7,
+            "timeout": 120,
+        }
+        if response_format:
+            args["response_format"] = response_format
+        return args
 
     def generate_response(
-        self, prompt, model=None, system_prompt="You are a helpful assistant."
+        self,
+        prompt,
+        model=None,
+        system_prompt="You are a helpful assistant.",
+        priority="interactive",
+        response_format=None,
     ):
 
         if model is None:
             model = self.default_model
 
+        charged_tokens = 0
+        self._local.last_usage = None
         try:
+            charged_tokens = self._acquire_budget(system_prompt, prompt, priority)
+
             response = self.client.chat.completions.create(
-                model=model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": prompt},
-                ],
-                max_tokens=8000,
-                temperature=0.7,
-                timeout=120,  
+                **self._request_args(prompt, model, system_prompt, response_format)
             )
-            return response.choices[0].message.content
+
+            self._record_usage(model, response.usage)
+            self._settle_budget(charged_tokens, response.usage)
+            charged_tokens = 0
+
+            message = response.choices[0].message
+            if getattr(message, "refusal", None):
+                return f"Error: Model refused the request: {message.refusal}"
+            return message.content
         except Exception as e:
+            if self.rate_limiter and charged_tokens:
+                self.rate_limiter.reconcile(charged_tokens, 0)
             return f"Error: {str(e)}"
 
+    def stream_response(
+        self,
+        prompt,
+        model=None,
+        system_prompt="You are a helpful assistant.",
+        priority="interactive",
+        response_format=None,
+    ):
+        """Like generate_response, but yields the content as it is generated.
+
+        A failure before the first chunk is yielded as a single "Error: ..."
+        chunk; a failure mid-stream is raised.
+        """
+        if model is None:
+            model = self.default_model
+
+        charged_tokens = 0
+        # None while the outcome is unknown, e.g. when the consumer closes the stream early.
+        used_tokens = None
+        usage = None
+        started = False
+        self._local.last_usage = None
+        try:
+            charged_tokens = self._acquire_budget(system_prompt, prompt, priority)
+
+            stream = self.client.chat.completions.create(
+                stream=True,
+                stream_options={"include_usage": True},
+                **self._request_args(prompt, model, system_prompt, response_format),
+            )
+
+            for event in stream:
+                if event.usage:
+                    usage = event.usage
+                if event.choices and event.choices[0].delta.content:
+                    started = True
+                    yield event.choices[0].delta.content
+
+            self._record_usage(model, usage)
+            used_tokens = usage.total_tokens if usage else charged_tokens
+        except Exception as e:
+            used_tokens = 0
+            if started:
+                raise
+            yield f"Error: {str(e)}"
+        finally:
+            # Runs on GeneratorExit too; an abandoned stream keeps its estimated charge.
+            if self.rate_limiter and charged_tokens:
+                try:
+                    self.rate_limiter.reconcile(charged_tokens, charged_tokens if used_tokens is None else used_tokens)
+                except Exception as e:
+                    print(f"Could not settle the rate limit budget: {str(e)}")
+
+    def warm_connection(self, timeout=10):
+        """Open a pooled connection to the API (DNS, TLS handshake) with a cheap model lookup."""
+        self.client.with_options(timeout=timeout, max_retries=0).models.retrieve(self.default_model)
+
     def get_available_models(self):
 
         try:
@@ -1,12 +1,35 @@
 import os
-import pandas as pd
-import glob
 import re
-import json
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from openai_backend import OpenAIBackend
-from project_matching_prompt import get_project_matching_prompt
+from lazy_imports import lazy_import
+from llm_scheduler import get_scheduler
+from project_matching_prompt import get_project_matching_prompt, build_project_matching_user_prompt
+from batch_jobs import build_batch_request, run_batch
+from cv_corpus import get_corpus_registry
+from match_models import (
+    PastProjectAnalysis,
+    PastProjectMatch,
+    PastProjectRefs,
+    PastProjectSummary,
+    response_format_for,
+    parse_structured_response,
+)
+from assignment_engine import assign, score_matrix, technology_fit
+from matching_errors import MatchingServiceError
+
+pd = lazy_import("pandas")
+sklearn_text = lazy_import("sklearn.feature_extraction.text")
+sklearn_pairwise = lazy_import("sklearn.metrics.pairwise")
+
+# Only the best-ranked past projects are sent to the model, so the prompt stays
+# bounded however long the project history gets.
+PAST_PROJECTS_TOP_K = int(os.getenv("PAST_PROJECTS_TOP_K", "15"))
+TECHNOLOGY_WEIGHT = 0.75
+TEXT_WEIGHT = 0.25
+# Skill score for employees without a CV match percentage
+DEFAULT_SKILL_SCORE = 0.5
+TECHNOLOGIES_PREFIX = 'Eingesetzte Technologien:'
+# Commas inside parentheses ("SmartGWT (Java, Javascript)") do not separate technologies.
+TECHNOLOGY_SPLIT = re.compile(r',\s*(?![^()]*\))')
 
 def extract_technologies_from_text(text):
     technologies = [
@@ -42,24 +65,43 @@ def extract_technologies_from_text(text):
     
     return found_technologies
 
+def split_project_text(name, tech_text=""):
+    """project_name, description and technologies_used of a Projekte cell and its technologies row.
+
+    A cell reads "Client\nDescription\nEingesetzte Technologien: A, B, ...".
+    """
+    text_lines = []
+    technologies = []
+    for line in f"{name}\n{tech_text}".split("\n"):
+        line = line.strip()
+        if line.startswith(TECHNOLOGIES_PREFIX):
+            technologies.extend(
+                tech.strip() for tech in TECHNOLOGY_SPLIT.split(line[len(TECHNOLOGIES_PREFIX):]) if tech.strip()
+            )
+        elif line:
+            text_lines.append(line)
+    
+    return {
+        'project_name': text_lines[0] if text_lines else "",
+        'description': " ".join(text_lines[1:]),
+        'technologies_used': technologies,
+    }
+
 def load_projects_from_excel():
-    excel_dir = "/workspace/excel"
-    excel_files = glob.glob(f"{excel_dir}/*.xlsx") + glob.glob(f"{excel_dir}/*.xls")
-    
-    excel_files = [f for f in excel_files if not os.path.basename(f).startswith("~$")]
-    
-    if not excel_files:
+    """Past projects of the first workbook, parsed once per workbook version."""
+    return get_corpus_registry().derive("excel", "past_projects", projects_from_excel_snapshot)
+
+def projects_from_excel_snapshot(snapshot):
+    if not snapshot.items:
         print("No Excel files found.")
-        return []
-    
-    excel_file_path = excel_files[0]
+        return ()
     
     try:
-        df = pd.read_excel(excel_file_path)
+        df = next(iter(snapshot.items.values()))
         
         if 'Projekte' not in df.columns:
             print("No 'Projekte' column found in Excel file.")
-            return []
+            return ()
             
         project_rows = []
         tech_rows = []
@@ -68,7 +110,7 @@ def load_projects_from_excel():
             if pd.isna(row['Projekte']):
                 continue
                 
-            if row['Projekte'].startswith('Eingesetzte Technologien:'):
+            if row['Projekte'].startswith(TECHNOLOGIES_PREFIX):
                 tech_rows.append(i)
             else:
                 project_rows.append(i)
@@ -90,16 +132,17 @@ def load_projects_from_excel():
             project_entry = {
                 'name': project_name,
                 'technologies_text': tech_text,
-                'technologies': extract_technologies_from_text(f"{project_name} {tech_text}")
+                'technologies': extract_technologies_from_text(f"{project_name} {tech_text}"),
+                **split_project_text(project_name, tech_text),
             }
             
             projects.append(project_entry)
             
-        return projects
+        return tuple(projects)
         
     except Exception as e:
         print(f"Error loading Excel data: {str(e)}")
-        return []
+        return ()
 
 def extract_matched_employees(matching_result):
     if not matching_result:
@@ -135,345 +178,267 @@ def extract_matched_employees(matching_result):
     
     return employees
 
-def analyze_past_projects(project_description, min_similarity=0.6, matching_result=None):
-    projects = load_projects_from_excel()
-    
+def qualified_matched_employees(matched_employees, min_match_percentage=70):
+    """The matched employees that reach the posting's minimum match percentage."""
+    qualified = []
+    for employee in matched_employees or []:
+        # Employees without a readable percentage cannot be shown to qualify.
+        score = employee_skill_score(employee, default=None)
+        if score is not None and score * 100 >= min_match_percentage:
+            qualified.append(employee)
+    return qualified
+
+def rank_past_projects(project_description, projects, min_similarity=0.6, top_k=None):
+    """Score every past project against the posting and keep the top_k at or above min_similarity.
+
+    The score combines technology overlap (Dice coefficient of the extracted
+    technologies) with TF-IDF cosine similarity of the texts. Returned entries
+    are copies of the project dicts with their "project_number" (the 1-based
+    index in `projects`, not an Excel row) and the "similarity" (0-1), best first.
+    """
     if not projects:
-        return "No past project data found in Excel files."
+        return []
+    top_k = PAST_PROJECTS_TOP_K if top_k is None else top_k
     
-    matched_employees = []
-    if matching_result:
-        matched_employees = extract_matched_employees(matching_result)
+    texts = [f"{project['name']} {project['technologies_text']}" for project in projects]
+    try:
+        tfidf = sklearn_text.TfidfVectorizer().fit_transform([project_description] + texts)
+        text_scores = sklearn_pairwise.cosine_similarity(tfidf[0:1], tfidf[1:])[0]
+    except ValueError:
+        # Empty vocabulary, e.g. a description without any words
+        text_scores = [0.0] * len(projects)
+    
+    project_technologies = set(extract_technologies_from_text(project_description))
+    
+    ranked = []
+    for number, (project, text_score) in enumerate(zip(projects, text_scores), start=1):
+        if project_technologies:
+            past_technologies = set(project['technologies'])
+            overlap = (
+                2 * len(project_technologies & past_technologies)
+                / (len(project_technologies) + len(past_technologies))
+            )
+            similarity = TECHNOLOGY_WEIGHT * overlap + TEXT_WEIGHT * float(text_score)
+        else:
+            similarity = float(text_score)
+        
+        if similarity >= min_similarity:
+            ranked.append(dict(project, project_number=number, similarity=similarity))
     
+    ranked.sort(key=lambda project: project['similarity'], reverse=True)
+    return ranked[:top_k]
+
+def build_past_projects_prompt(project_description, ranked_projects, min_similarity=0.6):
     past_projects_data = ""
-    project_counter = 1
     
-    for project in projects:
+    for project in ranked_projects:
         project_text = f"{project['name']}"
         if project['technologies_text']:
             project_text += f"\n{project['technologies_text']}"
             
-        past_projects_data += f"### Project {project_counter}:\n{project_text}\n\n"
-        project_counter += 1
+        past_projects_data += (
+            f"### Project {project['project_number']} (similarity: {round(project['similarity'] * 100)}%):\n"
+            f"{project_text}\n\n"
+        )
     
     project_technologies = extract_technologies_from_text(project_description)
     tech_list = ", ".join(project_technologies)
     
-    matched_employees_data = ""
-    if matched_employees:
-        matched_employees_data = "\n\nMATCHED EMPLOYEES:\n"
-        for emp in matched_employees:
-            matched_employees_data += f"- {emp['name']} - {emp['match_percentage']}% - {emp['skills']}\n"
+    prompt = build_project_matching_user_prompt(
+        past_projects_data,
+        project_description,
+        tech_list,
+        minimum_similarity=int(min_similarity * 100),
+    )
+    
+    return get_project_matching_prompt(), prompt
+
+def no_matching_projects_message(min_similarity):
+    return f"No past project data found with at least {int(min_similarity * 100)}% similarity."
+
+def resolve_project_refs(refs, ranked_projects, matched_employees=None):
+    """The full PastProjectAnalysis of the model's PastProjectRefs.
+    
+    Names, descriptions, technologies and similarities are joined in from the
+    ranked projects by project number (see rank_past_projects); project numbers that are not among them or come
+    twice are dropped. Employees are assigned with the assignment engine.
+    Returns None if `refs` is None.
+    """
+    if refs is None:
+        return None
+    
+    by_number = {project['project_number']: project for project in ranked_projects}
+    projects = []
+    # Technologies of the matched projects as written in the sheet and as extracted.
+    used = set()
+    for ref in refs.projects:
+        project = by_number.pop(ref.project_number, None)
+        if project is None:
+            continue
+        
+        technologies = list(project['technologies_used'] or project['technologies'])
+        known = {tech.casefold() for tech in technologies + list(project['technologies'])}
+        enhanced = [tech for tech in dict.fromkeys(ref.enhanced_technologies) if tech.casefold() not in known]
+        used |= known
+        similarity = round(project['similarity'] * 100)
+        projects.append(PastProjectMatch(
+            project_number=ref.project_number,
+            project_name=project['project_name'],
+            assigned_employee="",
+            similarity=similarity,
+            technologies_used=technologies,
+            enhanced_technologies=enhanced,
+            enhanced_similarity=max(similarity, ref.enhanced_similarity) if enhanced else similarity,
+            description=project['description'],
+        ))
+    
+    best = max(projects, key=lambda project: project.similarity, default=None)
+    analysis = PastProjectAnalysis(
+        new_project_technologies=refs.new_project_technologies,
+        projects=projects,
+        summary=PastProjectSummary(
+            best_match_project_number=best.project_number if best else 0,
+            best_match_similarity=best.similarity if best else 0,
+            main_technology_overlaps=[tech for tech in refs.new_project_technologies if tech.casefold() in used],
+            most_versatile_employees=[emp["name"] for emp in matched_employees or []],
+        ),
+    )
+    return assign_structured_analysis(analysis, matched_employees)
+
+def analyze_past_projects(project_description, min_similarity=0.6, matching_result=None, matched_employees=None,
+                          min_match_percentage=70, priority="interactive"):
+    """PastProjectAnalysis of the past projects similar to the posting, with employees assigned.
+    
+    The model sees the pre-ranked projects with their numbers and returns only
+    PastProjectRefs; see resolve_project_refs. `matched_employees` defaults to
+    the employees of the text `matching_result`; only those reaching
+    min_match_percentage are assigned. Returns None if no past project
+    reaches min_similarity; raises MatchingServiceError if the model call
+    fails or its response could not be validated.
+    """
+    if matched_employees is None:
+        matched_employees = extract_matched_employees(matching_result)
+    matched_employees = qualified_matched_employees(matched_employees, min_match_percentage)
     
-    prompt = (
-        f"Project Description:\n\n{project_description}\n\n"
-        f"Extracted Technologies: {tech_list}\n"
-        f"{matched_employees_data}\n"
-        f"Past Projects Data:\n\n{past_projects_data}"
+    ranked_projects = rank_past_projects(
+        project_description, load_projects_from_excel(), min_similarity=min_similarity
     )
     
-    system_prompt = get_project_matching_prompt(minimum_similarity=int(min_similarity * 100))
+    if not ranked_projects:
+        return None
     
-    backend = OpenAIBackend()
+    system_prompt, prompt = build_past_projects_prompt(project_description, ranked_projects, min_similarity=min_similarity)
     
-    response = backend.generate_response(
+    response = get_scheduler().generate_response(
         prompt=prompt,
-        model="gpt-4o-mini",  
+        model="gpt-4o-mini",
         system_prompt=system_prompt,
+        priority=priority,
+        response_format=response_format_for(PastProjectRefs),
     )
+    if response.startswith("Error:"):
+        raise MatchingServiceError(response[len("Error:"):].strip(), status=502)
     
-    return response
+    refs = parse_structured_response(response, PastProjectRefs)
+    if refs is None:
+        raise MatchingServiceError("The past project analysis response could not be validated", status=502)
+    return resolve_project_refs(refs, ranked_projects, matched_employees)
 
-def post_process_response(response, matched_employees):
-    if not response:
-        return response
-    
-    versatile_employees = []
-    for line in response.split('\n'):
-        if "Most versatile employees:" in line:
-            employees_part = line.split(':', 1)[1].strip()
-            versatile_employees = [name.strip() for name in employees_part.split(',')]
-            break
-    
-    employee_names = []
-    if versatile_employees:
-        employee_names = versatile_employees
-    elif matched_employees:
-        employee_names = [emp["name"] for emp in matched_employees]
-    
-    if not employee_names:
-        return response
-    
-    print(f"Employee names for distribution: {employee_names}")
-    
-    experience_levels = {}
-    for emp in matched_employees:
-        name = emp["name"]
-        years_match = re.search(r'(\d+)\+\s*Jahre', emp.get("skills", ""))
-        if years_match:
-            years = int(years_match.group(1))
-            experience_levels[name] = years
-        else:
-            experience_levels[name] = 4
-    
-    print(f"Experience levels: {experience_levels}")
-    
-    lines = response.split('\n')
-    detected_projects = []
-    
-    for i, line in enumerate(lines):
-        if any(pattern in line for pattern in ["Project ", "### Project "]) and " : " in line:
-            detected_projects.append(i)
-    
-    if len(detected_projects) < 4:
-        for i, line in enumerate(lines):
-            if i not in detected_projects:
-                if ("project" in line.lower() or "Project" in line) and (" : " in line or " - " in line):
-                    detected_projects.append(i)
-    
-    if len(detected_projects) < 4:
-        print("Using looser pattern to find more projects...")
-        for i, line in enumerate(lines):
-            if i not in detected_projects and len(line.strip()) > 10:
-                if any(tech in line for tech in ["Java", "Spring", "Web", "Application", "Software", "Development"]):
-                    detected_projects.append(i)
-                    if len(detected_projects) >= 4:
-                        break
-    
-    print(f"Found {len(detected_projects)} projects: {detected_projects}")
-    
-    if not detected_projects:
-        return response
-    
-    num_projects = len(detected_projects)
-    distribution = {}
-    
-    sorted_employees = sorted(employee_names, key=lambda x: experience_levels.get(x, 0), reverse=True)
-    
-    for emp in employee_names:
-        distribution[emp] = 1
-    
-    remaining_projects = num_projects - len(employee_names)
-    employee_idx = 0
-    while remaining_projects > 0 and employee_idx < len(sorted_employees):
-        distribution[sorted_employees[employee_idx]] += 1
-        remaining_projects -= 1
-        employee_idx = (employee_idx + 1) % len(sorted_employees)
-    
-    total_assigned = sum(distribution.values())
-    if total_assigned > num_projects:
-        for emp in sorted(employee_names, key=lambda x: experience_levels.get(x, 0)):
-            if distribution[emp] > 0:
-                distribution[emp] -= 1
-                total_assigned -= 1
-                if total_assigned <= num_projects:
-                    break
-    
-    print(f"Project distribution based on experience: {distribution}")
-    
-    project_assignments = {}  
-    assignment_list = []
-    for emp, count in distribution.items():
-        for _ in range(count):
-            assignment_list.append(emp)
-    
-    while len(assignment_list) < num_projects:
-        assignment_list.append(employee_names[len(assignment_list) % len(employee_names)])
-    
-    for idx, project_idx in enumerate(detected_projects):
-        if idx < len(assignment_list):
-            employee = assignment_list[idx]
-            
-            line = lines[project_idx]
-            
-            if ' : ' in line:
-                project_part = line.split(' : ')[0]
-                lines[project_idx] = f"{project_part} : {employee}"
-            else:
-                project_match = re.match(r'(### Project \d+ - .+?) (-|:)', line)
-                if project_match:
-                    project_part = project_match.group(1)
-                    lines[project_idx] = f"{project_part} : {employee}"
-                else:
-                    lines[project_idx] = f"{line} : {employee}"
-                
-            project_assignments[idx] = employee
-    
-    json_start_index = response.find('```json')
-    json_end_index = response.find('```', json_start_index + 6) if json_start_index != -1 else -1
+def analyze_past_projects_batch(project_descriptions, min_similarity=0.6, matching_results=None, matched_employees=None,
+                                min_match_percentage=70, batch_client=None, poll_interval=30, debug=False):
+    """Bulk variant of analyze_past_projects that goes through a Batch API job.
+    
+    `project_descriptions` maps a posting id to its text, `matching_results`
+    optionally maps the same ids to their CV matching responses and
+    `matched_employees` to already parsed employee lists, of which only those
+    reaching min_match_percentage are assigned. Returns posting
+    id -> PastProjectAnalysis, or the message or raw response when there is
+    none for that posting ("Error: ..." if the batch returned nothing for it).
+    """
+    projects = load_projects_from_excel()
     
-    if json_start_index != -1 and json_end_index != -1:
-        json_content = response[json_start_index + 7:json_end_index].strip()
-        
-        try:
-            json_data = json.loads(json_content)
-            
-            project_technologies = {}
-            for i, line in enumerate(lines):
-                if i > 0 and "Technologies Used:" in line:
-                    for proj_idx in detected_projects:
-                        if proj_idx < i and (i - proj_idx) < 10:  
-                            proj_line = lines[proj_idx]
-                            proj_match = re.search(r'Project\s+(\d+)', proj_line)
-                            if proj_match:
-                                proj_num = int(proj_match.group(1))
-                                tech_text = line.replace("Technologies Used:", "").strip()
-                                
-                                if proj_num not in project_technologies:
-                                    project_technologies[proj_num] = {}
-                                
-                                project_technologies[proj_num]["all_techs"] = [t.strip() for t in tech_text.split(",")]
-                            break
-            
-            if "projects" in json_data and isinstance(json_data["projects"], list):
-                for i, project in enumerate(json_data["projects"]):
-                    if i < len(assignment_list):
-                        project["assigned_employee"] = assignment_list[i]
-                        
-                        if "project_number" in project and "enhanced_technologies" in project:
-                            for tech in project.get("enhanced_technologies", []):
-                                if tech not in project["technologies_used"]:
-                                    project["technologies_used"].append(tech)
-                
-                if "summary" in json_data:
-                    enhanced_count = sum(1 for p in json_data["projects"] if "enhanced_technologies" in p and p["enhanced_technologies"])
-                    json_data["summary"]["enhanced_projects_count"] = enhanced_count
-                
-                updated_json = json.dumps(json_data, indent=2)
-                updated_response = response[:json_start_index + 7] + '\n' + updated_json + '\n' + response[json_end_index:]
-                lines = updated_response.split('\n')
-            
-            else:
-                project_details = {}
-                in_project_section = False
-                current_project = None
-                
-                for i, line in enumerate(lines):
-                    if re.search(r'### Project (\d+)', line):
-                        in_project_section = True
-                        match = re.search(r'Project (\d+) - (.+?)(?:\s+:|$)', line)
-                        if match:
-                            proj_num = int(match.group(1))
-                            proj_name = match.group(2).strip()
-                            
-                            similarity = 90
-                            
-                            current_project = {
-                                "number": proj_num,
-                                "name": proj_name,
-                                "similarity": similarity,
-                                "techs_used": [],
-                                "matching_techs": [],
-                                "enhanced_techs": [],
-                                "enhanced_similarity": 90,
-                                "description": ""
-                            }
-                            project_details[proj_num] = current_project
-                    
-                    elif in_project_section and current_project:
-                        if "Technologies Used:" in line:
-                            techs = line.split(":", 1)[1].strip()
-                            current_project["techs_used"] = [t.strip() for t in techs.split(",")]
-                        elif "Matching Technologies:" in line:
-                            techs = line.split(":", 1)[1].strip()
-                            current_project["matching_techs"] = [t.strip() for t in techs.split(",")]
-                        elif "Project Description:" in line:
-                            desc = line.split(":", 1)[1].strip()
-                            current_project["description"] = desc
-                
-                for i, emp in enumerate(employee_names):
-                    patterns = [
-                        f'[Employee {i+1} Name from Matched CVs]',
-                        f'[Employee {i+1} Name]',
-                        f'Employee {i+1}',
-                        f'[Different Employee Name from Matched CVs]'
-                    ]
-                    
-                    for pattern in patterns:
-                        json_content = json_content.replace(pattern, emp)
-                
-                employee_to_projects = {}
-                for idx, employee in project_assignments.items():
-                    if idx < len(detected_projects):
-                        project_idx = detected_projects[idx]
-                        project_line = lines[project_idx]
-                        match = re.search(r'Project (\d+)', project_line)
-                        if match:
-                            proj_num = int(match.group(1))
-                            if proj_num in project_details:
-                                if employee not in employee_to_projects:
-                                    employee_to_projects[employee] = []
-                                employee_to_projects[employee].append(project_details[proj_num])
-                
-                remaining_placeholders = [
-                    '[Employee Name from Matched CVs]',
-                    '[Employee Name]',
-                    '[Different Employee Name]'
-                ]
-                
-                emp_idx = 0
-                for placeholder in remaining_placeholders:
-                    while placeholder in json_content:
-                        name = employee_names[emp_idx % len(employee_names)]
-                        json_content = json_content.replace(placeholder, name, 1)
-                        emp_idx += 1
-                
-                for proj_num, details in project_details.items():
-                    json_content = json_content.replace(f'"project_number": [#]', f'"project_number": {details["number"]}', 1)
-                    
-                    json_content = json_content.replace(f'"project_name": "[Project Name]"', f'"project_name": "{details["name"]}"', 1)
-                    
-                    json_content = json_content.replace(f'"similarity": [Original Similarity %]', f'"similarity": {details["similarity"]}', 1)
-                    
-                    tech_used_json = json.dumps(details["techs_used"])
-                    json_content = json_content.replace(f'"technologies_used": ["Tech1", "Tech2", ...]', f'"technologies_used": {tech_used_json}', 1)
-                    
-                    matching_tech_json = json.dumps(details["matching_techs"])
-                    json_content = json_content.replace(f'"matching_technologies": ["Tech1", "Tech2", ...]', f'"matching_technologies": {matching_tech_json}', 1)
-                    
-                    json_content = json_content.replace(f'"enhanced_technologies": ["Additional Tech1", "Additional Tech2", ...]', 
-                                                  f'"enhanced_technologies": []', 1)
-                    
-                    json_content = json_content.replace(f'"enhanced_similarity": [Enhanced Similarity %]', 
-                                                 f'"enhanced_similarity": {details["enhanced_similarity"]}', 1)
-                    
-                    json_content = json_content.replace(f'"description": "[Brief description of the project]"', 
-                                                  f'"description": "{details["description"]}"', 1)
-                
-                json_content = re.sub(r'//.*$', '', json_content, flags=re.MULTILINE)
-                
-                updated_response = response[:json_start_index + 7] + '\n' + json_content + '\n' + response[json_end_index:]
-                lines = updated_response.split('\n')
+    if not projects:
+        return {posting_id: "No past project data found in Excel files." for posting_id in project_descriptions}
+    
+    matching_results = matching_results or {}
+    matched_employees = matched_employees or {}
+    requests = []
+    ranked = {}
+    results = {}
+    for posting_id, project_description in project_descriptions.items():
+        ranked_projects = rank_past_projects(project_description, projects, min_similarity=min_similarity)
+        if not ranked_projects:
+            results[posting_id] = no_matching_projects_message(min_similarity)
+            continue
         
-        except json.JSONDecodeError as e:
-            print(f"Error parsing JSON: {str(e)}")
-            for i, emp in enumerate(employee_names):
-                patterns = [
-                    f'[Employee {i+1} Name from Matched CVs]',
-                    f'[Employee {i+1} Name]',
-                    f'Employee {i+1}',
-                    f'[Different Employee Name from Matched CVs]'
-                ]
-                
-                for pattern in patterns:
-                    json_content = json_content.replace(pattern, emp)
-            
-            remaining_placeholders = [
-                '[Employee Name from Matched CVs]',
-                '[Employee Name]',
-                '[Different Employee Name]'
-            ]
-            
-            emp_idx = 0
-            for placeholder in remaining_placeholders:
-                while placeholder in json_content:
-                    name = employee_names[emp_idx % len(employee_names)]
-                    json_content = json_content.replace(placeholder, name, 1)
-                    emp_idx += 1
-            
-            json_content = re.sub(r'//.*$', '', json_content, flags=re.MULTILINE)
-            
-            updated_response = response[:json_start_index + 7] + '\n' + json_content + '\n' + response[json_end_index:]
-            lines = updated_response.split('\n')
+        ranked[posting_id] = ranked_projects
+        system_prompt, prompt = build_past_projects_prompt(project_description, ranked_projects, min_similarity=min_similarity)
+        requests.append(build_batch_request(
+            posting_id, prompt, system_prompt, model="gpt-4o-mini",
+            response_format=response_format_for(PastProjectRefs),
+        ))
+    
+    if requests:
+        responses = run_batch(requests, batch_client=batch_client, poll_interval=poll_interval, debug=debug)
+        for posting_id, response in responses.items():
+            employees = matched_employees.get(posting_id)
+            if employees is None:
+                employees = extract_matched_employees(matching_results.get(posting_id))
+            employees = qualified_matched_employees(employees, min_match_percentage)
+            analysis = resolve_project_refs(
+                parse_structured_response(response, PastProjectRefs), ranked.get(posting_id, []), employees
+            )
+            results[posting_id] = analysis if analysis is not None else response
+        for posting_id in ranked:
+            if posting_id not in results:
+                print(f"No batch response for posting {posting_id}")
+                results[posting_id] = "Error: No batch response for this posting"
+    return results
+
+def employee_skill_score(employee, default=DEFAULT_SKILL_SCORE):
+    try:
+        return float(str(employee.get("match_percentage", "")).rstrip("%")) / 100.0
+    except ValueError:
+        return default
+
+def assign_employees(projects, employee_names, matched_employees=None):
+    """Optimal employee for each project, given as (similarity 0-1, technologies) pairs.
+
+    Scores come from the employees' CV match percentages and the overlap of
+    their skills with the project's technologies (see assignment_engine).
+    Every employee gets one project before anyone gets a second.
+    """
+    employees = {emp["name"]: emp for emp in matched_employees or []}
+    employee_skill = [
+        employee_skill_score(employees[name]) if name in employees else DEFAULT_SKILL_SCORE
+        for name in employee_names
+    ]
+    employee_technologies = [
+        extract_technologies_from_text(employees[name].get("skills", "")) if name in employees else []
+        for name in employee_names
+    ]
     
-    return '\n'.join(lines) 
\ No newline at end of file
+    scores = score_matrix(
+        [similarity for similarity, _ in projects],
+        employee_skill,
+        technology_fit([technologies for _, technologies in projects], employee_technologies),
+    )
+    return [employee_names[index] if index >= 0 else None for index in assign(scores)]
+
+def assign_structured_analysis(analysis, matched_employees):
+    """Re-assign the projects of a PastProjectAnalysis with the assignment engine."""
+    if analysis is None or not matched_employees or not analysis.projects:
+        return analysis
+    
+    assigned = assign_employees(
+        [
+            (project.similarity / 100.0, project.technologies_used + project.enhanced_technologies)
+            for project in analysis.projects
+        ],
+        [emp["name"] for emp in matched_employees],
+        matched_employees,
+    )
+    for project, employee in zip(analysis.projects, assigned):
+        if employee:
+            project.assigned_employee = employee
+    return analysis
@@ -0,0 +1,25 @@
+import os
+import tempfile
+
+# Per-user home of the job queue and rate limiter databases; the temp directory itself is shared by every local user.
+PRIVATE_DIR = os.path.join(tempfile.gettempdir(), f"cv_match-{os.getuid()}")
+
+
+def private_path(filename):
+    """`filename` in PRIVATE_DIR, which is created with mode 700 and must not be accessible to others."""
+    os.makedirs(PRIVATE_DIR, mode=0o700, exist_ok=True)
+    stat = os.stat(PRIVATE_DIR)
+    if stat.st_uid != os.getuid():
+        raise PermissionError(f"{PRIVATE_DIR} belongs to another user")
+    if stat.st_mode & 0o077:
+        raise PermissionError(f"{PRIVATE_DIR} is accessible to other users (mode {stat.st_mode & 0o777:o}); expected 700")
+    return os.path.join(PRIVATE_DIR, filename)
+
+
+def restrict_to_owner(path):
+    """Make an existing database file readable and writable by its owner only (SQLite gives its -wal and -shm files the same mode)."""
+    try:
+        if os.stat(path).st_uid == os.getuid():
+            os.chmod(path, 0o600)
+    except OSError as e:
+        print(f"Could not restrict permissions of {path}: {str(e)}")
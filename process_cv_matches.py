@@ -6,35 +6,99 @@ import sys
 import json
 import argparse
 import tempfile
-from openai_backend import OpenAIBackend
-from cv_matching_prompt import get_cv_matching_prompt
-from json_to_pdf import extract_json_from_response, create_cv_pdf
+from llm_scheduler import get_scheduler, PRIORITY_WEIGHTS
+from cv_matching_prompt import get_cv_matching_prompt, build_cv_matching_user_prompt
+from json_to_pdf import extract_json_from_response
+from cv_output_pipeline import CVOutputPipeline, report_cv_output
+from batch_jobs import build_batch_request, run_batch, get_batch_client
+from match_models import CVMatchResult, PastProjectAnalysis, supports_structured_output, response_format_for, parse_structured_response
+from cv_stream_extractor import stream_cvs
+from cv_corpus import build_cv_text
+from cv_store import get_cv_store
+from model_cascade import CASCADE_MODEL, run_cascade
+from two_phase_matching import TWO_PHASE_MATCHING, run_two_phase
+from client_letter import write_client_letter
+from past_project_analyzer import analyze_past_projects_batch
 
-def process_project_match(project_description, cv_data, model="gpt-4o-mini", debug=False):
+def parse_match_response(response, structured, min_match_percentage=70, debug=False):
+    """Turn a matching response into (display text, customized CV list, matched employees).
+
+    Structured responses are validated against CVMatchResult in one pass;
+    text responses from models without JSON schema support go through
+    extract_json_from_response, and matched employees are left to
+    extract_matched_employees (None).
+    """
+    if not structured:
+        return response, extract_json_from_response(response, debug=debug), None
+    
+    match_result = parse_structured_response(response, CVMatchResult)
+    if match_result is None:
+        return response, None, None
+    return match_result.to_text(min_match_percentage), match_result.cv_json_list(), match_result.matched_employees()
+
+def process_project_match(project_description, cv_data, model="gpt-4o-mini", debug=False, priority="interactive", min_match_percentage=70, on_cv=None, cv_store=None):
+    """Match a project against the CVs; returns (response text, customized CV list).
+
+    With `on_cv` the completion is streamed and on_cv(cv_json) is called for
+    each customized CV as soon as its JSON object is complete, so callers can
+    start rendering before the model has finished the remaining CVs. With
+    `cv_store` (the CV store of the JSON CVs) customized CVs are built from
+    the employees' stored profiles.
+    """
 
     try:
-        backend = OpenAIBackend()
+        scheduler = get_scheduler()
         
         if debug:
             print("Matching project with CVs...")
             
-        cv_matching_system_prompt = get_cv_matching_prompt()
+        if model == CASCADE_MODEL:
+            match_result, usage = run_cascade(
+                scheduler, project_description, cv_data, min_match_percentage=min_match_percentage,
+                on_cv=on_cv, priority=priority, cv_store=cv_store,
+            )
+            if debug and usage:
+                print(f"Cascade ({usage['model']}): prompt tokens: {usage['prompt_tokens']}, completion tokens: {usage['completion_tokens']}")
+            return match_result.to_text(min_match_percentage), match_result.cv_json_list()
+
+        if TWO_PHASE_MATCHING:
+            response, match_result, _ = run_two_phase(
+                scheduler, model, project_description, cv_data, min_match_percentage=min_match_percentage,
+                on_cv=on_cv, priority=priority, cv_store=cv_store,
+            )
+            if match_result is not None:
+                return response, match_result.cv_json_list()
+            return response, extract_json_from_response(response, debug=debug)
+
+        structured = supports_structured_output(model)
+        cv_matching_system_prompt = get_cv_matching_prompt(structured=structured)
         
-        matching_prompt = (
-            f"Project Description:\n\n{project_description}\n\n"
-            f"CV Data:\n\n{cv_data}"
+        matching_prompt = build_cv_matching_user_prompt(
+            cv_data, project_description, minimum_match_percentage=min_match_percentage
         )
         
-        response = backend.generate_response(
+        request_args = dict(
             prompt=matching_prompt,
             model=model,
-            system_prompt=cv_matching_system_prompt
+            system_prompt=cv_matching_system_prompt,
+            priority=priority,
+            response_format=response_format_for(CVMatchResult) if structured else None
         )
         
+        if on_cv is None:
+            response = scheduler.generate_response(**request_args)
+        else:
+            response = stream_cvs(scheduler.stream_response(**request_args), on_cv, structured=structured, debug=debug)
+        
         if debug:
+            usage = scheduler.last_usage
+            if usage:
+                print(f"Prompt tokens: {usage['prompt_tokens']} (cached: {usage['cached_tokens']}), completion tokens: {usage['completion_tokens']}")
             print("Response received. Extracting JSON data...")
             
-        cv_json_list = extract_json_from_response(response, debug=debug)
+        response, cv_json_list, _ = parse_match_response(
+            response, structured, min_match_percentage=min_match_percentage, debug=debug
+        )
         
         if cv_json_list:
             if debug:
@@ -50,40 +114,129 @@ def process_project_match(project_description, cv_data, model="gpt-4o-mini", deb
             print(traceback.format_exc())
         return None, None
 
-def load_cv_json_data(json_dir):
+def process_project_matches_batch(project_descriptions, cv_data, model="gpt-4o-mini", batch_client=None, poll_interval=30, debug=False, min_match_percentage=70):
+    """Match many postings in one Batch API job.
+
+    `project_descriptions` maps a posting id to its text. Returns posting id ->
+    (response, cv_json_list, matched_employees), see parse_match_response.
+    """
+    structured = supports_structured_output(model)
+    cv_matching_system_prompt = get_cv_matching_prompt(structured=structured)
+    response_format = response_format_for(CVMatchResult) if structured else None
+    
+    requests = [
+        build_batch_request(
+            posting_id,
+            build_cv_matching_user_prompt(cv_data, project_description, minimum_match_percentage=min_match_percentage),
+            cv_matching_system_prompt,
+            model=model,
+            response_format=response_format
+        )
+        for posting_id, project_description in project_descriptions.items()
+    ]
+    
+    responses = run_batch(requests, batch_client=batch_client, poll_interval=poll_interval, debug=debug)
+    
+    results = {}
+    for posting_id in project_descriptions:
+        response = responses.get(posting_id)
+        if not response or response.startswith("Error:"):
+            print(f"No result for posting {posting_id}: {response}")
+            results[posting_id] = (response, None, None)
+            continue
+        results[posting_id] = parse_match_response(
+            response, structured, min_match_percentage=min_match_percentage, debug=debug
+        )
+    
+    return results
+
+def save_cv_outputs(cv_json_list, output_dir, debug=False):
+    pipeline = CVOutputPipeline(output_dir, on_complete=report_cv_output, debug=debug)
+    for cv_json in cv_json_list:
+        pipeline.submit(cv_json)
+    return pipeline.close()
+
+def load_project_descriptions(projects_dir):
     import glob
     
-    json_files = glob.glob(f"{json_dir}/*.json")
+    project_descriptions = {}
+    for path in sorted(glob.glob(f"{projects_dir}/*.txt") + glob.glob(f"{projects_dir}/*.md")):
+        posting_id = os.path.splitext(os.path.basename(path))[0]
+        with open(path, 'r', encoding='utf-8') as f:
+            project_descriptions[posting_id] = f.read()
     
-    if not json_files:
-        return None, "No JSON CV files found."
+    return project_descriptions
+
+def run_batch_mode(args, cv_data):
+    project_descriptions = load_project_descriptions(args.projects_dir)
+    if not project_descriptions:
+        print(f"Error: No project descriptions (*.txt, *.md) found in {args.projects_dir}")
+        return 1
     
-    cv_json_data = []
-    for json_file in json_files:
-        try:
-            with open(json_file, 'r', encoding='utf-8') as f:
-                cv_data = json.load(f)
-                cv_json_data.append(cv_data)
-        except Exception as e:
-            print(f"Error loading {os.path.basename(json_file)}: {str(e)}")
+    print(f"Submitting {len(project_descriptions)} posting(s) as a batch job")
+    batch_client = get_batch_client(local=args.local_batch or None)
+    poll_interval = 1 if args.local_batch else args.poll_interval
     
-    combined_text = ""
-    for cv in cv_json_data:
-        combined_text += f"===== CV: {cv['name']} =====\n\n"
-        
-        if 'sections' in cv:
-            for section_name, section_content in cv['sections'].items():
-                combined_text += f"--- {section_name.upper()} ---\n{section_content}\n\n"
-        
-        if 'emails' in cv:
-            combined_text += f"--- CONTACT ---\nEmail: {', '.join(cv['emails'])}\n"
+    results = process_project_matches_batch(
+        project_descriptions, cv_data,
+        model=args.model,
+        batch_client=batch_client,
+        poll_interval=poll_interval,
+        debug=args.debug,
+        min_match_percentage=args.min_match
+    )
+    
+    for posting_id, (response, cv_json_list, _) in results.items():
+        posting_dir = os.path.join(args.output_dir, posting_id)
+        os.makedirs(posting_dir, exist_ok=True)
         
-        if 'phones' in cv:
-            combined_text += f"Phone: {', '.join(cv['phones'])}\n"
+        if response:
+            with open(os.path.join(posting_dir, "cv_matching_results.txt"), "w", encoding="utf-8") as f:
+                f.write(response)
         
-        combined_text += "\n\n"
+        if cv_json_list:
+            save_cv_outputs(cv_json_list, posting_dir, debug=args.debug)
+        print(f"{posting_id}: {len(cv_json_list) if cv_json_list else 0} suitable employee(s)")
+    
+    if args.past_projects:
+        analyses = analyze_past_projects_batch(
+            project_descriptions,
+            min_similarity=args.min_similarity,
+            matching_results={posting_id: result[0] for posting_id, result in results.items() if result[0]},
+            matched_employees={posting_id: result[2] for posting_id, result in results.items() if result[2] is not None},
+            min_match_percentage=args.min_match,
+            batch_client=batch_client,
+            poll_interval=poll_interval,
+            debug=args.debug
+        )
+        for posting_id, analysis in analyses.items():
+            posting_dir = os.path.join(args.output_dir, posting_id)
+            if isinstance(analysis, PastProjectAnalysis):
+                with open(os.path.join(posting_dir, "past_project_assignments.json"), "w", encoding="utf-8") as f:
+                    json.dump(analysis.to_employee_json(), f, indent=2, ensure_ascii=False)
+                analysis = analysis.to_text()
+            with open(os.path.join(posting_dir, "past_project_analysis.txt"), "w", encoding="utf-8") as f:
+                f.write(analysis or "")
     
-    return cv_json_data, combined_text
+    print(f"Batch processing complete. Results saved to {args.output_dir}")
+    return 0
+
+def load_cv_json_data(json_dir):
+    if not os.path.isdir(json_dir):
+        return None, "No JSON CV files found."
+    
+    # Only JSON files whose stat changed since the last run are read again.
+    store = get_cv_store(json_dir)
+    store.sync_directory(json_dir)
+    cv_names = store.names()
+    
+    if not cv_names:
+        return None, "No JSON CV files found."
+    
+    # Records are streamed from the store into the prompt text; the corpus is never held as a list.
+    combined_text = build_cv_text(store.iter_records())
+    
+    return cv_names, combined_text
 
 def extract_text_from_pdf(pdf_file):
     import PyPDF2
@@ -101,7 +254,7 @@ def extract_text_from_pdf(pdf_file):
 def load_cv_pdf_data(cv_dir):
     import glob
     
-    cv_files = glob.glob(f"{cv_dir}/*.pdf")
+    cv_files = sorted(glob.glob(f"{cv_dir}/*.pdf"))
     
     if not cv_files:
         return "No PDF CV files found."
@@ -130,13 +283,29 @@ def main():
     parser.add_argument("--cv_json_dir", "-j", default="/workspace/CV_json", help="Directory containing JSON CV files")
     parser.add_argument("--cv_pdf_dir", "-c", default="/workspace/CV_data", help="Directory containing PDF CV files")
     parser.add_argument("--output_dir", "-o", default="/workspace/CV_pdf", help="Output directory for PDF files")
-    parser.add_argument("--model", "-m", default="gpt-4o-mini", help="OpenAI model to use (gpt-4o-mini or gpt-4)")
+    parser.add_argument("--model", "-m", default="gpt-4o-mini", help="OpenAI model to use (gpt-4o-mini or gpt-4), or cascade to escalate only borderline employees to a stronger model")
+    parser.add_argument("--min_match", type=int, default=70, help="Minimum skills match percentage for customized CV generation")
+    parser.add_argument("--priority", default="interactive", choices=list(PRIORITY_WEIGHTS), help="Scheduling class for the LLM call (use batch for bulk re-scoring)")
+    parser.add_argument("--projects_dir", help="Directory of project descriptions (*.txt, *.md) to match in one batch job")
+    parser.add_argument("--batch", action="store_true", help="Run --projects_dir through the Batch API instead of synchronous calls")
+    parser.add_argument("--local_batch", action="store_true", help="Emulate the Batch API locally (for testing)")
+    parser.add_argument("--poll_interval", type=int, default=30, help="Seconds between batch status checks")
+    parser.add_argument("--past_projects", action="store_true", help="Also analyze past projects for every posting in batch mode")
+    parser.add_argument("--min_similarity", type=float, default=0.6, help="Minimum past project similarity (0-1) in batch mode")
+    parser.add_argument("--client_letter", action="store_true", help="Also write the client letter for the match (client_letter.txt)")
     parser.add_argument("--debug", "-d", action="store_true", help="Enable debug output")
     
     args = parser.parse_args()
     
     project_description = None
-    if args.project:
+    if args.batch:
+        if not args.projects_dir:
+            print("Error: --batch requires --projects_dir")
+            return 1
+        if args.model == CASCADE_MODEL:
+            print("Error: --model cascade is not available in batch mode")
+            return 1
+    elif args.project:
         if not os.path.exists(args.project):
             print(f"Error: Project file {args.project} does not exist")
             return 1
@@ -169,12 +338,24 @@ def main():
         print("Error: No CV data found")
         return 1
     
-    response, cv_json_list = process_project_match(
-        project_description, 
-        cv_data,
-        model=args.model,
-        debug=args.debug
-    )
+    if args.batch:
+        return run_batch_mode(args, cv_data)
+    
+    # Each CV goes to the JSON/PDF workers as soon as it has been streamed in full.
+    pipeline = CVOutputPipeline(args.output_dir, on_complete=report_cv_output, debug=args.debug)
+    try:
+        response, cv_json_list = process_project_match(
+            project_description, 
+            cv_data,
+            model=args.model,
+            debug=args.debug,
+            priority=args.priority,
+            min_match_percentage=args.min_match,
+            on_cv=pipeline.submit,
+            cv_store=get_cv_store(args.cv_json_dir) if cv_json_data else None
+        )
+    finally:
+        pipeline.close()
     
     if not response:
         print("Error: Failed to get a response from the model")
@@ -183,29 +364,19 @@ def main():
     with open(os.path.join(args.output_dir, "cv_matching_results.txt"), "w", encoding="utf-8") as f:
         f.write(response)
     
+    if args.client_letter:
+        letter = write_client_letter(get_scheduler(), project_description, response, model=args.model, priority=args.priority)
+        if letter.startswith("Error:"):
+            print(f"Error writing the client letter: {letter[len('Error:'):].strip()}")
+        else:
+            with open(os.path.join(args.output_dir, "client_letter.txt"), "w", encoding="utf-8") as f:
+                f.write(letter)
+            print(f"Client letter saved to {os.path.join(args.output_dir, 'client_letter.txt')}")
+    
     if not cv_json_list:
         print("No suitable employees found or could not extract JSON data")
         return 1
     
-    for cv_json in cv_json_list:
-        employee_name = cv_json.get('name', 'cv').replace(' ', '_')
-        
-        json_path = os.path.join(args.output_dir, f"{employee_name}_CV.json")
-        with open(json_path, "w", encoding="utf-8") as f:
-            json.dump(cv_json, f, indent=2)
-        
-        print(f"Saved JSON for {employee_name}")
-        
-        try:
-            pdf_path = os.path.join(args.output_dir, f"{employee_name}_CV.pdf")
-            create_cv_pdf(cv_json, pdf_path, debug=args.debug)
-            print(f"Generated PDF for {employee_name}")
-        except Exception as e:
-            print(f"Error generating PDF for {employee_name}: {str(e)}")
-            if args.debug:
-                import traceback
-                print(traceback.format_exc())
-    
     print(f"Processing complete. Found {len(cv_json_list)} suitable employee(s).")
     print(f"Results saved to {args.output_dir}")
     return 0
@@ -0,0 +1,201 @@
+import os
+import time
+import sqlite3
+from private_files import private_path, restrict_to_owner
+
+# In a per-user directory, so other local users cannot drain or refill the buckets.
+DEFAULT_DB_NAME = "cv_match_rate_limit.sqlite3"
+
+
+def estimate_tokens(*texts):
+    """Rough token estimate (~4 characters per token) used before the real usage is known."""
+    return sum(len(text) for text in texts if text) // 4 + 1
+
+
+class RateLimiter:
+    """Token buckets for requests and tokens per minute, shared by all processes on a host.
+
+    The bucket state lives in a small SQLite database so that the Streamlit app and
+    batch jobs that use the same API key draw from one budget.
+    """
+
+    def __init__(self, requests_per_minute=500, tokens_per_minute=200000, db_path=None):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.db_path = db_path or os.getenv("OPENAI_RATE_LIMIT_DB") or private_path(DEFAULT_DB_NAME)
+        self._init_db()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _init_db(self):
+        conn = self._connect()
+        try:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets ("
+                "name TEXT PRIMARY KEY, level REAL NOT NULL, updated REAL NOT NULL)"
+            )
+            now = time.time()
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS waiters ("
+                "pid INTEGER NOT NULL, priority TEXT NOT NULL, count INTEGER NOT NULL, "
+                "updated REAL NOT NULL, PRIMARY KEY (pid, priority))"
+            )
+            restrict_to_owner(self.db_path)
+            conn.execute(
+                "INSERT OR IGNORE INTO buckets VALUES ('requests', ?, ?)",
+                (float(self.requests_per_minute), now),
+            )
+            conn.execute(
+                "INSERT OR IGNORE INTO buckets VALUES ('tokens', ?, ?)",
+                (float(self.tokens_per_minute), now),
+            )
+        finally:
+            conn.close()
+
+    def _refill(self, conn, name, capacity, now):
+        level, updated = conn.execute(
+            "SELECT level, updated FROM buckets WHERE name = ?", (name,)
+        ).fetchone()
+        level = min(capacity, level + (now - updated) * capacity / 60.0)
+        return level
+
+    def _try_acquire(self, tokens, reserve=0.0):
+        """Take one request and `tokens` tokens if both buckets allow it.
+
+        `reserve` is the fraction of both budgets that has to stay available
+        afterwards; lower priority traffic uses it to leave headroom for
+        interactive requests. Returns 0 on success, otherwise the number of
+        seconds to wait before retrying.
+        """
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            requests_level = self._refill(conn, "requests", self.requests_per_minute, now)
+            tokens_level = self._refill(conn, "tokens", self.tokens_per_minute, now)
+
+            needed_requests = 1 + reserve * self.requests_per_minute
+            needed_tokens = tokens + reserve * self.tokens_per_minute
+
+            if requests_level >= needed_requests and tokens_level >= needed_tokens:
+                requests_level -= 1
+                tokens_level -= tokens
+                wait = 0.0
+            else:
+                request_wait = max(0.0, needed_requests - requests_level) * 60.0 / self.requests_per_minute
+                token_wait = max(0.0, needed_tokens - tokens_level) * 60.0 / self.tokens_per_minute
+                wait = max(request_wait, token_wait, 0.05)
+
+            conn.execute(
+                "UPDATE buckets SET level = ?, updated = ? WHERE name = 'requests'",
+                (requests_level, now),
+            )
+            conn.execute(
+                "UPDATE buckets SET level = ?, updated = ? WHERE name = 'tokens'",
+                (tokens_level, now),
+            )
+            conn.execute("COMMIT")
+            return wait
+        except Exception:
+            try:
+                conn.execute("ROLLBACK")
+            except sqlite3.Error:
+                # Re-raise the error that failed the transaction, not the rollback's.
+                pass
+            raise
+        finally:
+            conn.close()
+
+    def acquire(self, estimated_tokens, timeout=None, reserve=0.0):
+        """Block until one request and `estimated_tokens` fit into the budgets.
+
+        Returns the number of tokens that were charged, which must be passed to
+        `reconcile` once the real usage is known.
+        """
+        # A single prompt larger than the whole budget would otherwise never fit.
+        tokens = min(int(estimated_tokens), int(self.tokens_per_minute * (1 - reserve)))
+        deadline = time.time() + timeout if timeout is not None else None
+
+        while True:
+            wait = self._try_acquire(tokens, reserve)
+            if wait == 0:
+                return tokens
+            if deadline is not None and time.time() + wait > deadline:
+                raise TimeoutError("Rate limit budget not available within timeout")
+            time.sleep(min(wait, 5.0))
+
+    def reconcile(self, charged_tokens, actual_tokens):
+        """Correct the token bucket once the API has reported the real usage."""
+        difference = charged_tokens - actual_tokens
+        if difference == 0:
+            return
+
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            level = self._refill(conn, "tokens", self.tokens_per_minute, now)
+            # The level may go negative when a request used more than estimated;
+            # later requests then wait until the debt has been refilled.
+            level = min(self.tokens_per_minute, level + difference)
+            conn.execute(
+                "UPDATE buckets SET level = ?, updated = ? WHERE name = 'tokens'",
+                (level, now),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            try:
+                conn.execute("ROLLBACK")
+            except sqlite3.Error:
+                pass
+            raise
+        finally:
+            conn.close()
+
+    def set_waiting(self, priority, count):
+        """Publish how many requests of a priority class this process has queued."""
+        conn = self._connect()
+        try:
+            if count > 0:
+                conn.execute(
+                    "INSERT OR REPLACE INTO waiters VALUES (?, ?, ?, ?)",
+                    (os.getpid(), priority, count, time.time()),
+                )
+            else:
+                conn.execute(
+                    "DELETE FROM waiters WHERE pid = ? AND priority = ?",
+                    (os.getpid(), priority),
+                )
+        finally:
+            conn.close()
+
+    def waiting_count(self, priority, exclude_own=True, max_age=300):
+        """Requests of a priority class queued by processes on this host.
+
+        Entries older than `max_age` seconds are ignored so that a crashed
+        process cannot block other classes forever.
+        """
+        conn = self._connect()
+        try:
+            query = "SELECT COALESCE(SUM(count), 0) FROM waiters WHERE priority = ? AND updated >= ?"
+            params = [priority, time.time() - max_age]
+            if exclude_own:
+                query += " AND pid != ?"
+                params.append(os.getpid())
+            return conn.execute(query, params).fetchone()[0]
+        finally:
+            conn.close()
+
+
+def get_rate_limiter():
+    """Build the limiter from OPENAI_RPM_LIMIT / OPENAI_TPM_LIMIT; a limit of 0 disables it."""
+    requests_per_minute = int(os.getenv("OPENAI_RPM_LIMIT", "500"))
+    tokens_per_minute = int(os.getenv("OPENAI_TPM_LIMIT", "200000"))
+
+    if requests_per_minute <= 0 or tokens_per_minute <= 0:
+        return None
+
+    return RateLimiter(requests_per_minute, tokens_per_minute)
@@ -0,0 +1,103 @@
+import os
+import json
+import mmap
+import fcntl
+import struct
+import hashlib
+import tempfile
+from contextlib import contextmanager
+
+# Set to 1 to share loaded corpora between the processes of a host (see CorpusRegistry).
+SHARED_CORPUS = os.getenv("SHARED_CORPUS", "0") == "1"
+# Where corpus images live; /dev/shm keeps them in memory without touching the disk.
+SHARED_CORPUS_DIR = os.getenv("SHARED_CORPUS_DIR") or os.path.join(
+    "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(), "cv_corpus"
+)
+
+MAGIC = b"CVCORP01"
+HEADER = struct.Struct("<8sQ")
+
+
+def image_path(name, directory, fingerprint):
+    """Image of one version of a corpus; every process computes the same path from the same files."""
+    digest = hashlib.sha1(json.dumps([directory, fingerprint]).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(SHARED_CORPUS_DIR, f"{name}-{digest}.img")
+
+
+def _shared_dir():
+    # Private to the user: attaching processes unpickle workbook frames from these files.
+    os.makedirs(SHARED_CORPUS_DIR, mode=0o700, exist_ok=True)
+    stat = os.stat(SHARED_CORPUS_DIR)
+    if stat.st_uid != os.getuid():
+        raise PermissionError(f"{SHARED_CORPUS_DIR} belongs to another user")
+    # Others may have placed images in a directory they could write to, so it is not repaired with chmod.
+    if stat.st_mode & 0o077:
+        raise PermissionError(f"{SHARED_CORPUS_DIR} is accessible to other users (mode {stat.st_mode & 0o777:o}); expected 700")
+    return SHARED_CORPUS_DIR
+
+
+@contextmanager
+def publish_lock(name):
+    """Held while one process loads and publishes a corpus; the others wait and then attach."""
+    with open(os.path.join(_shared_dir(), f"{name}.lock"), "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def write_image(path, entries, errors):
+    """Write {path: bytes-like} and the load errors as one image file; replaces `path` atomically."""
+    index = []
+    offset = 0
+    for key, data in entries.items():
+        length = memoryview(data).nbytes
+        index.append([key, offset, length])
+        offset += length
+    index_bytes = json.dumps({"entries": index, "errors": dict(errors)}).encode("utf-8")
+
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(index_bytes)))
+        f.write(index_bytes)
+        for data in entries.values():
+            f.write(data)
+    os.replace(temp_path, path)
+
+
+def remove_old_images(name, keep):
+    """Drop the other images of a corpus; processes that still map one keep their pages until they let go."""
+    prefix = f"{name}-"
+    for file_name in os.listdir(SHARED_CORPUS_DIR):
+        path = os.path.join(SHARED_CORPUS_DIR, file_name)
+        if file_name.startswith(prefix) and file_name.endswith(".img") and path != keep:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+class CorpusImage:
+    """A corpus image mapped read-only; `entries` are zero-copy memoryviews into the shared pages."""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, index_length = HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a corpus image")
+        data_start = HEADER.size + index_length
+        index = json.loads(self._map[HEADER.size:data_start])
+        view = memoryview(self._map)
+        self.entries = {
+            key: view[data_start + offset:data_start + offset + length] for key, offset, length in index["entries"]
+        }
+        self.errors = index["errors"]
+
+
+def attach_image(path):
+    """The image at `path`, or None if it has not been published (yet)."""
+    if not os.path.exists(path):
+        return None
+    return CorpusImage(path)
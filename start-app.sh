@@ -30,7 +30,8 @@ fi
 if [ -f "/.dockerenv" ] || [ -n "$DOCKER_CONTAINER" ]; then
     # We're in Docker
     echo "Running in Docker environment..."
-    streamlit run app.py
+    # Preloads data and the LLM connection in the background; GET :8502/ready reports when done
+    python warm_start.py
 else
     # Check if Poetry is installed
     if command -v poetry &> /dev/null; then
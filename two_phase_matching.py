@@ -0,0 +1,163 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from cv_matching_prompt import (
+    get_cv_scoring_prompt,
+    get_cv_writer_prompt,
+    build_cv_matching_user_prompt,
+    build_cv_writer_user_prompt,
+)
+from match_models import MatchScores, CustomizedCV, supports_structured_output, response_format_for, parse_structured_response
+from matching_errors import MatchingServiceError
+from model_cascade import select_cv_blocks, combine_usage
+from cv_profiles import CV_PROFILES, write_profiled_cv
+
+# Set to 0 to have a single call write the scores and every customized CV one after another.
+TWO_PHASE_MATCHING = os.getenv("TWO_PHASE_MATCHING", "1") == "1"
+
+
+def qualified_employees(scores, response, min_match_percentage):
+    """(name, match percentage) of the employees that get a customized CV."""
+    if scores is not None:
+        return [(employee.name, employee.match_percentage) for employee in scores.qualified(min_match_percentage)]
+
+    from past_project_analyzer import extract_matched_employees
+
+    return [
+        (employee["name"], int(employee["match_percentage"]))
+        for employee in extract_matched_employees(response)
+        if int(employee["match_percentage"]) >= min_match_percentage
+    ]
+
+
+def run_two_phase(scheduler, model, project_description, cv_text, min_match_percentage=70, excel_data=None,
+                  on_cv=None, on_stage=None, notes=None, priority="interactive", cv_store=None):
+    """Score all employees in one short call, then write each qualified employee's CV in its own call.
+
+    The CV calls are submitted together, so their output is generated in
+    parallel (up to the scheduler's concurrency) instead of one CV after the
+    other; on_cv(cv_json) is called as each one finishes and
+    on_stage("generating_cvs") before they start. With a `cv_store` and a
+    structured model the model only returns the changes to the employee's
+    stored profile (see cv_profiles), and the full CV is merged locally. Returns
+    (response text, CVMatchResult or None, usage): structured models give a
+    CVMatchResult, text models the scoring text followed by one
+    "### CUSTOMIZED CV FOR" section per employee, which extract_json_from_response reads.
+    """
+    on_cv = on_cv or (lambda cv_json: None)
+    on_stage = on_stage or (lambda stage: None)
+    notes = notes if notes is not None else []
+    structured = supports_structured_output(model)
+
+    prompt = build_cv_matching_user_prompt(
+        cv_text, project_description, minimum_match_percentage=min_match_percentage, excel_data=excel_data
+    )
+    response = scheduler.generate_response(
+        prompt,
+        model=model,
+        system_prompt=get_cv_scoring_prompt(structured=structured),
+        priority=priority,
+        response_format=response_format_for(MatchScores) if structured else None,
+    )
+    usages = [scheduler.last_usage]
+    if response.startswith("Error:"):
+        raise MatchingServiceError(response[len("Error:"):].strip(), status=502)
+
+    scores = None
+    if structured:
+        scores = parse_structured_response(response, MatchScores)
+        if scores is None:
+            raise MatchingServiceError("The scoring response could not be validated", status=502)
+
+    candidates = qualified_employees(scores, response, min_match_percentage)
+    if candidates:
+        on_stage("generating_cvs")
+    written, cv_usages = write_customized_cvs(
+        scheduler, model, project_description, cv_text, candidates, min_match_percentage=min_match_percentage,
+        excel_data=excel_data, on_cv=on_cv, notes=notes, priority=priority, cv_store=cv_store,
+    )
+    usages.extend(cv_usages)
+
+    if scores is not None:
+        match_result = scores.with_cvs(written)
+        return match_result.to_text(min_match_percentage), match_result, combine_usage(usages)
+    return "\n\n".join([response] + written), None, combine_usage(usages)
+
+
+def write_customized_cvs(scheduler, model, project_description, cv_text, candidates, min_match_percentage=70,
+                         excel_data=None, on_cv=None, notes=None, priority="interactive", cv_store=None):
+    """Write the CV of every (name, match percentage) candidate in its own call, all submitted together.
+
+    on_cv(cv_json) is called as each CV finishes. Returns (written, usages):
+    CustomizedCVs for structured models, response texts for text models, in
+    candidate order; CVs that failed are left out and noted in `notes`.
+    """
+    on_cv = on_cv or (lambda cv_json: None)
+    notes = notes if notes is not None else []
+    structured = supports_structured_output(model)
+    usages = []
+    system_prompt = get_cv_writer_prompt(structured=structured)
+    profiled = CV_PROFILES and structured and cv_store is not None
+
+    def write_cv(name, match_percentage):
+        """A CustomizedCV built from the employee's profile, or else the response of a full CV call."""
+        cv_usages = []
+        if profiled:
+            cv, cv_usages = write_profiled_cv(
+                scheduler, cv_store, project_description, name, match_percentage,
+                min_match_percentage=min_match_percentage, excel_data=excel_data, model=model, priority=priority,
+            )
+            if cv is not None:
+                return cv, cv_usages
+
+        # Only the employee's own CV; the whole corpus if it cannot be told apart by name.
+        cv_data = select_cv_blocks(cv_text, [name]) or cv_text
+        response = scheduler.generate_response(
+            build_cv_writer_user_prompt(
+                cv_data, project_description, name, match_percentage,
+                minimum_match_percentage=min_match_percentage, excel_data=excel_data,
+            ),
+            model=model,
+            system_prompt=system_prompt,
+            priority=priority,
+            response_format=response_format_for(CustomizedCV) if structured else None,
+        )
+        return response, cv_usages + [scheduler.last_usage]
+
+    written = [None] * len(candidates)
+    with ThreadPoolExecutor(max_workers=max(1, len(candidates)), thread_name_prefix="cv-writer") as executor:
+        futures = {
+            executor.submit(write_cv, name, match_percentage): index
+            for index, (name, match_percentage) in enumerate(candidates)
+        }
+        for future in as_completed(futures):
+            index = futures[future]
+            name = candidates[index][0]
+            try:
+                cv_response, cv_usages = future.result()
+            except Exception as e:
+                cv_response, cv_usages = f"Error: {str(e)}", []
+            usages.extend(cv_usages)
+
+            if isinstance(cv_response, CustomizedCV):
+                written[index] = cv_response
+                on_cv(cv_response.to_cv_json())
+                continue
+            if cv_response.startswith("Error:"):
+                notes.append({"level": "warning", "message": f"Customized CV for {name} could not be written: {cv_response[len('Error:'):].strip()}"})
+                continue
+
+            if structured:
+                cv = parse_structured_response(cv_response, CustomizedCV)
+                if cv is None:
+                    notes.append({"level": "warning", "message": f"Customized CV for {name} could not be validated"})
+                    continue
+                written[index] = cv
+                on_cv(cv.to_cv_json())
+            else:
+                from json_to_pdf import extract_json_from_response
+
+                written[index] = cv_response
+                for cv_json in extract_json_from_response(cv_response) or []:
+                    on_cv(cv_json)
+
+    return [result for result in written if result is not None], usages
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""Warm-start launcher for the web app.
+
+python warm_start.py [streamlit options] starts the warm-up thread and the
+readiness endpoint, then runs `streamlit run app.py` in the same process, so
+the app's first session finds the corpora, indexes, PDF renderer and LLM
+connection already loaded.
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from lazy_imports import preload
+
+# Port of the /ready and /health endpoints; 0 disables them.
+READINESS_PORT = int(os.getenv("READINESS_PORT", "8502"))
+# Optional file written once the instance is ready (for exec-style probes).
+READINESS_FILE = os.getenv("READINESS_FILE", "")
+# Seconds between retries of warm-up steps that failed (e.g. the API was unreachable).
+WARM_START_RETRY_SECONDS = float(os.getenv("WARM_START_RETRY_SECONDS", "30"))
+
+# Exercises every section of create_cv_pdf, so fonts, styles and flowables are loaded.
+SAMPLE_CV = {
+    "name": "Warm Start",
+    "contact": {"phone": "+00 000 000", "email": "warm@example.com", "address": "Example Street 1"},
+    "education": [{"degree": "MSc Computer Science", "institution": "Example University", "years": "2010-2012"}],
+    "work_experience": [
+        {
+            "role": "Engineer",
+            "company": "Example GmbH",
+            "location": "Berlin",
+            "years": "2012-2020",
+            "responsibilities": ["Built services", "Reviewed code"],
+        }
+    ],
+    "reference_projects": [{"name": "Example", "client": "Example AG", "description": "Example project"}],
+    "technical_skills": {"Languages": "Python", "Added Skills": "SQL"},
+    "soft_skills": ["Communication"],
+    "languages": ["English"],
+}
+
+
+class WarmStart:
+    """Loads the app's shared resources on a background thread and tracks readiness.
+
+    The steps run in order: heavy imports, corpora, past project index, PDF
+    renderer, LLM connection. Failed steps are retried every
+    WARM_START_RETRY_SECONDS; the instance is ready once every step succeeded.
+    Files that fail to parse are reported in the status but do not block
+    readiness.
+    """
+
+    def __init__(self, registry, scheduler):
+        self.registry = registry
+        self.scheduler = scheduler
+        self.ready = threading.Event()
+        self.steps = {
+            "imports": self._warm_imports,
+            "corpora": self._warm_corpora,
+            "indexes": self._warm_indexes,
+            "pdf": self._warm_pdf,
+            "llm": self._warm_llm,
+        }
+        self._state = {name: {"state": "pending", "seconds": None, "detail": None, "error": None} for name in self.steps}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="warm-start", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def status(self):
+        with self._lock:
+            return {"ready": self.ready.is_set(), "steps": {name: dict(step) for name, step in self._state.items()}}
+
+    def _run(self):
+        if READINESS_FILE and os.path.exists(READINESS_FILE):
+            os.remove(READINESS_FILE)
+
+        pending = list(self.steps)
+        while pending and not self._stop.is_set():
+            pending = [name for name in pending if not self._run_step(name)]
+            if pending:
+                print(f"Warm start: retrying {', '.join(pending)} in {WARM_START_RETRY_SECONDS:.0f}s")
+                self._stop.wait(WARM_START_RETRY_SECONDS)
+
+        if not pending:
+            self.ready.set()
+            print(f"Warm start complete: {self._summary()}")
+            if READINESS_FILE:
+                with open(READINESS_FILE, "w", encoding="utf-8") as f:
+                    json.dump(self.status(), f, indent=2)
+
+    def _run_step(self, name):
+        with self._lock:
+            self._state[name].update(state="running", error=None)
+        start = time.perf_counter()
+        try:
+            detail = self.steps[name]()
+            state, error = "ok", None
+        except Exception as e:
+            detail, state, error = None, "failed", str(e)
+            print(f"Warm start step {name} failed: {error}")
+        with self._lock:
+            self._state[name].update(state=state, seconds=round(time.perf_counter() - start, 3), detail=detail, error=error)
+        return state == "ok"
+
+    def _summary(self):
+        with self._lock:
+            return ", ".join(f"{name} {step['seconds']:.2f}s" for name, step in self._state.items())
+
+    def _warm_imports(self):
+        errors = preload()
+        if errors:
+            raise ImportError("; ".join(f"{name}: {error}" for name, error in errors.items()))
+
+    def _warm_corpora(self):
+        detail = {}
+        names = ["cv_json", "excel"]
+        if not self.registry.files("cv_json"):
+            # The app only reads the PDF CVs when there are no JSON CVs.
+            names.append("cv_pdf")
+        for name in names:
+            snapshot = self.registry.get(name)
+            for path, error in snapshot.errors.items():
+                print(f"Warm start: {os.path.basename(path)} could not be loaded: {error}")
+            detail[name] = {"files": len(snapshot.items), "errors": len(snapshot.errors), "version": snapshot.version}
+        return detail
+
+    def _warm_indexes(self):
+        from past_project_analyzer import load_projects_from_excel, rank_past_projects
+
+        projects = load_projects_from_excel()
+        # Runs the TF-IDF and technology scoring once, so their code paths are loaded.
+        rank_past_projects("warm start", projects[:1], min_similarity=0.0)
+        return {"past_projects": len(projects)}
+
+    def _warm_pdf(self):
+        from json_to_pdf import create_cv_pdf
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            create_cv_pdf(dict(SAMPLE_CV), os.path.join(temp_dir, "warm_start.pdf"))
+
+    def _warm_llm(self):
+        backend = self.scheduler.backend
+        backend.warm_connection()
+        return {"model": backend.default_model}
+
+
+class ReadinessHandler(BaseHTTPRequestHandler):
+    warm_start = None
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send(200, {"status": "ok"})
+        elif self.path == "/ready":
+            status = self.warm_start.status()
+            self._send(200 if status["ready"] else 503, status)
+        else:
+            self._send(404, {"error": "not found"})
+
+    def _send(self, code, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        # Probes hit these endpoints every few seconds; keep them out of the log.
+        pass
+
+
+def serve_readiness(warm_start, port=READINESS_PORT):
+    """Serve GET /ready (200 once warm, 503 before) and GET /health on a daemon thread."""
+    handler = type("BoundReadinessHandler", (ReadinessHandler,), {"warm_start": warm_start})
+    try:
+        server = ThreadingHTTPServer(("0.0.0.0", port), handler)
+    except OSError as e:
+        print(f"Could not start the readiness endpoint on port {port}: {str(e)}")
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="readiness", daemon=True).start()
+    print(f"Readiness endpoint on http://0.0.0.0:{port}/ready")
+    return server
+
+
+_warm_start = None
+_warm_start_lock = threading.Lock()
+
+
+def start_warm_start(registry, scheduler, readiness_endpoint=True):
+    """Start the process-wide warm-up once; later calls return it.
+
+    readiness_endpoint=False leaves the /ready endpoint to the caller (the
+    matching service serves it on its own port).
+    """
+    global _warm_start
+    with _warm_start_lock:
+        if _warm_start is None:
+            _warm_start = WarmStart(registry, scheduler).start()
+            if readiness_endpoint and READINESS_PORT:
+                serve_readiness(_warm_start)
+        return _warm_start
+
+
+def main():
+    from cv_corpus import get_app_registry
+    from llm_scheduler import get_scheduler
+    from streamlit.web import cli as stcli
+
+    start_warm_start(get_app_registry(), get_scheduler())
+
+    app_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+    sys.argv = ["streamlit", "run", app_path] + sys.argv[1:]
+    sys.exit(stcli.main())
+
+
+if __name__ == "__main__":
+    main()